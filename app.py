@@ -7,8 +7,10 @@ and provides inspirational movie quotes to match your emotional state.
 """
 
 import streamlit as st
+from streamlit.errors import StreamlitAPIException
 import sys
 import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 # Add src to path
@@ -27,20 +29,23 @@ else:
 from src.chatbot.engine import ChatbotEngine
 from src.emotion.analyzer import EmotionAnalyzer
 from src.emotion.transformer import SentenceTransformer
-from src.quotes.database import QuoteDatabase
-from src.quotes.matcher import QuoteMatcher
-from src.music.database import SongDatabase
-from src.music.matcher import SongMatcher
+from src.catalog.manager import CatalogManager
+from src.catalog.shared import SharedCatalogRegistry
+from src.catalog.snapshot import CatalogSnapshot
+from src.search.cursor import RecommendationCursor
+from src.search.prefetch import AlternatePrefetcher
 from src.image.generator import ComfortImageGenerator, MoviePosterFetcher
+from src.image.poster_cache import PosterCache
+from src.image.store import ImageStore
+from src.ui.cards import CardCache
 from src.ui import (
     display_header,
     display_disclaimer,
-    display_emotion_analysis,
-    display_transformation,
     display_movie_quote,
     display_song_card,
     display_favorites_sidebar,
-    display_user_message,
+    turn_summary_html,
+    history_summary_html,
     get_custom_css
 )
 
@@ -91,6 +96,88 @@ def initialize_session_state():
     
     if 'show_posters' not in st.session_state:
         st.session_state.show_posters = True
+    
+    # Older turns shown in full on top of the newest HISTORY_FULL_TURNS
+    if 'history_expanded' not in st.session_state:
+        st.session_state.history_expanded = 0
+    
+    # "Try another" position per (kind, emotion), as compact cursor tuples
+    if 'recommendation_cursors' not in st.session_state:
+        st.session_state.recommendation_cursors = {}
+    
+    if 'prefetcher' not in st.session_state:
+        st.session_state.prefetcher = AlternatePrefetcher(
+            get_prefetch_executor(), st.session_state.recommendation_cursors
+        )
+
+
+@st.cache_resource(show_spinner=False)
+def get_catalog_manager() -> CatalogManager:
+    """Load quote and song catalogs once per process and watch them for edits."""
+    shared_registry = None
+    if settings.CATALOG_SHARED_MEMORY:
+        try:
+            shared_registry = SharedCatalogRegistry(settings.CATALOG_SHM_PREFIX)
+        except (ImportError, OSError):
+            print("Shared-memory catalogs need a Linux host; loading catalogs per process")
+    
+    manager = CatalogManager(
+        settings.QUOTES_FILE,
+        settings.SONGS_FILE,
+        poll_interval=settings.CATALOG_RELOAD_INTERVAL,
+        shared_registry=shared_registry
+    )
+    manager.start()
+    return manager
+
+
+@st.cache_resource(show_spinner=False)
+def get_prefetch_executor() -> ThreadPoolExecutor:
+    """Thread pool shared by all sessions for prefetching "try another" alternates."""
+    return ThreadPoolExecutor(max_workers=4, thread_name_prefix="prefetch")
+
+
+@st.cache_resource(show_spinner=False)
+def get_poster_cache() -> PosterCache:
+    """Poster URLs shared by all sessions and kept on disk across restarts."""
+    return PosterCache(
+        settings.POSTER_CACHE_FILE or None,
+        max_entries=settings.POSTER_CACHE_SIZE,
+        hit_ttl=settings.POSTER_HIT_TTL,
+        miss_ttl=settings.POSTER_MISS_TTL
+    )
+
+
+@st.cache_resource(show_spinner=False)
+def get_poster_fetcher() -> MoviePosterFetcher:
+    """One poster fetcher (worker pool and keep-alive connections) for all sessions."""
+    tmdb_key = settings.get_api_key("tmdb") if hasattr(settings, 'get_api_key') else None
+    return MoviePosterFetcher(
+        api_key=tmdb_key, cache=get_poster_cache(), tmdb_base_url=settings.TMDB_API_URL
+    )
+
+
+@st.cache_resource(show_spinner=False)
+def get_image_store():
+    """Local thumbnail cache shared by all sessions (None if disabled)."""
+    if not settings.IMAGE_CACHE_DIR:
+        return None
+    try:
+        return ImageStore(settings.IMAGE_CACHE_DIR, max_bytes=settings.IMAGE_CACHE_MB * 1024 * 1024)
+    except (ImportError, OSError) as e:
+        print(f"Image cache disabled, serving remote image URLs: {e}")
+        return None
+
+
+@st.cache_resource(show_spinner=False)
+def get_card_cache() -> CardCache:
+    """Escaped card HTML per catalog item, shared by all sessions."""
+    return CardCache()
+
+
+def get_catalogs() -> CatalogSnapshot:
+    """Current catalog snapshot; take it once and use it for the whole run."""
+    return get_catalog_manager().snapshot
 
 
 def initialize_components():
@@ -110,32 +197,24 @@ def initialize_components():
             st.session_state.analyzer = EmotionAnalyzer(st.session_state.chatbot.client)
         
         if 'transformer' not in st.session_state:
-            st.session_state.transformer = SentenceTransformer(
-                st.session_state.chatbot.client,
-                style=st.session_state.transformation_style
-            )
-        
-        if 'quote_db' not in st.session_state:
-            st.session_state.quote_db = QuoteDatabase("data/quotes.json")
-        
-        if 'quote_matcher' not in st.session_state:
-            st.session_state.quote_matcher = QuoteMatcher(st.session_state.quote_db)
+            st.session_state.transformer = SentenceTransformer(st.session_state.chatbot.client)
         
-        # Initialize song database and matcher
-        if 'song_db' not in st.session_state:
-            st.session_state.song_db = SongDatabase("data/songs.json")
-        
-        if 'song_matcher' not in st.session_state:
-            st.session_state.song_matcher = SongMatcher(st.session_state.song_db)
+        # Catalogs and matchers are shared process-wide, not copied per session
+        get_catalogs()
         
         # Initialize image generator (optional, will use fallback if DALL-E fails)
         if 'image_generator' not in st.session_state:
             st.session_state.image_generator = ComfortImageGenerator(st.session_state.chatbot.client)
         
-        # Initialize poster fetcher with optional TMDB API key
+        # Poster fetcher (optional TMDB API key) is shared process-wide
         if 'poster_fetcher' not in st.session_state:
-            tmdb_key = settings.get_api_key("tmdb") if hasattr(settings, 'get_api_key') else None
-            st.session_state.poster_fetcher = MoviePosterFetcher(api_key=tmdb_key)
+            st.session_state.poster_fetcher = get_poster_fetcher()
+        
+        if 'image_store' not in st.session_state:
+            st.session_state.image_store = get_image_store()
+        
+        if 'card_cache' not in st.session_state:
+            st.session_state.card_cache = get_card_cache()
         
         st.session_state.initialized = True
         
@@ -161,8 +240,6 @@ def sidebar_settings():
     new_style = settings.TRANSFORMATION_STYLES[style_display]
     if new_style != st.session_state.transformation_style:
         st.session_state.transformation_style = new_style
-        if 'transformer' in st.session_state:
-            st.session_state.transformer.set_style(new_style)
     
     st.sidebar.markdown("---")
     
@@ -176,6 +253,11 @@ def sidebar_settings():
     
     st.sidebar.markdown("---")
     
+    # Catalog search
+    sidebar_search()
+    
+    st.sidebar.markdown("---")
+    
     # Favorites section
     display_favorites_sidebar()
     
@@ -187,15 +269,38 @@ def sidebar_settings():
     st.sidebar.metric("Quotes viewed", len(st.session_state.shown_quotes))
     st.sidebar.metric("Songs played", len(st.session_state.shown_songs))
     st.sidebar.metric("Favorites saved", len(st.session_state.favorites) + len(st.session_state.playlist))
+    hit_rate = st.session_state.prefetcher.hit_rate
+    st.sidebar.metric(
+        "Instant alternates",
+        f"{hit_rate:.0%}" if hit_rate is not None else "—",
+        help="Share of \"Try another\" clicks answered from prefetched alternates"
+    )
+    
+    catalog_stats = get_catalog_manager().stats()
+    reload_info = ""
+    if catalog_stats["last_reload_seconds"] is not None:
+        reload_info = f" · last reload {catalog_stats['last_reload_seconds'] * 1000:.0f} ms"
+    st.sidebar.caption(f"📚 Catalog v{catalog_stats['version']}{reload_info}")
+    
+    # Poster providers whose circuit breaker is not closed
+    poster_fetcher = st.session_state.get('poster_fetcher')
+    if poster_fetcher:
+        for name, health in poster_fetcher.provider_health().items():
+            if health['state'] != 'closed':
+                st.sidebar.caption(f"🖼️ Posters from {name}: {health['state']} "
+                                   f"({health['error_rate']:.0%} errors), using placeholders")
     
     # Clear conversation button
     if st.sidebar.button("🆕 Start New Conversation"):
         if st.sidebar.button("✅ Confirm Clear"):
             st.session_state.messages = []
             st.session_state.conversation_history = []
+            st.session_state.history_expanded = 0
             st.session_state.message_count = 0
             st.session_state.shown_quotes = set()
             st.session_state.shown_songs = set()
+            # Also resets recommendation_cursors, atomically with in-flight prefetches
+            st.session_state.prefetcher.clear()
             if 'chatbot' in st.session_state:
                 st.session_state.chatbot.clear_context()
             st.rerun()
@@ -219,6 +324,32 @@ def sidebar_settings():
         """)
 
 
+def sidebar_search():
+    """Fuzzy search and autocomplete over song titles, artists, movies and characters."""
+    st.sidebar.subheader("🔎 Find a Song or Movie")
+    query = st.sidebar.text_input(
+        "Title, artist, movie or character",
+        key="catalog_search",
+        placeholder="e.g. spring day, shawshank"
+    )
+    if not query:
+        return
+    
+    catalogs = get_catalogs()
+    suggestions = catalogs.song_db.autocomplete(query, 4) + catalogs.quote_db.autocomplete(query, 4)
+    if suggestions:
+        st.sidebar.caption("Suggestions: " + " · ".join(dict.fromkeys(suggestions)))
+    
+    songs = catalogs.song_db.lookup(query, 3)
+    quotes = catalogs.quote_db.lookup(query, 3)
+    for song, _ in songs:
+        st.sidebar.markdown(f"🎵 **{song.title}** — {song.artist} · [YouTube]({song.youtube_url})")
+    for quote, _ in quotes:
+        st.sidebar.markdown(f"🎬 *\"{quote.text}\"* — {quote.character}, {quote.movie} ({quote.year})")
+    if not songs and not quotes:
+        st.sidebar.caption("No matches found.")
+
+
 def process_user_input(user_input: str):
     """Process user input and generate response."""
     # Increment message count
@@ -229,6 +360,8 @@ def process_user_input(user_input: str):
         st.warning(f"⚠️ You've reached the message limit ({settings.MAX_MESSAGES_PER_SESSION}) for this session. Please start a new conversation.")
         return
     
+    catalogs = get_catalogs()
+    
     # Store user input in conversation history
     conversation_entry = {
         'user_input': user_input,
@@ -253,7 +386,8 @@ def process_user_input(user_input: str):
     with st.spinner("Reframing your thought..."):
         transformed = st.session_state.transformer.transform(
             user_input,
-            emotion_result.primary_emotion
+            emotion_result.primary_emotion,
+            style=st.session_state.transformation_style
         )
     
     # Store transformation
@@ -261,10 +395,11 @@ def process_user_input(user_input: str):
     
     # Match quotes
     with st.spinner("Finding perfect quotes..."):
-        quotes = st.session_state.quote_matcher.match_quotes(
-            emotion_result.primary_emotion,
+        quotes = catalogs.quote_matcher.match_quotes_for_result(
+            emotion_result,
             count=2,
-            exclude_ids=st.session_state.shown_quotes
+            exclude_ids=st.session_state.shown_quotes,
+            query_text=user_input
         )
     
     # Store quotes
@@ -274,10 +409,11 @@ def process_user_input(user_input: str):
     
     # Match songs
     with st.spinner("Finding perfect K-pop songs..."):
-        songs = st.session_state.song_matcher.match_songs(
-            emotion_result.primary_emotion,
+        songs = catalogs.song_matcher.match_songs_for_result(
+            emotion_result,
             count=2,
-            exclude_ids=st.session_state.shown_songs
+            exclude_ids=st.session_state.shown_songs,
+            query_text=user_input
         )
     
     # Store songs
@@ -288,16 +424,21 @@ def process_user_input(user_input: str):
     # Add to conversation history
     st.session_state.conversation_history.append(conversation_entry)
     
+    # Get "try another" alternates ready while the user reads
+    for kind in ('quote', 'song'):
+        st.session_state.prefetcher.fill(*alternate_source(kind, emotion_result.primary_emotion))
+    
     # Force rerun to display
     st.rerun()
     
     # Match quotes
     st.markdown("### 🎬 Inspirational Movie Quotes")
     with st.spinner("Finding perfect quotes..."):
-        quotes = st.session_state.quote_matcher.match_quotes(
+        quotes = catalogs.quote_matcher.match_quotes(
             emotion_result.primary_emotion,
             count=2,
-            exclude_ids=st.session_state.shown_quotes
+            exclude_ids=st.session_state.shown_quotes,
+            query_text=user_input
         )
     
     # Display quotes
@@ -310,7 +451,7 @@ def process_user_input(user_input: str):
             
             # Handle "try another" click
             if wants_another:
-                new_quote = st.session_state.quote_matcher.get_another_quote(
+                new_quote = catalogs.quote_matcher.get_another_quote(
                     emotion_result.primary_emotion,
                     st.session_state.shown_quotes
                 )
@@ -323,57 +464,162 @@ def process_user_input(user_input: str):
     st.markdown("---")
 
 
+def alternate_source(kind: str, emotion: str):
+    """Prefetch key, cursor step and poster resolver for one kind of card."""
+    catalogs = get_catalogs()
+    if kind == 'quote':
+        next_item = catalogs.quote_matcher.next_quote
+        shown = set(st.session_state.shown_quotes)
+    else:
+        next_item = catalogs.song_matcher.next_song
+        shown = set(st.session_state.shown_songs)
+    
+    def step(state):
+        item, cursor = next_item(emotion, shown, RecommendationCursor.from_state(state))
+        return item, cursor.repeat, cursor.to_state()
+    
+    resolve = None
+    poster_fetcher = st.session_state.get('poster_fetcher')
+    if kind == 'quote' and poster_fetcher and st.session_state.show_posters:
+        def resolve(quote):
+            return quote.poster_url or poster_fetcher.search_movie_poster(quote.movie, quote.year)
+    
+    return f"{kind}:{emotion}:v{catalogs.version}", step, resolve
+
+
+def try_another(kind: str, entry: dict, index: int):
+    """Replace one quote or song card of a history entry with the next alternative."""
+    key, step, resolve = alternate_source(kind, entry['emotion'].primary_emotion)
+    # A later turn may have shown an alternate that is still queued
+    shown_ids = st.session_state.shown_quotes if kind == 'quote' else st.session_state.shown_songs
+    alternate = st.session_state.prefetcher.take(key, step, resolve,
+                                                 shown=lambda item: item.id in shown_ids)
+    
+    if kind == 'quote':
+        entry['quotes'][index] = alternate.item
+        entry.setdefault('posters', {})[alternate.item.id] = alternate.poster_url
+        st.session_state.shown_quotes.add(alternate.item.id)
+    else:
+        entry['songs'][index] = alternate.item
+        st.session_state.shown_songs.add(alternate.item.id)
+    
+    if alternate.repeat:
+        st.toast(f"You've seen every {kind} we have for this feeling, so here are some again.")
+    
+    # Replenish in the background with the updated shown set
+    st.session_state.prefetcher.fill(*alternate_source(kind, entry['emotion'].primary_emotion))
+    # Only this turn's fragment needs to redraw, unless the click arrived
+    # with a full app run
+    try:
+        st.rerun(scope="fragment")
+    except StreamlitAPIException:
+        st.rerun()
+
+
+def resolve_history_posters(entries: list) -> dict:
+    """Posters for every quote card of the given turns, resolved as one batch.
+    
+    Returns ``{(timestamp, quote id): url}``. Cached posters cost no network
+    I/O; uncached ones are fetched concurrently under one deadline and show
+    a placeholder until they arrive.
+    """
+    poster_fetcher = st.session_state.get('poster_fetcher')
+    if not (poster_fetcher and st.session_state.show_posters):
+        return {}
+    
+    cards = [
+        (entry['timestamp'], quote)
+        for entry in entries
+        for quote in entry.get('quotes') or []
+        if not quote.poster_url and quote.id not in entry.get('posters', {})
+    ]
+    poster_urls = poster_fetcher.resolve_posters(
+        [(quote.movie, quote.year) for _, quote in cards],
+        timeout=settings.POSTER_DEADLINE
+    )
+    return {(timestamp, quote.id): url for (timestamp, quote), url in zip(cards, poster_urls)}
+
+
 def display_conversation_history():
-    """Display the full conversation history."""
-    if not st.session_state.conversation_history:
+    """Display the conversation history.
+    
+    The newest ``HISTORY_FULL_TURNS`` turns are shown in full; older ones
+    collapse into one-line summaries and are expanded a page at a time.
+    Widget keys derive from each turn's timestamp, so they stay the same
+    whether a turn is collapsed or expanded.
+    """
+    history = st.session_state.conversation_history
+    if not history:
         return
     
     st.markdown("### 📜 Conversation History")
     
-    for entry in st.session_state.conversation_history:
-        # User message
-        with st.container():
-            display_user_message(entry['user_input'])
-            
-            # Check if crisis
-            if entry.get('is_crisis'):
-                st.markdown("### 🧠 Emotion Analysis")
-                display_emotion_analysis(entry['emotion'])
-                st.markdown("---")
-                continue
-            
-            # Emotion analysis
-            st.markdown("### 🧠 Emotion Analysis")
-            display_emotion_analysis(entry['emotion'])
-            
-            # Transformation
-            st.markdown("### ✨ Positive Reframing")
-            display_transformation(
-                entry['user_input'], 
-                entry['transformed'], 
-                key_suffix=f"history_{entry['timestamp']}"
+    first_full = max(0, len(history) - settings.HISTORY_FULL_TURNS - st.session_state.history_expanded)
+    if first_full:
+        st.markdown(history_summary_html(history[:first_full]), unsafe_allow_html=True)
+        page = min(settings.HISTORY_PAGE_SIZE, first_full)
+        if st.button(f"⬆️ Show {page} earlier turns in full", key="history_more"):
+            st.session_state.history_expanded += page
+            # The summaries above are already drawn; redraw without them
+            st.rerun()
+    
+    shown = history[first_full:]
+    posters = resolve_history_posters(shown)
+    
+    for entry in shown:
+        display_history_entry(entry, posters)
+
+
+@st.fragment
+def display_history_entry(entry: dict, posters: dict):
+    """Display one finished turn.
+    
+    Runs as a fragment, so its buttons rerun only this turn. The static part
+    (message, emotion analysis, reframe) is built once per turn as a single
+    HTML block and kept on the entry.
+    """
+    with st.container():
+        summary_html = entry.get('summary_html')
+        if summary_html is None:
+            summary_html = entry['summary_html'] = turn_summary_html(
+                entry['user_input'], entry['emotion'], entry.get('transformed')
             )
-            
-            # Quotes
-            st.markdown("### 🎬 Inspirational Movie Quotes")
-            if entry.get('quotes'):
-                for i, quote in enumerate(entry['quotes']):
-                    display_movie_quote(
-                        quote, 
-                        key_suffix=f"history_{entry['timestamp']}_{i}",
-                        show_poster=st.session_state.show_posters
-                    )
-            
-            # Songs
-            st.markdown("### 🎵 K-pop Therapy")
-            if entry.get('songs'):
-                for i, song in enumerate(entry['songs']):
-                    display_song_card(
-                        song,
-                        key_suffix=f"history_{entry['timestamp']}_{i}"
-                    )
-            
+        st.markdown(summary_html, unsafe_allow_html=True)
+        
+        # Check if crisis
+        if entry.get('is_crisis'):
             st.markdown("---")
+            return
+        
+        # Reframe button belongs to the transformation card above
+        st.button("🔄 Reframe differently", key=f"reframe_history_{entry['timestamp']}")
+        
+        # Quotes
+        st.markdown("### 🎬 Inspirational Movie Quotes")
+        if entry.get('quotes'):
+            for i, quote in enumerate(entry['quotes']):
+                wants_another = display_movie_quote(
+                    quote, 
+                    key_suffix=f"history_{entry['timestamp']}_{i}",
+                    show_poster=st.session_state.show_posters,
+                    poster_url=entry.get('posters', {}).get(quote.id)
+                    or posters.get((entry['timestamp'], quote.id))
+                )
+                if wants_another:
+                    try_another('quote', entry, i)
+        
+        # Songs
+        st.markdown("### 🎵 K-pop Therapy")
+        if entry.get('songs'):
+            for i, song in enumerate(entry['songs']):
+                wants_another = display_song_card(
+                    song,
+                    key_suffix=f"history_{entry['timestamp']}_{i}"
+                )
+                if wants_another:
+                    try_another('song', entry, i)
+        
+        st.markdown("---")
 
 
 def main():
@@ -390,6 +636,10 @@ def main():
         with st.spinner("Initializing AI components..."):
             initialize_components()
     
+    # Cards built for an older catalog are dropped once a reload is published
+    catalogs = get_catalogs()
+    get_card_cache().sync(catalogs.version, catalogs.item)
+    
     # Sidebar
     sidebar_settings()
     
@@ -0,0 +1,65 @@
+"""Benchmark IVF recall@k and throughput against exact search.
+
+Vectors are drawn from a mixture of Gaussian clusters (the shape real text
+embeddings have), normalized, and queried with perturbed catalog vectors.
+
+Usage:
+    python benchmarks/ann_recall.py [items] [dim]
+"""
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.search.ann import IVFIndex
+
+K = 10
+QUERIES = 200
+
+
+def synthetic_vectors(rng: np.random.Generator, n: int, dim: int) -> np.ndarray:
+    centers = rng.standard_normal((max(16, n // 500), dim)).astype(np.float32)
+    labels = rng.integers(0, len(centers), n)
+    vectors = centers[labels] + 1.5 * rng.standard_normal((n, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def exact_top_k(matrix: np.ndarray, query: np.ndarray, allowed: np.ndarray) -> set:
+    scores = matrix @ query
+    scores[~allowed] = -np.inf
+    return set(np.argpartition(scores, -K)[-K:].tolist())
+
+
+if __name__ == "__main__":
+    n_items = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    dim = int(sys.argv[2]) if len(sys.argv) > 2 else 128
+    rng = np.random.default_rng(7)
+    matrix = synthetic_vectors(rng, n_items, dim)
+
+    start = time.perf_counter()
+    index = IVFIndex.build(matrix)
+    print(f"Built IVF over {n_items} x {dim} in {time.perf_counter() - start:.2f}s "
+          f"({index.n_lists} lists)")
+
+    # Emulate an emotion filter (~30% of rows) minus a few excluded rows
+    allowed = rng.random(n_items) < 0.3
+    queries = matrix[rng.integers(0, n_items, QUERIES)]
+    queries = queries + 0.1 * rng.standard_normal(queries.shape).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+    start = time.perf_counter()
+    truth = [exact_top_k(matrix, q, allowed) for q in queries]
+    exact_qps = QUERIES / (time.perf_counter() - start)
+    print(f"exact        {exact_qps:9.0f} QPS")
+
+    for n_probe in (1, 2, 4, 8, 16, 32):
+        start = time.perf_counter()
+        results = [index.search(q, K, n_probe=n_probe, allowed=allowed) for q in queries]
+        qps = QUERIES / (time.perf_counter() - start)
+        recall = np.mean([len({row for row, _ in found} & expected) / K
+                          for found, expected in zip(results, truth)])
+        print(f"n_probe={n_probe:<4d} {qps:9.0f} QPS  recall@{K}={recall:.3f}")
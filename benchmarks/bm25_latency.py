@@ -0,0 +1,52 @@
+"""Benchmark BM25 query latency on a synthetic catalog.
+
+Usage:
+    python benchmarks/bm25_latency.py [documents]
+"""
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.search.bm25 import BM25Builder
+
+WORDS = ("hope light dark alone together fear brave heart rain spring night "
+         "dream lost found home friend fight tears smile change tomorrow "
+         "courage patience peace storm music road fall rise believe").split()
+HANZI = "希望光明孤獨勇氣心雨春夜夢想回家朋友眼淚微笑改變明天和平"
+
+
+def synthetic_document(rng: random.Random) -> str:
+    words = rng.choices(WORDS, k=rng.randint(8, 30))
+    words += [f"term{rng.randint(0, 50_000)}" for _ in range(3)]
+    hanzi = "".join(rng.choices(HANZI, k=rng.randint(4, 16)))
+    return " ".join(words) + " " + hanzi
+
+
+if __name__ == "__main__":
+    n_docs = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    rng = random.Random(7)
+
+    start = time.perf_counter()
+    builder = BM25Builder()
+    for _ in range(n_docs):
+        builder.add(synthetic_document(rng))
+    index = builder.build()
+    print(f"Indexed {n_docs} documents in {time.perf_counter() - start:.2f}s "
+          f"({len(index.vocab)} terms)")
+
+    queries = [
+        "I feel alone tonight and lost",
+        "need courage to believe in tomorrow",
+        f"term{rng.randint(0, 50_000)} rain",
+        "一個人的夜晚很孤獨",
+    ]
+    for query in queries:
+        runs = 200
+        start = time.perf_counter()
+        for _ in range(runs):
+            hits = index.search(query, k=10)
+        elapsed = (time.perf_counter() - start) / runs
+        print(f"{elapsed * 1000:7.3f} ms  {len(hits):2d} hits  {query}")
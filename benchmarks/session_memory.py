@@ -0,0 +1,58 @@
+"""Benchmark catalog memory per Streamlit session.
+
+Compares the old layout, where every session loaded its own databases and
+matchers into session state, with a single process-wide CatalogSnapshot.
+
+Usage:
+    python benchmarks/session_memory.py [sessions]
+"""
+import contextlib
+import io
+import sys
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from config.settings import settings
+from src.catalog.snapshot import load_snapshot
+
+
+def _new_session_state(snapshot=None) -> dict:
+    """Per-session state as app.py keeps it."""
+    state = {
+        'shown_quotes': set(),
+        'shown_songs': set(),
+        'favorites': [],
+        'playlist': [],
+        'transformation_style': "gentle",
+    }
+    if snapshot is None:
+        # Old behaviour: each session owned a private copy of the catalogs
+        copy = load_snapshot(settings.QUOTES_FILE, settings.SONGS_FILE)
+        state.update(quote_db=copy.quote_db, quote_matcher=copy.quote_matcher,
+                     song_db=copy.song_db, song_matcher=copy.song_matcher)
+    return state
+
+
+def measure(sessions: int, shared: bool) -> int:
+    """Return bytes allocated to create the given number of sessions."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        tracemalloc.start()
+        snapshot = load_snapshot(settings.QUOTES_FILE, settings.SONGS_FILE) if shared else None
+        states = [_new_session_state(snapshot) for _ in range(sessions)]
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    del states
+    return current
+
+
+if __name__ == "__main__":
+    sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+
+    print(f"Catalog memory for {sessions} sessions")
+    print("-" * 60)
+    for label, shared in (("per-session copies", False), ("shared snapshot", True)):
+        total = measure(sessions, shared)
+        print(f"{label:<20} total {total / 1024:10.1f} KiB   "
+              f"per session {total / sessions / 1024:8.1f} KiB")
@@ -0,0 +1,63 @@
+"""Benchmark trigram name search and autocomplete on a synthetic catalog.
+
+Usage:
+    python benchmarks/trigram_latency.py [names]
+"""
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.search.trigram import TrigramIndexBuilder
+
+CONSONANTS = "bcdfghjklmnprstvwyz"
+VOWELS = "aeiou"
+WORDS = ("spring day night love dream blue light heart star moon road home "
+         "forever young fire rain summer tonight story memory wings").split()
+
+
+def syllable(rng: random.Random) -> str:
+    coda = rng.choice("nmrlk") if rng.random() < 0.3 else ""
+    return rng.choice(CONSONANTS) + rng.choice(VOWELS) + coda
+
+
+def synthetic_name(rng: random.Random) -> str:
+    made_up = "".join(syllable(rng) for _ in range(rng.randint(2, 4)))
+    return " ".join(rng.sample(WORDS, rng.randint(0, 2)) + [made_up]).title()
+
+
+if __name__ == "__main__":
+    n_names = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    rng = random.Random(7)
+
+    start = time.perf_counter()
+    builder = TrigramIndexBuilder()
+    names = [synthetic_name(rng) for _ in range(n_names)]
+    for row, name in enumerate(names):
+        builder.add(row, "title", name)
+    index = builder.build()
+    print(f"Indexed {len(index)} distinct names in {time.perf_counter() - start:.1f}s")
+
+    # Misspell real names by dropping or swapping one character
+    queries = []
+    originals = rng.sample(names, 200)
+    for name in originals:
+        i = rng.randrange(len(name))
+        queries.append(name[:i] + name[i + 1:] if rng.random() < 0.5 else name[:i] + "x" + name[i + 1:])
+
+    found = sum(any(index.names[name_id] == name for name_id, _ in index.search(query, 10))
+                for name, query in zip(originals, queries))
+    print(f"Misspelled name found in top 10: {found / len(queries):.0%}")
+
+    for label, run in (("search", lambda q: index.search(q, 10)),
+                       ("autocomplete", lambda q: index.autocomplete(q[:4], 8))):
+        timings = []
+        for query in queries:
+            start = time.perf_counter()
+            run(query)
+            timings.append(time.perf_counter() - start)
+        timings.sort()
+        print(f"{label:13s} median {timings[len(timings) // 2] * 1000:.3f} ms, "
+              f"p95 {timings[int(len(timings) * 0.95)] * 1000:.3f} ms")
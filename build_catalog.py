@@ -0,0 +1,49 @@
+"""Compile the JSON (or JSON Lines) quote and song catalogs into memory-mapped .cat files.
+
+Usage:
+    python build_catalog.py                       # data/quotes.cat, data/songs.cat
+    python build_catalog.py quotes in.json out.cat
+    python build_catalog.py songs in.json out.cat
+
+The search indexes (BM25, embeddings, tags, fields, names and, for large
+catalogs, the ANN index) are stored in the ``.cat`` file too, so the app
+maps them instead of rebuilding them in every process at startup.
+"""
+import sys
+from dataclasses import asdict
+
+from src.catalog.mapped import write_catalog
+from src.music.database import SONG_CATALOG_SCHEMA, SongDatabase
+from src.quotes.database import QUOTE_CATALOG_SCHEMA, QuoteDatabase
+
+SCHEMAS = {"quotes": QUOTE_CATALOG_SCHEMA, "songs": SONG_CATALOG_SCHEMA}
+
+
+def build(kind: str, source: str, target: str) -> int:
+    """Compile one JSON/JSON Lines catalog and return the number of records written."""
+    if kind == "quotes":
+        database = QuoteDatabase(source)
+        records = database.get_all_quotes()
+    else:
+        database = SongDatabase(source)
+        records = database.get_all_songs()
+
+    for issue in database.load_report.issues:
+        print(f"  skipped {issue}")
+
+    return write_catalog(target, (asdict(record) for record in records), SCHEMAS[kind],
+                         database.index_sections())
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4:
+        jobs = [tuple(sys.argv[1:4])]
+    else:
+        jobs = [
+            ("quotes", "data/quotes.json", "data/quotes.cat"),
+            ("songs", "data/songs.json", "data/songs.cat"),
+        ]
+
+    for kind, source, target in jobs:
+        count = build(kind, source, target)
+        print(f"Wrote {count} {kind} to {target}")
@@ -1,11 +1,207 @@
+"""Check every link in the catalogs and write a JSON report.
+
+Usage:
+    python check_urls.py [--workers N] [--host-rate R] [--max-age HOURS]
+                         [--cache FILE] [--report FILE]
+
+Covers ``spotify_url`` and ``youtube_url`` of every song and the poster URL
+of every quote (baked into the catalog or resolved in the poster cache).
+Links are checked with HEAD (falling back to GET when a host does not allow
+HEAD) from a bounded thread pool, at most ``--host-rate`` requests per
+second per host, retrying connection errors, 429 and 5xx with backoff.
+Results are cached with their check time, so a rerun only rechecks entries
+older than ``--max-age``. Exits with status 1 if any link is broken.
+"""
+import argparse
 import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+
+from config.settings import settings
+from src.image.poster_cache import PosterCache
+from src.music.database import SongDatabase
+from src.quotes.database import QuoteDatabase
+
+RETRIES = 3
+USER_AGENT = "emotion-transformer-link-checker/1.0"
+
+
+class HostRateLimiter:
+    """Spaces requests to the same host ``1 / rate`` seconds apart."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next: Dict[str, float] = {}
+
+    def wait(self, host: str):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next.get(host, 0.0))
+            self._next[host] = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+    def pause(self, host: str, seconds: float):
+        """Hold back every request to ``host``, e.g. after a 429."""
+        with self._lock:
+            self._next[host] = max(self._next.get(host, 0.0), time.monotonic() + seconds)
+
+
+_local = threading.local()
+
+
+def _session() -> requests.Session:
+    """This worker thread's keep-alive session."""
+    if not hasattr(_local, "session"):
+        _local.session = requests.Session()
+        _local.session.headers["User-Agent"] = USER_AGENT
+    return _local.session
+
+
+def collect_links() -> Dict[str, List[str]]:
+    """Map each distinct URL to the catalog items (``kind:id``) that use it."""
+    links: Dict[str, List[str]] = {}
+
+    def add(url: Optional[str], owner: str):
+        if url and url.startswith(("http://", "https://")):
+            links.setdefault(url, []).append(owner)
+
+    for song in SongDatabase(settings.SONGS_FILE).get_all_songs():
+        add(song.spotify_url, f"song:{song.id}:spotify_url")
+        add(song.youtube_url, f"song:{song.id}:youtube_url")
+
+    poster_cache = PosterCache(settings.POSTER_CACHE_FILE or None)
+    for quote in QuoteDatabase(settings.QUOTES_FILE).get_all_quotes():
+        poster_url = quote.poster_url or poster_cache.get(quote.movie, quote.year)
+        add(poster_url, f"quote:{quote.id}:poster_url")
+    return links
+
+
+def check_link(url: str, limiter: HostRateLimiter, timeout: float = 10.0) -> Dict[str, Any]:
+    """Check one URL; returns its cache entry."""
+    host = urlsplit(url).netloc
+    status: Optional[int] = None
+    error: Optional[str] = None
+    started = time.monotonic()
+    for attempt in range(RETRIES):
+        limiter.wait(host)
+        try:
+            response = _session().head(url, timeout=timeout, allow_redirects=True)
+            if response.status_code in (403, 405, 501):
+                # Some hosts refuse HEAD; a streamed GET reads only the headers
+                response = _session().get(url, timeout=timeout, allow_redirects=True, stream=True)
+                response.close()
+        except requests.RequestException as e:
+            status, error = None, str(e)
+            if attempt + 1 < RETRIES:
+                time.sleep(2 ** attempt)
+            continue
+        status, error = response.status_code, None
+        if status == 429 or status >= 500:
+            retry_after = response.headers.get("Retry-After", "")
+            limiter.pause(host, float(retry_after) if retry_after.isdigit() else 2 ** attempt)
+            continue
+        break
+    return {
+        "ok": status is not None and status < 400,
+        "status": status,
+        "error": error,
+        "checked": time.time(),
+        "elapsed": round(time.monotonic() - started, 3),
+    }
+
+
+def load_cache(path: Path) -> Dict[str, Dict[str, Any]]:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        print(f"Ignoring unreadable link cache {path}: {e}")
+        return {}
+
+
+def write_json(path: Path, data: Any):
+    """Write JSON atomically."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = Path(f"{path}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    tmp_path.replace(path)
+
+
+def check_links(links: Dict[str, List[str]], cache: Dict[str, Dict[str, Any]],
+                workers: int, host_rate: float, max_age: float) -> Tuple[Dict[str, Any], int]:
+    """Recheck stale links (updating ``cache`` in place); returns the report and recheck count."""
+    now = time.time()
+    stale = [url for url in links if now - cache.get(url, {}).get("checked", 0) > max_age]
+    print(f"{len(links)} links, {len(stale)} to check")
+
+    limiter = HostRateLimiter(host_rate)
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="links")
+    try:
+        futures = {executor.submit(check_link, url, limiter): url for url in stale}
+        for done, future in enumerate(as_completed(futures), 1):
+            cache[futures[future]] = future.result()
+            if done % 50 == 0:
+                print(f"  {done}/{len(stale)} checked")
+    except KeyboardInterrupt:
+        print("Interrupted; reporting what was checked so far")
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    rechecked = set(stale)
+    results = []
+    for url, owners in links.items():
+        entry = cache.get(url)
+        results.append({
+            "url": url,
+            "used_by": owners,
+            "ok": entry["ok"] if entry else None,
+            "status": entry["status"] if entry else None,
+            "error": entry["error"] if entry else "not checked",
+            "checked": entry["checked"] if entry else None,
+            "from_cache": bool(entry) and url not in rechecked,
+        })
+    report = {
+        "generated": now,
+        "total": len(results),
+        "ok": sum(1 for r in results if r["ok"]),
+        "broken": sum(1 for r in results if r["ok"] is False),
+        "unchecked": sum(1 for r in results if r["ok"] is None),
+        "links": sorted(results, key=lambda r: (r["ok"] is not False, r["url"])),
+    }
+    return report, len(stale)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check catalog links and write a JSON report.")
+    parser.add_argument("--workers", type=int, default=8, help="concurrent checks")
+    parser.add_argument("--host-rate", type=float, default=2.0, help="max requests per second per host")
+    parser.add_argument("--max-age", type=float, default=24.0, help="recheck entries older than this (hours)")
+    parser.add_argument("--cache", default="data/link_cache.json")
+    parser.add_argument("--report", default="data/link_report.json")
+    args = parser.parse_args()
 
-with open('data/songs.json', 'r', encoding='utf-8') as f:
-    songs = json.load(f)
+    cache_path = Path(args.cache)
+    cache = load_cache(cache_path)
+    report, rechecked = check_links(collect_links(), cache, args.workers, args.host_rate,
+                                    args.max_age * 3600)
+    write_json(cache_path, cache)
+    write_json(Path(args.report), report)
 
-print("Checking first 10 YouTube URLs:")
-print("-" * 80)
-for song in songs[:10]:
-    print(f"{song['id']} - {song['title']} by {song['artist']}")
-    print(f"   URL: {song['youtube_url']}")
-    print()
+    for result in report["links"]:
+        if result["ok"] is False:
+            print(f"BROKEN {result['status'] or result['error']}: {result['url']} "
+                  f"({', '.join(result['used_by'])})")
+    print(f"{report['ok']} ok, {report['broken']} broken, {report['unchecked']} unchecked "
+          f"({rechecked} rechecked); report written to {args.report}")
+    raise SystemExit(1 if report["broken"] else 0)
@@ -14,6 +14,31 @@ class Settings:
     MAX_TOKENS: int = 500
     TIMEOUT_SECONDS: int = 10
     
+    # Catalog Sources (.json, or .cat compiled with build_catalog.py)
+    QUOTES_FILE: str = os.getenv("QUOTES_FILE", "data/quotes.json")
+    SONGS_FILE: str = os.getenv("SONGS_FILE", "data/songs.json")
+    CATALOG_RELOAD_INTERVAL: float = float(os.getenv("CATALOG_RELOAD_INTERVAL", "2.0"))  # 0 disables
+    # Share compiled catalogs between app processes on one host (Linux only)
+    CATALOG_SHARED_MEMORY: bool = os.getenv("CATALOG_SHARED_MEMORY", "0") == "1"
+    CATALOG_SHM_PREFIX: str = os.getenv("CATALOG_SHM_PREFIX", "emotion-catalog")
+    
+    # Poster URL cache (SQLite; empty path keeps it in memory only)
+    POSTER_CACHE_FILE: str = os.getenv("POSTER_CACHE_FILE", "data/posters.sqlite3")
+    POSTER_CACHE_SIZE: int = int(os.getenv("POSTER_CACHE_SIZE", "2048"))
+    POSTER_HIT_TTL: float = float(os.getenv("POSTER_HIT_TTL", str(30 * 86400)))
+    POSTER_MISS_TTL: float = float(os.getenv("POSTER_MISS_TTL", str(86400)))
+    TMDB_API_URL: str = os.getenv("TMDB_API_URL", "https://api.themoviedb.org/3")
+    POSTER_DEADLINE: float = float(os.getenv("POSTER_DEADLINE", "3.0"))  # seconds per render
+    
+    # Local thumbnail cache for posters and comfort images (empty dir disables it)
+    IMAGE_CACHE_DIR: str = os.getenv("IMAGE_CACHE_DIR", "data/images")
+    IMAGE_CACHE_MB: int = int(os.getenv("IMAGE_CACHE_MB", "200"))
+    
+    # Conversation history: newest turns in full, older ones collapsed and
+    # expanded a page at a time
+    HISTORY_FULL_TURNS: int = int(os.getenv("HISTORY_FULL_TURNS", "5"))
+    HISTORY_PAGE_SIZE: int = int(os.getenv("HISTORY_PAGE_SIZE", "10"))
+    
     # Rate Limiting
     MAX_MESSAGES_PER_SESSION: int = 50
     
@@ -0,0 +1,192 @@
+"""Resolve a poster for every quote's movie and bake it into the catalog.
+
+Usage:
+    python prefetch_posters.py [catalog] [--workers N] [--rate R] [--tmdb-url URL]
+
+``catalog`` is a quotes .json/.jsonl source or a compiled .cat file
+(default: QUOTES_FILE). Each distinct (movie, year) is looked up once on
+TMDB from a bounded thread pool, with one keep-alive session per worker and
+a shared request rate limit; 429 responses are retried after Retry-After.
+Results are stored in the poster cache as they arrive, so an interrupted run
+resumes where it stopped, and quotes that already have a ``poster_url`` are
+skipped. ``--tmdb-url`` points the job at another server (e.g. a local stub).
+Needs TMDB_API_KEY.
+"""
+import argparse
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import requests
+
+from config.settings import settings
+from src.catalog.loader import JSONL_SUFFIXES
+from src.catalog.mapped import MappedCatalog, write_catalog
+from src.image.generator import TMDB_IMAGE_BASE
+from src.image.poster_cache import PosterCache
+from src.quotes.database import CATALOG_SUFFIX, QUOTE_CATALOG_SCHEMA, QuoteDatabase
+
+RETRIES = 4
+
+
+class RateLimiter:
+    """Spaces requests ``1 / rate`` seconds apart across all worker threads."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next = 0.0
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+    def pause(self, seconds: float):
+        """Hold every worker back, e.g. after the server answered 429."""
+        with self._lock:
+            self._next = max(self._next, time.monotonic() + seconds)
+
+
+_local = threading.local()
+
+
+def _session() -> requests.Session:
+    """This worker thread's keep-alive session."""
+    if not hasattr(_local, "session"):
+        _local.session = requests.Session()
+    return _local.session
+
+
+def fetch_poster(movie: str, year: Optional[int], api_key: str, base_url: str,
+                 limiter: RateLimiter) -> Optional[str]:
+    """Poster URL for one movie, or None if TMDB has none.
+
+    Raises after ``RETRIES`` failed attempts, so the movie is retried on the
+    next run instead of being cached as "not found".
+    """
+    params = {"api_key": api_key, "query": movie}
+    if year:
+        params["year"] = year
+    for attempt in range(RETRIES):
+        limiter.wait()
+        try:
+            response = _session().get(f"{base_url}/search/movie", params=params, timeout=10)
+        except requests.RequestException as e:
+            error = e
+            time.sleep(2 ** attempt)
+            continue
+        if response.status_code == 429 or response.status_code >= 500:
+            error = requests.HTTPError(f"HTTP {response.status_code}")
+            retry_after = response.headers.get("Retry-After", "")
+            limiter.pause(float(retry_after) if retry_after.isdigit() else 2 ** attempt)
+            continue
+        response.raise_for_status()
+        results = response.json().get("results") or []
+        poster_path = results[0].get("poster_path") if results else None
+        return f"{TMDB_IMAGE_BASE}{poster_path}" if poster_path else None
+    raise error
+
+
+def load_records(path: Path) -> Tuple[List[Dict[str, Any]], Any]:
+    """Quote dicts of a catalog plus the document to write them back into."""
+    if path.suffix == CATALOG_SUFFIX:
+        catalog = MappedCatalog.open(str(path))
+        try:
+            return [catalog.get_record(row) for row in range(len(catalog))], None
+        finally:
+            catalog.close()
+    if path.suffix in JSONL_SUFFIXES:
+        with open(path, encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()], None
+    with open(path, encoding="utf-8") as f:
+        document = json.load(f)
+    return (document["quotes"] if isinstance(document, dict) else document), document
+
+
+def save_records(path: Path, records: List[Dict[str, Any]], document: Any):
+    """Write the catalog back in its own format, replacing the file atomically."""
+    if path.suffix == CATALOG_SUFFIX:
+        # Recompile with the indexes so the app can keep mapping them
+        write_catalog(str(path), records, QUOTE_CATALOG_SCHEMA,
+                      QuoteDatabase.from_records(records).index_sections())
+        return
+    tmp_path = Path(f"{path}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        if path.suffix in JSONL_SUFFIXES:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        else:
+            json.dump(document, f, ensure_ascii=False, indent=2)
+            f.write("\n")
+    tmp_path.replace(path)
+
+
+def prefetch(path: Path, api_key: str, base_url: str, workers: int, rate: float,
+             cache: PosterCache) -> Dict[str, int]:
+    """Resolve missing posters for a quotes catalog and write them into it."""
+    records, document = load_records(path)
+    todo = {(record["movie"], record.get("year"))
+            for record in records if not record.get("poster_url")}
+    pending = [movie for movie in todo if not cache.contains(*movie)]
+    print(f"{len(todo)} movies without a poster, {len(pending)} not in the poster cache")
+
+    stats = {"found": 0, "not_found": 0, "failed": 0}
+    limiter = RateLimiter(rate)
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="posters")
+    try:
+        futures = {executor.submit(fetch_poster, movie, year, api_key, base_url, limiter): (movie, year)
+                   for movie, year in pending}
+        for done, future in enumerate(as_completed(futures), 1):
+            movie, year = futures[future]
+            try:
+                url = future.result()
+            except Exception as e:
+                print(f"  {movie} ({year}): {e}")
+                stats["failed"] += 1
+                continue
+            cache.put(movie, year, url)
+            stats["found" if url else "not_found"] += 1
+            if done % 50 == 0:
+                print(f"  {done}/{len(pending)} movies looked up")
+    except KeyboardInterrupt:
+        print("Interrupted; saving what was resolved so far")
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    baked = 0
+    for record in records:
+        if not record.get("poster_url"):
+            url = cache.get(record["movie"], record.get("year"))
+            if url:
+                record["poster_url"] = url
+                baked += 1
+    stats["baked"] = baked
+    save_records(path, records, document)
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bake movie poster URLs into the quotes catalog.")
+    parser.add_argument("catalog", nargs="?", default=settings.QUOTES_FILE)
+    parser.add_argument("--workers", type=int, default=8, help="concurrent lookups")
+    parser.add_argument("--rate", type=float, default=20.0, help="max requests per second")
+    parser.add_argument("--tmdb-url", default=settings.TMDB_API_URL, help="TMDB API base URL")
+    args = parser.parse_args()
+
+    api_key = settings.get_api_key("tmdb")
+    if not api_key:
+        raise SystemExit("Set TMDB_API_KEY to look up posters")
+
+    cache = PosterCache(settings.POSTER_CACHE_FILE or None,
+                        hit_ttl=settings.POSTER_HIT_TTL, miss_ttl=settings.POSTER_MISS_TTL)
+    stats = prefetch(Path(args.catalog), api_key, args.tmdb_url.rstrip("/"),
+                     args.workers, args.rate, cache)
+    print(f"Found {stats['found']}, not found {stats['not_found']}, failed {stats['failed']}; "
+          f"wrote {stats['baked']} poster URLs to {args.catalog}")
@@ -0,0 +1,4 @@
+"""Catalog storage package shared by the quote and song databases."""
+from .mapped import LazyRecord, MappedCatalog, encode_catalog, write_catalog
+
+__all__ = ['LazyRecord', 'MappedCatalog', 'encode_catalog', 'write_catalog']
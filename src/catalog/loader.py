@@ -0,0 +1,221 @@
+"""Streaming catalog loader with bounded memory.
+
+Reads a JSON catalog (a top-level array, or the array under one key of a
+top-level object) or a JSON Lines file one item at a time, so the whole
+document is never materialized. Problems are collected in a LoadReport with
+line and character offset information instead of being printed.
+"""
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+JSONL_SUFFIXES = (".jsonl", ".ndjson")
+
+_WHITESPACE = " \t\r\n"
+_DECODER = json.JSONDecoder()
+
+
+@dataclass
+class LoadIssue:
+    """A catalog row that could not be loaded."""
+    line: int
+    offset: int
+    item_id: str
+    message: str
+
+    def __str__(self) -> str:
+        return f"line {self.line}, offset {self.offset} ({self.item_id}): {self.message}"
+
+
+@dataclass
+class LoadReport:
+    """Outcome of loading one catalog source."""
+    source: str
+    loaded: int = 0
+    issues: List[LoadIssue] = field(default_factory=list)
+
+    def add_issue(self, line: int, offset: int, item: Any, message: str):
+        """Record a rejected row."""
+        item_id = item.get("id", "unknown") if isinstance(item, dict) else "unknown"
+        self.issues.append(LoadIssue(line, offset, str(item_id), message))
+
+    @property
+    def ok(self) -> bool:
+        return not self.issues
+
+
+class CatalogFormatError(ValueError):
+    """The source is not valid JSON at the given position."""
+
+    def __init__(self, message: str, line: int, offset: int):
+        super().__init__(f"{message} at line {line}, offset {offset}")
+        self.reason = message
+        self.line = line
+        self.offset = offset
+
+
+class _StreamReader:
+    """Sliding text buffer over a file that tracks line numbers and offsets."""
+
+    def __init__(self, f, chunk_size: int, max_item_chars: int):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.max_item_chars = max_item_chars
+        self.buf = ""
+        self.pos = 0
+        self.base_offset = 0
+        # Line number at buffer index ``counted``; newlines are counted once
+        self.line = 1
+        self.counted = 0
+        self.eof = False
+
+    def _count_lines(self):
+        """Advance the running line count to the current position."""
+        self.line += self.buf.count("\n", self.counted, self.pos)
+        self.counted = self.pos
+
+    def position(self) -> Tuple[int, int]:
+        """(line, character offset) of the current position."""
+        self._count_lines()
+        return self.line, self.base_offset + self.pos
+
+    def fill(self) -> bool:
+        """Drop consumed text and append the next chunk; False at end of file."""
+        if self.eof:
+            return False
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self._count_lines()
+        self.base_offset += self.pos
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = self.counted = 0
+        return True
+
+    def peek(self) -> Optional[str]:
+        """Skip whitespace and return the next character (None at end of file)."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                return None
+
+    def expect(self, char: str):
+        if self.peek() != char:
+            raise CatalogFormatError(f"Expected '{char}'", *self.position())
+        self.pos += 1
+
+    def decode(self) -> Any:
+        """Decode one JSON value, reading more input until it is complete."""
+        self.peek()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError as e:
+                if len(self.buf) - self.pos <= self.max_item_chars and self.fill():
+                    continue
+                raise CatalogFormatError(e.msg, *self.position()) from None
+            # A number at the end of the buffer may continue in the next chunk
+            if end == len(self.buf) and not self.eof and self.fill():
+                continue
+            self.pos = end
+            return value
+
+
+def _iter_json_array(reader: _StreamReader, array_key: Optional[str]) -> Iterator[Tuple[int, int, Any]]:
+    """Find the item array and yield (line, offset, item) for each element."""
+    start = reader.peek()
+    if start == "{":
+        reader.pos += 1
+        while True:
+            if reader.peek() == "}":
+                return
+            key = reader.decode()
+            reader.expect(":")
+            if key == array_key and reader.peek() == "[":
+                break
+            reader.decode()
+            if reader.peek() == ",":
+                reader.pos += 1
+    elif start != "[":
+        raise CatalogFormatError("Expected a JSON array or object", *reader.position())
+
+    reader.expect("[")
+    if reader.peek() == "]":
+        return
+    while True:
+        reader.peek()  # skip whitespace so the position is the item's own
+        line, offset = reader.position()
+        yield line, offset, reader.decode()
+        nxt = reader.peek()
+        if nxt == ",":
+            reader.pos += 1
+        elif nxt == "]":
+            return
+        else:
+            raise CatalogFormatError("Expected ',' or ']'", *reader.position())
+
+
+def iter_catalog_items(path: str, array_key: Optional[str], report: LoadReport,
+                       chunk_size: int = 64 * 1024,
+                       max_item_chars: int = 1 << 20) -> Iterator[Tuple[int, int, Any]]:
+    """Yield ``(line, offset, item)`` for every item in a JSON or JSON Lines file.
+
+    Malformed JSON Lines rows are recorded in ``report`` and skipped; a
+    syntax error in a JSON document ends the stream after recording it.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        if Path(path).suffix in JSONL_SUFFIXES:
+            offset = 0
+            for line_number, text in enumerate(f, 1):
+                if text.strip():
+                    try:
+                        yield line_number, offset, json.loads(text)
+                    except json.JSONDecodeError as e:
+                        report.add_issue(line_number, offset + e.pos, None, e.msg)
+                offset += len(text)
+            return
+
+        reader = _StreamReader(f, chunk_size, max_item_chars)
+        try:
+            yield from _iter_json_array(reader, array_key)
+        except CatalogFormatError as e:
+            report.add_issue(e.line, e.offset, None, e.reason)
+
+
+_KIND_TYPES = {"int": int, "str": str, "list": list}
+
+
+def validate_item(item: Any, schema: Dict[str, str],
+                  optional: Iterable[str] = ()) -> Optional[str]:
+    """Check an item against a catalog schema; return an error message or None.
+
+    Fields named in ``optional`` may be missing or null.
+    """
+    if not isinstance(item, dict):
+        return f"expected an object, got {type(item).__name__}"
+
+    optional = set(optional)
+    missing = [name for name in schema if name not in item and name not in optional]
+    if missing:
+        return f"missing fields: {', '.join(missing)}"
+    unknown = [name for name in item if name not in schema]
+    if unknown:
+        return f"unknown fields: {', '.join(unknown)}"
+
+    for name, kind in schema.items():
+        if name in optional and item.get(name) is None:
+            continue
+        value = item[name]
+        expected = _KIND_TYPES[kind]
+        if not isinstance(value, expected) or (kind == "int" and isinstance(value, bool)):
+            return f"{name} should be {kind}, got {type(value).__name__}"
+        if kind == "list" and not all(isinstance(v, str) for v in value):
+            return f"{name} should contain only strings"
+    if not item["id"]:
+        return "id is empty"
+    return None
@@ -0,0 +1,197 @@
+"""Hot-reloading catalog manager with read-copy-update snapshots."""
+import hashlib
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, Optional
+
+from .snapshot import CatalogSnapshot, load_snapshot
+
+if TYPE_CHECKING:
+    from .shared import SharedCatalogRegistry
+
+
+@dataclass(frozen=True)
+class SourceFingerprint:
+    """Identity of a catalog source file at a point in time."""
+    mtime_ns: int
+    size: int
+    digest: str
+
+
+def _file_digest(path: str) -> str:
+    """Hash a file in chunks without reading it into memory at once."""
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def _digests(fingerprints: Dict[str, Optional[SourceFingerprint]]) -> Dict[str, Optional[str]]:
+    """Content hashes only, so touching a file does not count as a change."""
+    return {path: fp.digest if fp else None for path, fp in fingerprints.items()}
+
+
+class CatalogManager:
+    """Owns the current CatalogSnapshot and replaces it when sources change.
+
+    Readers take ``manager.snapshot`` once and keep using that object; it is
+    never mutated. A background thread polls the source files by mtime and
+    size, confirms a change with a content hash, builds a complete new
+    snapshot off to the side and publishes it with a single reference
+    assignment. Readers therefore never take a lock and never see a
+    half-built catalog, and in-flight matches finish on the old snapshot.
+    """
+
+    def __init__(self, quotes_file: str, songs_file: str, poll_interval: float = 2.0,
+                 shared_registry: Optional["SharedCatalogRegistry"] = None):
+        """Load the initial snapshot.
+        
+        With ``shared_registry`` the catalogs are attached from host-wide
+        shared memory instead of being parsed by this process.
+        """
+        self.quotes_file = quotes_file
+        self.songs_file = songs_file
+        self.poll_interval = poll_interval
+        self.shared_registry = shared_registry
+
+        self.reload_count = 0
+        self.last_reload_seconds: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+        self._writer_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self._fingerprints = self._fingerprint_sources({})
+        self._rejected: Optional[Dict[str, Optional[str]]] = None
+        self._snapshot = self._load(self._fingerprints, version=1)
+
+    @property
+    def snapshot(self) -> CatalogSnapshot:
+        """Current snapshot; a plain reference read, never blocks."""
+        return self._snapshot
+
+    @property
+    def version(self) -> int:
+        """Version number of the published snapshot."""
+        return self._snapshot.version
+
+    def start(self):
+        """Start polling the source files in a daemon thread."""
+        if self.poll_interval <= 0 or (self._thread and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, name="catalog-reloader", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the polling thread."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def check_for_changes(self) -> bool:
+        """Reload if either source changed; return True if a new snapshot was published."""
+        with self._writer_lock:
+            detected_at = time.perf_counter()
+            fingerprints = self._fingerprint_sources(self._fingerprints)
+            if _digests(fingerprints) == _digests(self._fingerprints):
+                # Touched but identical content: remember the new mtime only
+                self._fingerprints = fingerprints
+                return False
+            if _digests(fingerprints) == self._rejected:
+                # Same broken content that already failed; wait for the next edit
+                return False
+            return self._publish(fingerprints, detected_at)
+
+    def reload(self) -> bool:
+        """Unconditionally rebuild and publish a new snapshot."""
+        with self._writer_lock:
+            detected_at = time.perf_counter()
+            return self._publish(self._fingerprint_sources({}), detected_at)
+
+    def _publish(self, fingerprints: Dict[str, Optional[SourceFingerprint]],
+                 detected_at: float) -> bool:
+        """Build the next snapshot and swap it in."""
+        try:
+            snapshot = self._load(fingerprints, version=self._snapshot.version + 1)
+            # The databases swallow parse errors and come back empty; a file
+            # caught mid-write must not replace a good catalog.
+            if (self._snapshot.quote_db.quotes and not snapshot.quote_db.quotes) or \
+                    (self._snapshot.song_db.songs and not snapshot.song_db.songs):
+                if snapshot.lease:
+                    snapshot.lease.release()
+                raise ValueError("reloaded catalog is empty")
+        except Exception as e:
+            self.last_error = f"{type(e).__name__}: {e}"
+            self._rejected = _digests(fingerprints)
+            print(f"Error reloading catalogs: {self.last_error}")
+            return False
+
+        previous, self._snapshot = self._snapshot, snapshot
+        self._fingerprints = fingerprints
+        if previous.lease:
+            previous.lease.release()
+        self.reload_count += 1
+        self.last_reload_seconds = time.perf_counter() - detected_at
+        self.last_error = None
+        return True
+
+    def _load(self, fingerprints: Dict[str, Optional[SourceFingerprint]],
+              version: int) -> CatalogSnapshot:
+        """Build a snapshot from local files or from shared memory."""
+        if self.shared_registry is None:
+            return load_snapshot(self.quotes_file, self.songs_file, version=version)
+
+        from .shared import load_shared_snapshot
+
+        source_digest = ":".join(fp.digest if fp else "-" for fp in fingerprints.values())
+        try:
+            return load_shared_snapshot(self.quotes_file, self.songs_file,
+                                        self.shared_registry, source_digest, version=version)
+        except Exception as e:
+            print(f"Shared catalog unavailable, loading locally: {type(e).__name__}: {e}")
+            return load_snapshot(self.quotes_file, self.songs_file, version=version)
+
+    def _watch(self):
+        """Poll loop run by the background thread."""
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.check_for_changes()
+            except Exception as e:
+                self.last_error = f"{type(e).__name__}: {e}"
+
+    def _fingerprint_sources(
+        self, previous: Dict[str, Optional[SourceFingerprint]]
+    ) -> Dict[str, Optional[SourceFingerprint]]:
+        """Fingerprint both sources, hashing only files whose mtime or size moved."""
+        fingerprints = {}
+        for path in (self.quotes_file, self.songs_file):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                fingerprints[path] = None
+                continue
+
+            known = previous.get(path)
+            if known and (known.mtime_ns, known.size) == (stat.st_mtime_ns, stat.st_size):
+                fingerprints[path] = known
+                continue
+
+            fingerprints[path] = SourceFingerprint(
+                stat.st_mtime_ns, stat.st_size, _file_digest(path))
+        return fingerprints
+
+    def stats(self) -> Dict[str, object]:
+        """Reload metrics for display or logging."""
+        return {
+            "version": self.version,
+            "reload_count": self.reload_count,
+            "last_reload_seconds": self.last_reload_seconds,
+            "last_error": self.last_error,
+            "shared_generation": self._snapshot.lease.generation if self._snapshot.lease else None,
+        }
@@ -0,0 +1,338 @@
+"""Read-only memory-mapped catalog format.
+
+Layout of a ``.cat`` file (all integers little-endian)::
+
+    header        magic, field count, record count, heap offset,
+                  section table offset, section count
+    field table   one entry per field: name, kind, column offset
+    columns       int fields: int64 per record
+                  str/list fields: uint64 heap offsets, one per record + 1
+    heap          UTF-8 string data (list items joined by ``\\x1f``)
+    sections      named NumPy arrays (the prebuilt search indexes)
+    section table one entry per section: name, dtype, offset, length, columns
+
+Columns are fixed width so a record's fields can be located without
+parsing anything, and strings are only decoded when they are read.
+Sections are read in place too, so opening a catalog costs the same however
+large its indexes are. Version 1 files (no sections) can still be read.
+"""
+import dataclasses
+import hashlib
+import mmap
+import operator
+import struct
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Any, Dict, Iterable, Mapping, Optional, Tuple
+
+import numpy as np
+
+MAGIC = b"ETCAT\x00\x02\x00"
+MAGIC_V1 = b"ETCAT\x00\x01\x00"
+_HEADER = struct.Struct("<8sIIQQI4x")
+_HEADER_V1 = struct.Struct("<8sIIQ")
+_FIELD = struct.Struct("<32sB7xQ")
+_SECTION = struct.Struct("<48s8sQQQ")
+_LIST_SEP = "\x1f"
+
+FIELD_KINDS = {"int": 0, "str": 1, "list": 2}
+_KIND_NAMES = {code: name for name, code in FIELD_KINDS.items()}
+
+
+def _align(offset: int, size: int = 8) -> int:
+    """Round offset up to the next multiple of size."""
+    return (offset + size - 1) // size * size
+
+
+def encode_catalog(records: Iterable[Dict[str, Any]], schema: Dict[str, str],
+                   sections: Optional[Mapping[str, np.ndarray]] = None) -> bytes:
+    """Serialize records into the catalog format.
+
+    ``schema`` maps field names to one of ``int``, ``str`` or ``list``.
+    ``sections`` are named 1-D or 2-D arrays stored after the records.
+    """
+    records = list(records)
+    count = len(records)
+    fields = list(schema.items())
+    for name, kind in fields:
+        if kind not in FIELD_KINDS:
+            raise ValueError(f"Unknown field kind for {name}: {kind}")
+
+    heap = bytearray()
+    columns = []
+    for name, kind in fields:
+        if kind == "int":
+            values = [int(record.get(name) or 0) for record in records]
+            columns.append(struct.pack(f"<{count}q", *values))
+            continue
+
+        offsets = [len(heap)]
+        for record in records:
+            value = record.get(name)
+            if kind == "list":
+                value = _LIST_SEP.join(value or [])
+            heap.extend((value or "").encode("utf-8"))
+            offsets.append(len(heap))
+        columns.append(struct.pack(f"<{count + 1}Q", *offsets))
+
+    offset = _HEADER.size + _FIELD.size * len(fields)
+    column_offsets = []
+    for column in columns:
+        offset = _align(offset)
+        column_offsets.append(offset)
+        offset += len(column)
+    heap_offset = _align(offset)
+
+    out = bytearray(heap_offset)
+    for i, ((name, kind), column_offset) in enumerate(zip(fields, column_offsets)):
+        _FIELD.pack_into(out, _HEADER.size + i * _FIELD.size,
+                         name.encode("utf-8"), FIELD_KINDS[kind], column_offset)
+    for column, column_offset in zip(columns, column_offsets):
+        out[column_offset:column_offset + len(column)] = column
+    out.extend(heap)
+
+    table = []
+    for name, array in (sections or {}).items():
+        array = np.ascontiguousarray(array)
+        if array.ndim not in (1, 2) or len(name.encode("utf-8")) > 48:
+            raise ValueError(f"Cannot store section {name!r}: arrays must be 1-D or 2-D "
+                             f"and names at most 48 bytes")
+        out.extend(bytes(_align(len(out)) - len(out)))
+        table.append((name, array.dtype.str, len(out), len(array),
+                      array.shape[1] if array.ndim == 2 else 0))
+        out.extend(array.tobytes())
+    table_offset = _align(len(out))
+    out.extend(bytes(table_offset - len(out)))
+    for entry in table:
+        out.extend(_SECTION.pack(entry[0].encode("utf-8"), entry[1].encode("ascii"), *entry[2:]))
+    _HEADER.pack_into(out, 0, MAGIC, len(fields), count, heap_offset, table_offset, len(table))
+    return bytes(out)
+
+
+def write_catalog(path: str, records: Iterable[Dict[str, Any]],
+                  schema: Dict[str, str],
+                  sections: Optional[Mapping[str, np.ndarray]] = None) -> int:
+    """Write records (and index sections) to a catalog file; returns the number written."""
+    data = encode_catalog(records, schema, sections)
+    tmp_path = Path(f"{path}.tmp")
+    tmp_path.write_bytes(data)
+    tmp_path.replace(path)
+    return _HEADER.unpack_from(data, 0)[2]
+
+
+class MappedCatalog:
+    """Zero-copy view over a catalog file or buffer."""
+
+    def __init__(self, buffer, owner=None):
+        """Wrap any object supporting the buffer protocol."""
+        self._owner = owner
+        self._view = memoryview(buffer)
+        self._digest: Optional[str] = None
+        magic = bytes(self._view[:len(MAGIC)])
+        if magic == MAGIC:
+            _, field_count, self.count, self._heap_offset, table_offset, section_count = \
+                _HEADER.unpack_from(self._view, 0)
+        elif magic == MAGIC_V1:
+            _, field_count, self.count, self._heap_offset = _HEADER_V1.unpack_from(self._view, 0)
+            table_offset = section_count = 0
+        else:
+            raise ValueError("Not an emotion transformer catalog file")
+        header_size = _HEADER.size if magic == MAGIC else _HEADER_V1.size
+
+        self.fields: Dict[str, str] = {}
+        self._columns: Dict[str, memoryview] = {}
+        for i in range(field_count):
+            raw_name, kind, column_offset = _FIELD.unpack_from(
+                self._view, header_size + i * _FIELD.size)
+            name = raw_name.rstrip(b"\x00").decode("utf-8")
+            kind = _KIND_NAMES[kind]
+            size = self.count if kind == "int" else self.count + 1
+            self.fields[name] = kind
+            self._columns[name] = self._view[column_offset:column_offset + size * 8].cast(
+                "q" if kind == "int" else "Q")
+
+        # name -> (dtype, offset, length, columns)
+        self.sections: Dict[str, Tuple[np.dtype, int, int, int]] = {}
+        for i in range(section_count):
+            raw_name, dtype, offset, length, columns = _SECTION.unpack_from(
+                self._view, table_offset + i * _SECTION.size)
+            self.sections[raw_name.rstrip(b"\x00").decode("utf-8")] = (
+                np.dtype(dtype.rstrip(b"\x00").decode("ascii")), offset, length, columns)
+
+    @classmethod
+    def open(cls, path: str) -> "MappedCatalog":
+        """Memory-map a catalog file read-only."""
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(mapped, owner=mapped)
+
+    def __len__(self) -> int:
+        return self.count
+
+    @property
+    def digest(self) -> str:
+        """SHA-256 of the catalog bytes, identifying this exact build."""
+        if self._digest is None:
+            self._digest = hashlib.sha256(self._view).hexdigest()
+        return self._digest
+
+    def array(self, name: str) -> np.ndarray:
+        """A section as a read-only array over the catalog buffer (no copy)."""
+        dtype, offset, length, columns = self.sections[name]
+        array = np.frombuffer(self._view, dtype=dtype, count=length * max(columns, 1), offset=offset)
+        return array.reshape(length, columns) if columns else array
+
+    def arrays(self, prefix: str) -> Dict[str, np.ndarray]:
+        """Every section under ``prefix`` (e.g. ``"bm25."``), keyed without it."""
+        return {name[len(prefix):]: self.array(name)
+                for name in self.sections if name.startswith(prefix)}
+
+    def get(self, row: int, field: str) -> Any:
+        """Decode a single field of a single record."""
+        kind = self.fields[field]
+        column = self._columns[field]
+        if kind == "int":
+            return column[row]
+
+        start = self._heap_offset + column[row]
+        end = self._heap_offset + column[row + 1]
+        text = str(self._view[start:end], "utf-8")
+        if kind == "list":
+            return text.split(_LIST_SEP) if text else []
+        return text
+
+    def get_record(self, row: int) -> Dict[str, Any]:
+        """Decode every field of a record into a dict."""
+        return {field: self.get(row, field) for field in self.fields}
+
+    def close(self):
+        """Release the underlying buffer.
+
+        Arrays handed out by ``array`` keep the buffer alive; while any of
+        them exists the mapping is left for garbage collection to close.
+        """
+        for column in self._columns.values():
+            column.release()
+        self._columns = {}
+        try:
+            self._view.release()
+            if isinstance(self._owner, mmap.mmap):
+                self._owner.close()
+        except BufferError:
+            pass
+        self._owner = None
+
+
+class _LazyDefault:
+    """Lazily decoded field that has a dataclass default.
+
+    Such fields are class attributes, which would hide ``__getattr__``. Older
+    catalogs without the column, and empty values, read as the default.
+    """
+
+    def __init__(self, name: str, default: Any):
+        self.name = name
+        self.default = default
+
+    def __get__(self, record, owner=None):
+        if record is None:
+            return self.default
+        try:
+            value = record.__getattr__(self.name) or self.default
+        except AttributeError:
+            value = self.default
+        record.__dict__[self.name] = value
+        return value
+
+
+class LazyRecord:
+    """Mixin for dataclasses whose fields are decoded from a catalog on access.
+
+    Combine with a record dataclass, e.g. ``class MappedQuote(LazyRecord, Quote)``.
+    Each field is decoded the first time it is read and then kept on the
+    instance, so fields that are never rendered are never decoded.
+    """
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        for field in dataclasses.fields(cls) if dataclasses.is_dataclass(cls) else ():
+            if field.default is not dataclasses.MISSING:
+                setattr(cls, field.name, _LazyDefault(field.name, field.default))
+
+    @classmethod
+    def bind(cls, catalog: MappedCatalog, row: int):
+        """Create a record backed by a catalog row without decoding it."""
+        record = cls.__new__(cls)
+        record.__dict__["_catalog"] = catalog
+        record.__dict__["_row"] = row
+        return record
+
+    def __getattr__(self, name: str):
+        catalog: Optional[MappedCatalog] = self.__dict__.get("_catalog")
+        if catalog is None or name not in catalog.fields:
+            raise AttributeError(name)
+        value = catalog.get(self.__dict__["_row"], name)
+        self.__dict__[name] = value
+        return value
+
+
+class LazyRecords(Sequence):
+    """Read-only sequence of a catalog's rows as lazy records.
+
+    A record is only bound when its row is accessed, so opening a catalog
+    creates no per-row objects. Each access returns a new record; compare
+    records with ``same_record`` rather than by identity.
+    """
+
+    def __init__(self, record_cls, catalog: MappedCatalog):
+        self.record_cls = record_cls
+        self.catalog = catalog
+
+    def __len__(self) -> int:
+        return len(self.catalog)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.record_cls.bind(self.catalog, row)
+                    for row in range(*index.indices(len(self)))]
+        row = operator.index(index)
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError("catalog row out of range")
+        return self.record_cls.bind(self.catalog, row)
+
+
+def bind_records(record_cls, catalog: MappedCatalog) -> LazyRecords:
+    """Lazy records for every row of a catalog, bound on access."""
+    return LazyRecords(record_cls, catalog)
+
+
+def same_record(a, b) -> bool:
+    """Whether two records are the same item of the same catalog build.
+
+    Lazy records compare by catalog and row without decoding anything;
+    other records compare by value.
+    """
+    if a is b:
+        return True
+    if a is None or b is None:
+        return False
+    catalog = a.__dict__.get("_catalog")
+    if catalog is not None and catalog is b.__dict__.get("_catalog"):
+        return a.__dict__["_row"] == b.__dict__["_row"]
+    return a == b
+
+
+def read_field(record, name: str) -> Any:
+    """Read a field without caching a decoded copy on lazy records.
+
+    Used when building indexes so that text which is only needed once at
+    load time does not stay resident on every record.
+    """
+    if name in record.__dict__:
+        return record.__dict__[name]
+    catalog = record.__dict__.get("_catalog")
+    if catalog is not None:
+        return catalog.get(record.__dict__["_row"], name)
+    return getattr(record, name)
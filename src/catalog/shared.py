@@ -0,0 +1,316 @@
+"""Cross-process shared-memory catalogs for multi-worker deployments.
+
+One worker compiles the quote and song catalogs into the ``.cat`` format
+and copies them into ``multiprocessing.shared_memory`` segments. Every
+other worker on the host maps those segments read-only instead of parsing
+its own copy, so catalog pages exist once per host.
+
+A small control segment records the current generation, a digest of the
+source files it was built from and one slot per lease, holding the leased
+generation and the pid of the worker holding it. A new generation is
+published when the sources change; a superseded generation is unlinked once
+no slot holds it. Slots of workers that died without releasing are reaped
+on the next attach, and an attach fails outright if every slot is held by a
+live worker. Updates to the control segment are serialized with an
+``flock`` on a lock file, and segments are opened by name under
+``/dev/shm``, so this needs a Linux host with all workers in one pid
+namespace.
+"""
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+from contextlib import contextmanager
+from dataclasses import asdict
+from multiprocessing import resource_tracker, shared_memory
+from pathlib import Path
+from typing import Dict, List
+
+from src.music.database import SONG_CATALOG_SCHEMA, SongDatabase
+from src.music.matcher import SongMatcher
+from src.quotes.database import QUOTE_CATALOG_SCHEMA, QuoteDatabase
+from src.quotes.matcher import QuoteMatcher
+from .mapped import MappedCatalog, encode_catalog
+from .snapshot import CatalogSnapshot
+
+CATALOG_KINDS = ("quotes", "songs")
+
+SHM_DIR = "/dev/shm"
+
+_CONTROL = struct.Struct("<Q32s")
+_SLOT = struct.Struct("<QQ")  # (generation, holder pid); generation 0 marks a free slot
+_SLOTS = 256
+
+
+class LeaseSlotsFull(RuntimeError):
+    """Every lease slot of the control segment is held by a live worker."""
+
+
+def _open_segment(name: str, create: bool = False, size: int = 0) -> shared_memory.SharedMemory:
+    """Open a segment without handing its lifetime to the resource tracker.
+
+    The tracker would unlink segments when the process that touched them
+    exits, which would pull catalogs out from under the other workers.
+    """
+    segment = shared_memory.SharedMemory(name=name, create=create, size=size)
+    try:
+        resource_tracker.unregister(segment._name, "shared_memory")
+    except Exception:
+        pass
+    return segment
+
+
+def _unlink_segment(name: str):
+    """Remove a segment name if it still exists."""
+    try:
+        segment = _open_segment(name)
+    except FileNotFoundError:
+        return
+    segment.close()
+    # unlink() unregisters from the tracker itself; keep its bookkeeping balanced
+    resource_tracker.register(segment._name, "shared_memory")
+    try:
+        segment.unlink()
+    except FileNotFoundError:
+        pass
+
+
+def _map_read_only(name: str) -> mmap.mmap:
+    """Map an existing segment read-only by its name."""
+    fd = os.open(os.path.join(SHM_DIR, name), os.O_RDONLY)
+    try:
+        return mmap.mmap(fd, os.fstat(fd).st_size, access=mmap.ACCESS_READ)
+    finally:
+        os.close(fd)
+
+
+def _alive(pid: int) -> bool:
+    """Whether a process with this pid exists."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass  # exists, owned by another user
+    return True
+
+
+def _compile_source(kind: str, path: str) -> bytes:
+    """Compile a catalog source file into catalog bytes, indexes included."""
+    if Path(path).suffix == ".cat":
+        catalog = MappedCatalog.open(path)
+        compiled = bool(catalog.sections)
+        catalog.close()
+        if compiled:
+            return Path(path).read_bytes()
+    if kind == "quotes":
+        database, schema = QuoteDatabase(path), QUOTE_CATALOG_SCHEMA
+        records = database.get_all_quotes()
+    else:
+        database, schema = SongDatabase(path), SONG_CATALOG_SCHEMA
+        records = database.get_all_songs()
+    if not records:
+        # The databases swallow parse errors; never publish an empty catalog
+        raise ValueError(f"No {kind} could be loaded from {path}")
+    return encode_catalog((asdict(record) for record in records), schema, database.index_sections())
+
+
+class SharedCatalogLease:
+    """A worker's read-only attachment to one catalog generation."""
+
+    def __init__(self, registry: "SharedCatalogRegistry", generation: int,
+                 mappings: Dict[str, mmap.mmap], slot: int):
+        self.registry = registry
+        self.generation = generation
+        self.slot = slot
+        self.catalogs: Dict[str, MappedCatalog] = {
+            kind: MappedCatalog(mapping, owner=mapping) for kind, mapping in mappings.items()
+        }
+        self._released = False
+
+    def release(self):
+        """Drop this worker's reference; the last reference unlinks the segments.
+
+        Unlinking only removes the names, so catalogs still mapped here stay
+        readable until they are garbage collected.
+        """
+        if self._released:
+            return
+        self._released = True
+        self.registry._release(self.generation, self.slot)
+
+
+class SharedCatalogRegistry:
+    """Publishes and attaches shared catalog generations under a name prefix."""
+
+    def __init__(self, prefix: str = "emotion-catalog"):
+        """Prepare the lock file for the given segment name prefix."""
+        import fcntl  # noqa: F401  (fail early on hosts without flock)
+
+        if not os.path.isdir(SHM_DIR):
+            raise OSError(f"{SHM_DIR} is not available on this host")
+        self.prefix = prefix
+        self.lock_path = os.path.join(tempfile.gettempdir(), f"{prefix}.lock")
+
+    def segment_name(self, kind: str, generation: int) -> str:
+        """Segment name for one catalog of one generation."""
+        return f"{self.prefix}-{kind}-g{generation}"
+
+    @contextmanager
+    def _locked(self):
+        """Exclusive host-wide lock around control segment updates."""
+        import fcntl
+
+        with open(self.lock_path, "a+b") as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    @contextmanager
+    def _control(self):
+        """Open (creating if needed) the control segment; caller holds the lock."""
+        name = f"{self.prefix}-ctl"
+        try:
+            segment = _open_segment(name)
+        except FileNotFoundError:
+            segment = _open_segment(name, create=True, size=_CONTROL.size + _SLOT.size * _SLOTS)
+            segment.buf[:] = bytes(segment.size)
+        if segment.size < _CONTROL.size + _SLOT.size * _SLOTS:
+            segment.close()
+            raise OSError(f"Control segment {name} has an older layout; "
+                          f"destroy() the registry once its workers have stopped")
+        try:
+            yield segment.buf
+        finally:
+            segment.close()
+
+    @staticmethod
+    def _slots(buf) -> List[List[int]]:
+        return [list(_SLOT.unpack_from(buf, _CONTROL.size + i * _SLOT.size))
+                for i in range(_SLOTS)]
+
+    @staticmethod
+    def _store_slots(buf, slots: List[List[int]]):
+        for i, (generation, pid) in enumerate(slots):
+            _SLOT.pack_into(buf, _CONTROL.size + i * _SLOT.size, generation, pid)
+
+    @staticmethod
+    def _held(slots: List[List[int]], generation: int) -> bool:
+        return any(slot[0] == generation for slot in slots)
+
+    def attach(self, sources: Dict[str, str], source_digest: str) -> SharedCatalogLease:
+        """Attach the generation built from ``source_digest``, publishing it if needed.
+
+        ``sources`` maps ``quotes``/``songs`` to their source files. The
+        first worker to see new sources compiles and publishes them; the rest
+        just map the segments it created. Raises :class:`LeaseSlotsFull` if
+        no lease slot is free even after reaping dead workers.
+        """
+        digest = hashlib.sha256(source_digest.encode("utf-8")).digest()
+        with self._locked(), self._control() as buf:
+            generation, current_digest = _CONTROL.unpack_from(buf, 0)
+            slots = self._slots(buf)
+            try:
+                self._reap(slots, generation)
+                free = next((i for i, slot in enumerate(slots) if not slot[0]), None)
+                if free is None:
+                    raise LeaseSlotsFull(
+                        f"All {_SLOTS} shared catalog leases under {self.prefix!r} are held")
+                if generation == 0 or current_digest != digest:
+                    previous = generation
+                    generation = self._publish(generation + 1, sources)
+                    _CONTROL.pack_into(buf, 0, generation, digest)
+                    if previous and not self._held(slots, previous):
+                        self._unlink_generation(previous)
+
+                mappings = {kind: _map_read_only(self.segment_name(kind, generation))
+                            for kind in CATALOG_KINDS}
+                slots[free] = [generation, os.getpid()]
+            finally:
+                self._store_slots(buf, slots)
+        return SharedCatalogLease(self, generation, mappings, free)
+
+    def _publish(self, generation: int, sources: Dict[str, str]) -> int:
+        """Copy freshly compiled catalogs into new segments."""
+        for kind in CATALOG_KINDS:
+            data = _compile_source(kind, sources[kind])
+            name = self.segment_name(kind, generation)
+            _unlink_segment(name)  # left over from a crashed publisher
+            segment = _open_segment(name, create=True, size=len(data))
+            segment.buf[:len(data)] = data
+            segment.close()
+        return generation
+
+    def _reap(self, slots: List[List[int]], current: int):
+        """Free the slots of dead workers and unlink superseded generations
+        nobody holds anymore; call with the lock held."""
+        orphaned = set()
+        for slot in slots:
+            if slot[0] and not _alive(slot[1]):
+                orphaned.add(slot[0])
+                slot[0] = slot[1] = 0
+        for generation in orphaned:
+            if generation != current and not self._held(slots, generation):
+                self._unlink_generation(generation)
+
+    def _release(self, generation: int, slot: int):
+        """Free a lease's slot and unlink its generation once unused and superseded."""
+        with self._locked(), self._control() as buf:
+            current, _ = _CONTROL.unpack_from(buf, 0)
+            slots = self._slots(buf)
+            if slots[slot] == [generation, os.getpid()]:
+                slots[slot] = [0, 0]
+            if generation != current and not self._held(slots, generation):
+                self._unlink_generation(generation)
+            self._store_slots(buf, slots)
+
+    def _unlink_generation(self, generation: int):
+        for kind in CATALOG_KINDS:
+            _unlink_segment(self.segment_name(kind, generation))
+
+    def generation(self) -> int:
+        """Currently published generation (0 if nothing is published)."""
+        with self._locked(), self._control() as buf:
+            return _CONTROL.unpack_from(buf, 0)[0]
+
+    def holders(self) -> Dict[int, List[int]]:
+        """Pids holding each generation, dead workers included until reaped."""
+        with self._locked(), self._control() as buf:
+            held: Dict[int, List[int]] = {}
+            for generation, pid in self._slots(buf):
+                if generation:
+                    held.setdefault(generation, []).append(pid)
+            return held
+
+    def destroy(self):
+        """Unlink every segment under this prefix (operator cleanup).
+
+        Segments are found by name, so this also works on a control segment
+        of an older layout.
+        """
+        with self._locked():
+            for kind in CATALOG_KINDS:
+                for path in Path(SHM_DIR).glob(self.segment_name(kind, 0)[:-1] + "*"):
+                    if path.name.rpartition("-g")[2].isdigit():
+                        _unlink_segment(path.name)
+            _unlink_segment(f"{self.prefix}-ctl")
+
+
+def load_shared_snapshot(quotes_file: str, songs_file: str,
+                         registry: SharedCatalogRegistry, source_digest: str,
+                         version: int = 1) -> CatalogSnapshot:
+    """Snapshot whose databases read from shared-memory segments."""
+    lease = registry.attach({"quotes": quotes_file, "songs": songs_file}, source_digest)
+    quote_db = QuoteDatabase.from_catalog(lease.catalogs["quotes"])
+    song_db = SongDatabase.from_catalog(lease.catalogs["songs"])
+    return CatalogSnapshot(
+        quote_db=quote_db,
+        quote_matcher=QuoteMatcher(quote_db),
+        song_db=song_db,
+        song_matcher=SongMatcher(song_db),
+        version=version,
+        lease=lease,
+    )
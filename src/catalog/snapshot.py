@@ -0,0 +1,45 @@
+"""Immutable bundle of catalogs and matchers shared across sessions."""
+import time
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from src.music.database import SongDatabase
+from src.music.matcher import SongMatcher
+from src.quotes.database import QuoteDatabase
+from src.quotes.matcher import QuoteMatcher
+
+
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    """Loaded catalogs and their matchers.
+
+    Instances are shared by every session in the process, so nothing
+    reachable from a snapshot may be mutated after it is built. Per-user
+    state such as shown ids is passed into the matchers on each call.
+    """
+    quote_db: QuoteDatabase
+    quote_matcher: QuoteMatcher
+    song_db: SongDatabase
+    song_matcher: SongMatcher
+    version: int = 1
+    loaded_at: float = field(default_factory=time.time)
+    lease: Optional[Any] = None  # SharedCatalogLease when backed by shared memory
+
+    def item(self, kind: str, item_id: str) -> Optional[Any]:
+        """This snapshot's ``quote`` or ``song`` with the given id, if any."""
+        if kind == "quote":
+            return self.quote_db.get_quote_by_id(item_id)
+        return self.song_db.get_song_by_id(item_id)
+
+
+def load_snapshot(quotes_file: str, songs_file: str, version: int = 1) -> CatalogSnapshot:
+    """Load both catalogs and build their matchers."""
+    quote_db = QuoteDatabase(quotes_file)
+    song_db = SongDatabase(songs_file)
+    return CatalogSnapshot(
+        quote_db=quote_db,
+        quote_matcher=QuoteMatcher(quote_db),
+        song_db=song_db,
+        song_matcher=SongMatcher(song_db),
+        version=version,
+    )
@@ -1,4 +1,5 @@
 """Sentence transformation module."""
+from typing import Optional
 import aisuite as ai
 import os
 from config.settings import settings
@@ -39,10 +40,16 @@ evidence-based alternative perspective. Be gentle but clear. Under 100 words."""
             if api_key:
                 os.environ['OPENAI_API_KEY'] = api_key
     
-    def transform(self, original: str, emotion: str = "negative") -> str:
-        """Transform negative statement into positive perspective."""
+    def transform(self, original: str, emotion: str = "negative",
+                  style: Optional[str] = None) -> str:
+        """Transform negative statement into positive perspective.
+        
+        ``style`` overrides the instance default for this call only, so one
+        transformer can serve sessions with different style choices.
+        """
         # Get prompt template for style
-        prompt_template = self.STYLE_PROMPTS.get(self.style, self.STYLE_PROMPTS["gentle"])
+        style = style or self.style
+        prompt_template = self.STYLE_PROMPTS.get(style, self.STYLE_PROMPTS["gentle"])
         prompt = prompt_template.format(original=original, emotion=emotion)
         
         try:
@@ -1,4 +1,5 @@
 """Image module for comfort images and movie posters."""
 from .generator import ComfortImageGenerator, MoviePosterFetcher
+from .poster_cache import PosterCache
 
-__all__ = ['ComfortImageGenerator', 'MoviePosterFetcher']
+__all__ = ['ComfortImageGenerator', 'MoviePosterFetcher', 'PosterCache']
@@ -1,13 +1,24 @@
 """Image generation module for comfort images."""
-from typing import Optional
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+import time
 import urllib.parse
+import zlib
 import requests
+from requests.adapters import HTTPAdapter
+
+from .health import ProviderHealth, ProviderUnavailable
+from .poster_cache import PosterCache
+from .procedural import comfort_png
+
+TMDB_API_URL = "https://api.themoviedb.org/3"
+TMDB_IMAGE_BASE = "https://image.tmdb.org/t/p/w500"
 
 
 class ComfortImageGenerator:
-    """Generates comforting images based on emotions using Unsplash."""
+    """Generates comforting images based on emotions, rendered locally."""
     
-    # Mapping emotions to Unsplash search queries
+    # Mapping emotions to Unsplash search queries (the local palettes follow these themes)
     UNSPLASH_QUERIES = {
         "sadness": "peaceful,sunset,ocean,calm,hope",
         "anxiety": "forest,nature,calm,tranquil,peace",
@@ -25,111 +36,186 @@ class ComfortImageGenerator:
         # Client parameter kept for compatibility but not used
         pass
     
-    def generate_comfort_image(self, emotion: str) -> Optional[str]:
+    def generate_comfort_image(self, emotion: str, seed: int = 0) -> Optional[bytes]:
         """
-        Generate a comforting image URL based on emotion.
-        Returns Unsplash image URL.
+        Generate a comforting image based on emotion.
+        Returns PNG bytes, rendered locally and memoized per (emotion, seed).
         """
-        return self.get_fallback_image_url(emotion)
+        return comfort_png(emotion.lower(), seed)
     
     def get_fallback_image_url(self, emotion: str) -> str:
         """Get an image URL from Unsplash based on emotion."""
         query = self.UNSPLASH_QUERIES.get(emotion.lower(), self.UNSPLASH_QUERIES["neutral"])
         # Use Unsplash Source API for beautiful, curated images
-        # Adding a random seed based on emotion to get consistent but varied images
-        seed = hash(emotion) % 1000
+        # Seed derived from the emotion so the URL is the same in every process
+        seed = zlib.crc32(emotion.lower().encode("utf-8")) % 1000
         return f"https://source.unsplash.com/1024x768/?{query}&sig={seed}"
 
 
 class MoviePosterFetcher:
     """Fetches movie posters from TMDB (The Movie Database)."""
     
-    def __init__(self, api_key: Optional[str] = None):
-        """Initialize poster fetcher with optional TMDB API key."""
+    def __init__(self, api_key: Optional[str] = None, cache: Optional[PosterCache] = None,
+                 tmdb_base_url: str = TMDB_API_URL, max_workers: int = 8):
+        """Initialize poster fetcher with optional TMDB API key and shared cache."""
         self.api_key = api_key
-        self.tmdb_base_url = "https://api.themoviedb.org/3"
-        self.tmdb_image_base = "https://image.tmdb.org/t/p/w500"
+        self.cache = cache
+        self.tmdb_base_url = tmdb_base_url.rstrip("/")
+        self.tmdb_image_base = TMDB_IMAGE_BASE
+        # Keep-alive connections shared by all lookups, sized for the worker pool
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_maxsize=max_workers)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="posters")
+        # While a provider is down its lookups are skipped instead of timing out
+        self.health = {name: ProviderHealth(name) for name in ("tmdb", "movieofthenight")}
         
     def search_movie_poster(self, movie_title: str, year: Optional[int] = None) -> Optional[str]:
         """
         Search for movie poster URL using TMDB API.
         Returns poster URL or fallback if not found or API key missing.
+        Results (including "not found") are cached per (movie, year).
         """
-        if not self.api_key:
-            # Try OMDb API as fallback (free, no registration needed for basic use)
-            return self._search_omdb(movie_title, year)
-        
         try:
-            # Search for movie on TMDB
-            search_url = f"{self.tmdb_base_url}/search/movie"
-            params = {
-                "api_key": self.api_key,
-                "query": movie_title
-            }
-            if year:
-                params["year"] = year
-            
-            response = requests.get(search_url, params=params, timeout=5)
-            response.raise_for_status()
-            
-            data = response.json()
-            
-            if data.get("results") and len(data["results"]) > 0:
-                poster_path = data["results"][0].get("poster_path")
-                if poster_path:
-                    return f"{self.tmdb_image_base}{poster_path}"
-            
-            # If no poster found, try OMDb as fallback
-            return self._search_omdb(movie_title, year)
-            
-        except Exception as e:
-            print(f"Error fetching from TMDB: {e}")
-            return self._search_omdb(movie_title, year)
+            poster_url = self._cached_poster(movie_title, year)
+        except ProviderUnavailable:
+            poster_url = None
+        return poster_url or self.get_fallback_poster_url(movie_title)
+    
+    def resolve_posters(self, movies: Iterable[Tuple[str, Optional[int]]],
+                        timeout: float = 3.0) -> List[str]:
+        """
+        Poster URLs for many (movie, year) pairs, in order, within one deadline.
+        Uncached movies are looked up concurrently; any lookup still running
+        after ``timeout`` seconds gets a placeholder now and finishes in the
+        background, so its poster is cached for the next render.
+        """
+        movies = list(movies)
+        pending: Dict[Tuple[str, Optional[int]], Future] = {}
+        for movie, year in movies:
+            if (movie, year) in pending:
+                continue
+            if self.cache is not None and self.cache.contains(movie, year):
+                continue
+            pending[(movie, year)] = self._executor.submit(self._cached_poster, movie, year)
+        if pending:
+            wait(pending.values(), timeout=timeout)
+        
+        poster_urls = []
+        for movie, year in movies:
+            future = pending.get((movie, year))
+            if future is None:
+                poster_url = self.cache.get(movie, year)
+            elif future.done() and future.exception() is None:
+                poster_url = future.result()
+            else:
+                poster_url = None
+            poster_urls.append(poster_url or self.get_fallback_poster_url(movie))
+        return poster_urls
+    
+    def _cached_poster(self, movie_title: str, year: Optional[int] = None) -> Optional[str]:
+        """Poster URL from the cache or the network; None if there is none.
+        Raises ProviderUnavailable (and caches nothing) if a provider is down."""
+        if self.cache is None:
+            return self._find_poster(movie_title, year)
+        return self.cache.get_or_fetch(
+            movie_title, year, lambda: self._find_poster(movie_title, year))
     
-    def _search_omdb(self, movie_title: str, year: Optional[int] = None) -> str:
+    def _find_poster(self, movie_title: str, year: Optional[int] = None) -> Optional[str]:
         """
-        Search OMDb API for movie poster.
-        Note: OMDb now requires personal API key, so we'll use fallback with movie poster image search.
+        Look the poster up over the network, trying each provider in turn.
+        Returns None only if every provider answered without a poster; raises
+        ProviderUnavailable if one failed or was skipped, so that the miss is
+        not cached as "not found".
         """
+        providers = [("movieofthenight", self._search_tmdb_public)]
+        if self.api_key:
+            providers.insert(0, ("tmdb", self._search_tmdb))
+        
+        unavailable = None
+        for name, search in providers:
+            try:
+                poster_url = self._call_provider(name, search, movie_title, year)
+            except ProviderUnavailable as e:
+                unavailable = e
+                continue
+            if poster_url:
+                return poster_url
+        if unavailable is not None:
+            raise unavailable
+        return None
+    
+    def _call_provider(self, name: str, search: Callable[[str, Optional[int]], Optional[str]],
+                       movie_title: str, year: Optional[int]) -> Optional[str]:
+        """Run one provider lookup through its circuit breaker."""
+        health = self.health[name]
+        if not health.allow():
+            raise ProviderUnavailable(f"{name} is temporarily skipped")
+        started = time.monotonic()
+        ok = False
         try:
-            # Try with a working OMDb API key if user has one
-            # For demo, we'll go straight to fallback with a movie-themed image
-            
-            # Use a movie poster search from a different source
-            # TMDb has a public image CDN we can use for common movies
-            return self._search_tmdb_public(movie_title, year)
-            
+            poster_url = search(movie_title, year)
+            ok = True
         except Exception as e:
-            print(f"Error fetching from OMDb: {e}")
-            return self.get_fallback_poster_url(movie_title)
+            print(f"Error fetching poster from {name}: {e}")
+            raise ProviderUnavailable(f"{name}: {e}") from e
+        finally:
+            # Always report back, or a half-open breaker would wait on its probe forever
+            health.record(ok, time.monotonic() - started)
+        return poster_url
+    
+    def provider_health(self) -> Dict[str, Dict[str, Any]]:
+        """State, error rate and latency of each poster provider."""
+        return {name: health.snapshot() for name, health in self.health.items()}
+    
+    def _search_tmdb(self, movie_title: str, year: Optional[int] = None) -> Optional[str]:
+        """Search TMDB (needs an API key) for the movie's poster."""
+        search_url = f"{self.tmdb_base_url}/search/movie"
+        params = {
+            "api_key": self.api_key,
+            "query": movie_title
+        }
+        if year:
+            params["year"] = year
+        
+        response = self.session.get(search_url, params=params, timeout=5)
+        response.raise_for_status()
+        
+        data = response.json()
+        results = data.get("results") if isinstance(data, dict) else None
+        if not isinstance(results, list) or not all(isinstance(r, dict) for r in results[:1]):
+            raise ValueError(f"Unexpected TMDB search response: {str(data)[:80]}")
+        if results:
+            poster_path = results[0].get("poster_path")
+            if poster_path and isinstance(poster_path, str):
+                return f"{self.tmdb_image_base}{poster_path}"
+        return None
     
-    def _search_tmdb_public(self, movie_title: str, year: Optional[int] = None) -> str:
+    def _search_tmdb_public(self, movie_title: str, year: Optional[int] = None) -> Optional[str]:
         """
-        Try to fetch movie poster from TMDb without API key using title-based URL.
+        Try the free Movie of the Night API (no key needed).
         This is a workaround for demo purposes.
         """
-        # For well-known movies, we can construct poster URLs
-        # Otherwise fallback to a nice placeholder
+        api_url = "https://api.movieofthenight.com/api/v1/movies/search"
+        params = {"title": movie_title}
         
-        # Clean movie title for URL
-        clean_title = movie_title.lower().replace(" ", "-").replace(":", "").replace("'", "")
-        
-        # Try IMDb poster proxy (free service)
-        try:
-            # Use Movie of the Night API (free, no key needed)
-            api_url = f"https://api.movieofthenight.com/api/v1/movies/search"
-            params = {"title": movie_title}
-            
-            response = requests.get(api_url, params=params, timeout=3)
-            if response.status_code == 200:
-                data = response.json()
-                if data and len(data) > 0 and "posterUrl" in data[0]:
-                    return data[0]["posterUrl"]
-        except:
-            pass
+        response = self.session.get(api_url, params=params, timeout=3)
+        # Only a 404 or a successful search is an answer; rate limiting, auth
+        # and server errors raise so that they are not cached as "not found"
+        if response.status_code == 404:
+            return None
+        if response.status_code != 200:
+            raise requests.HTTPError(
+                f"{response.status_code} from {api_url}", response=response)
+        data = response.json()
+        if not isinstance(data, list) or not all(isinstance(m, dict) for m in data[:1]):
+            raise ValueError(f"Unexpected movie search response: {str(data)[:80]}")
+        if data and isinstance(data[0].get("posterUrl"), str):
+            return data[0]["posterUrl"]
         
-        # Fallback to styled placeholder
-        return self.get_fallback_poster_url(movie_title)
+        # Not found; the caller falls back to a styled placeholder
+        return None
     
     def get_fallback_poster_url(self, movie_title: str) -> str:
         """Get a fallback image with movie-themed aesthetic."""
@@ -0,0 +1,103 @@
+"""Health tracking and circuit breaking for external image providers.
+
+Each provider keeps a rolling window of recent calls. When enough of them
+fail (errors, or calls slower than ``slow_call_seconds``) the breaker opens
+and the provider is skipped without any network I/O. After ``cooldown``
+seconds it goes half-open and lets a single probe through: success closes
+the breaker, failure opens it again.
+"""
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+
+class ProviderUnavailable(Exception):
+    """A provider failed or was skipped because its breaker is open."""
+
+
+class ProviderHealth:
+    """Rolling error rate/latency and circuit breaker for one provider."""
+
+    def __init__(self, name: str, window: int = 20, min_calls: int = 5,
+                 failure_threshold: float = 0.5, slow_call_seconds: float = 2.0,
+                 cooldown: float = 30.0):
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_threshold = failure_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._calls: Deque[Tuple[bool, float]] = deque(maxlen=window)  # (ok, latency)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._refresh(time.monotonic())
+            return self._state
+
+    def _refresh(self, now: float):
+        if self._state == OPEN and now - self._opened_at >= self.cooldown:
+            self._state = HALF_OPEN
+            self._probing = False
+
+    def allow(self) -> bool:
+        """Whether a call may go out now (one probe at a time when half-open)."""
+        with self._lock:
+            self._refresh(time.monotonic())
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record(self, ok: bool, latency: float):
+        """Record the outcome of a call that :meth:`allow` let through."""
+        # A success that took too long still counts against the provider
+        failed = not ok or latency > self.slow_call_seconds
+        with self._lock:
+            self._calls.append((ok, latency))
+            if self._state == HALF_OPEN:
+                self._probing = False
+                if failed:
+                    self._open()
+                else:
+                    self._state = CLOSED
+                    self._calls.clear()
+                return
+            if self._state == CLOSED and len(self._calls) >= self.min_calls:
+                failures = sum(1 for ok, latency in self._calls
+                               if not ok or latency > self.slow_call_seconds)
+                if failures / len(self._calls) >= self.failure_threshold:
+                    self._open()
+
+    def _open(self):
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        print(f"Poster provider {self.name} is failing; skipping it for {self.cooldown:.0f}s")
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current state, error rate and latency for monitoring."""
+        with self._lock:
+            self._refresh(time.monotonic())
+            calls = list(self._calls)
+            latencies = sorted(latency for _, latency in calls)
+            retry_in: Optional[float] = None
+            if self._state == OPEN:
+                retry_in = max(0.0, self.cooldown - (time.monotonic() - self._opened_at))
+            return {
+                "state": self._state,
+                "calls": len(calls),
+                "error_rate": sum(1 for ok, _ in calls if not ok) / len(calls) if calls else 0.0,
+                "mean_latency": sum(latencies) / len(latencies) if latencies else None,
+                "p95_latency": latencies[int(len(latencies) * 0.95)] if latencies else None,
+                "retry_in": retry_in,
+            }
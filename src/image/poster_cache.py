@@ -0,0 +1,135 @@
+"""Poster URL cache shared by all sessions.
+
+Lookups are keyed by ``(movie, year)``. Results live in an in-memory LRU
+backed by a small SQLite file, so they survive restarts. Found posters and
+"not found" results expire on separate TTLs, so a missing poster is retried
+now and then without being looked up on every render. Concurrent lookups of
+the same movie share one fetch.
+"""
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+Key = Tuple[str, int]
+_ABSENT = object()
+
+
+class PosterCache:
+    """LRU + SQLite cache of poster URLs with negative caching."""
+
+    def __init__(self, path: Optional[str] = None, max_entries: int = 2048,
+                 hit_ttl: float = 30 * 86400, miss_ttl: float = 86400):
+        self.max_entries = max_entries
+        self.hit_ttl = hit_ttl
+        self.miss_ttl = miss_ttl
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[Key, Tuple[Optional[str], float]]" = OrderedDict()
+        self._inflight: Dict[Key, threading.Event] = {}
+        self.hits = 0
+        self.fetches = 0
+        self._db = None
+        if path:
+            try:
+                Path(path).parent.mkdir(parents=True, exist_ok=True)
+                self._db = sqlite3.connect(path, check_same_thread=False)
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS posters ("
+                    "movie TEXT NOT NULL, year INTEGER NOT NULL, url TEXT, "
+                    "expires REAL NOT NULL, PRIMARY KEY (movie, year))")
+                self._db.commit()
+            except sqlite3.Error as e:
+                print(f"Poster cache disabled on disk ({path}): {e}")
+                self._db = None
+
+    @staticmethod
+    def key(movie: str, year: Optional[int]) -> Key:
+        return (movie.strip().lower(), int(year or 0))
+
+    def _lookup(self, key: Key, now: float):
+        """Cached URL (``None`` for a cached miss) or ``_ABSENT``; call under the lock."""
+        entry = self._memory.get(key)
+        if entry is not None:
+            if entry[1] > now:
+                self._memory.move_to_end(key)
+                return entry[0]
+            del self._memory[key]
+
+        if self._db is not None:
+            try:
+                row = self._db.execute(
+                    "SELECT url, expires FROM posters WHERE movie = ? AND year = ?", key).fetchone()
+            except sqlite3.Error as e:
+                print(f"Error reading poster cache: {e}")
+                row = None
+            if row is not None and row[1] > now:
+                self._remember(key, row[0], row[1])
+                return row[0]
+        return _ABSENT
+
+    def _remember(self, key: Key, url: Optional[str], expires: float):
+        self._memory[key] = (url, expires)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, movie: str, year: Optional[int]) -> Optional[str]:
+        """Cached URL without fetching; ``None`` for a miss or a cached "not found"."""
+        with self._lock:
+            url = self._lookup(self.key(movie, year), time.time())
+        return None if url is _ABSENT else url
+
+    def contains(self, movie: str, year: Optional[int]) -> bool:
+        """Whether a fresh result (found or not) is cached."""
+        with self._lock:
+            return self._lookup(self.key(movie, year), time.time()) is not _ABSENT
+
+    def put(self, movie: str, year: Optional[int], url: Optional[str]):
+        """Store a result; ``None`` records "not found" for ``miss_ttl``."""
+        key = self.key(movie, year)
+        expires = time.time() + (self.hit_ttl if url else self.miss_ttl)
+        with self._lock:
+            self._remember(key, url, expires)
+            if self._db is not None:
+                try:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO posters (movie, year, url, expires) "
+                        "VALUES (?, ?, ?, ?)", (*key, url, expires))
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    print(f"Error writing poster cache: {e}")
+
+    def get_or_fetch(self, movie: str, year: Optional[int],
+                     fetch: Callable[[], Optional[str]]) -> Optional[str]:
+        """Cached URL, or the result of ``fetch()`` which is then cached.
+
+        While one caller fetches a movie, other callers for the same movie
+        wait for its result instead of fetching again. Only a returned value
+        is cached: if ``fetch()`` raises (a provider failed rather than
+        answering), nothing is stored and a waiting caller fetches instead.
+        """
+        key = self.key(movie, year)
+        while True:
+            with self._lock:
+                url = self._lookup(key, time.time())
+                if url is not _ABSENT:
+                    self.hits += 1
+                    return url
+                waiting = self._inflight.get(key)
+                if waiting is None:
+                    done = self._inflight[key] = threading.Event()
+                    self.fetches += 1
+                    break
+            # If the other fetch failed the loop takes over the fetch
+            waiting.wait()
+
+        try:
+            url = fetch()
+            self.put(movie, year, url)
+            return url
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            done.set()
@@ -0,0 +1,113 @@
+"""Procedural comfort images rendered locally with NumPy.
+
+Each emotion has a palette in the spirit of its Unsplash theme (ocean
+sunset for sadness, forest for anxiety, ...). A scene is a sky gradient, a
+soft sun or moon glow, a few floating light circles and layered rolling
+hills. The randomness comes from a generator seeded by ``(emotion, seed)``,
+so the same pair always gives the same picture, and encoded PNGs are
+memoized.
+"""
+import struct
+import zlib
+from functools import lru_cache
+from typing import Dict, Tuple
+
+import numpy as np
+
+# sky top, sky bottom, glow, hills (far to near)
+PALETTES: Dict[str, Dict[str, object]] = {
+    "sadness": {"sky": ((44, 62, 112), (247, 166, 120)), "glow": (255, 214, 150),
+                "hills": ((70, 96, 140), (43, 66, 110), (26, 44, 82))},
+    "anxiety": {"sky": ((150, 196, 180), (226, 240, 214)), "glow": (255, 250, 220),
+                "hills": ((96, 150, 110), (58, 112, 78), (32, 78, 54))},
+    "anger": {"sky": ((120, 156, 190), (214, 228, 236)), "glow": (240, 248, 255),
+              "hills": ((128, 140, 160), (88, 102, 126), (54, 70, 92))},
+    "loneliness": {"sky": ((94, 64, 88), (248, 190, 132)), "glow": (255, 226, 170),
+                   "hills": ((150, 96, 86), (112, 68, 66), (72, 44, 50))},
+    "disappointment": {"sky": ((126, 150, 210), (255, 206, 168)), "glow": (255, 236, 180),
+                       "hills": ((168, 140, 170), (122, 104, 140), (84, 72, 108))},
+    "fear": {"sky": ((60, 52, 96), (236, 170, 120)), "glow": (255, 210, 140),
+             "hills": ((110, 82, 104), (80, 58, 84), (50, 36, 60))},
+    "frustration": {"sky": ((190, 206, 196), (240, 236, 220)), "glow": (255, 252, 236),
+                    "hills": ((150, 170, 146), (118, 140, 116), (86, 108, 88))},
+    "joy": {"sky": ((120, 200, 250), (255, 236, 170)), "glow": (255, 246, 190),
+            "hills": ((150, 210, 120), (246, 160, 186), (92, 170, 90))},
+    "neutral": {"sky": ((150, 186, 214), (232, 236, 226)), "glow": (255, 250, 236),
+                "hills": ((138, 164, 150), (102, 132, 118), (70, 100, 88))},
+}
+
+
+def _encode_png(pixels: np.ndarray) -> bytes:
+    """Encode an ``(h, w, 3)`` uint8 array as an RGB PNG."""
+    height, width, _ = pixels.shape
+    # Each scanline is prefixed with filter type 0 (None)
+    raw = np.zeros((height, width * 3 + 1), dtype=np.uint8)
+    raw[:, 1:] = pixels.reshape(height, width * 3)
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return (struct.pack(">I", len(data)) + kind + data
+                + struct.pack(">I", zlib.crc32(kind + data)))
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header)
+            + chunk(b"IDAT", zlib.compress(raw.tobytes(), 6)) + chunk(b"IEND", b""))
+
+
+def render_comfort_scene(emotion: str, seed: int = 0,
+                         size: Tuple[int, int] = (800, 600)) -> np.ndarray:
+    """Render the scene for ``(emotion, seed)`` as a ``(h, w, 3)`` uint8 array."""
+    palette = PALETTES.get(emotion.lower(), PALETTES["neutral"])
+    rng = np.random.default_rng(zlib.crc32(f"{emotion.lower()}:{seed}".encode("utf-8")))
+    width, height = size
+    y = np.linspace(0.0, 1.0, height, dtype=np.float32)[:, None]
+    x = np.linspace(0.0, 1.0, width, dtype=np.float32)[None, :]
+    aspect = width / height
+
+    top, bottom = (np.array(c, dtype=np.float32) for c in palette["sky"])
+    image = np.empty((height, width, 3), dtype=np.float32)
+    image[:] = (top + (bottom - top) * (y ** 0.8)[..., None])
+
+    def blend_disc(cx: float, cy: float, reach: float, alpha_at) -> None:
+        """Blend the glow color in, touching only the disc's bounding box."""
+        rows = slice(max(0, int((cy - reach) * height)), min(height, int((cy + reach) * height) + 1))
+        cols = slice(max(0, int((cx - reach / aspect) * width)),
+                     min(width, int((cx + reach / aspect) * width) + 1))
+        distance = np.sqrt(((x[:, cols] - cx) * aspect) ** 2 + (y[rows] - cy) ** 2)
+        patch = image[rows, cols]
+        patch += (glow - patch) * np.clip(alpha_at(distance), 0, 1)[..., None]
+
+    # Sun/moon glow: bright disc with a soft halo (negligible beyond 7.5 radii)
+    glow = np.array(palette["glow"], dtype=np.float32)
+    cx, cy = rng.uniform(0.2, 0.8), rng.uniform(0.25, 0.45)
+    radius = rng.uniform(0.06, 0.1)
+    blend_disc(cx, cy, 7.5 * radius, lambda d: np.clip(1.0 - d / radius, 0, 1) ** 0.3
+               + 0.5 * np.exp(-(d / (3 * radius)) ** 2))
+
+    # Floating light circles (bokeh)
+    for _ in range(rng.integers(6, 12)):
+        bx, by = rng.uniform(0, 1), rng.uniform(0, 0.6)
+        r = rng.uniform(0.01, 0.04)
+        blend_disc(bx, by, r, lambda d, r=r: 0.25 * np.clip(1.0 - d / r, 0, 1) ** 0.5)
+
+    # Rolling hills, far to near, each a sum of two sine waves
+    hills = palette["hills"]
+    for layer, color in enumerate(hills):
+        base = 0.62 + 0.1 * layer
+        phase1, phase2 = rng.uniform(0, 2 * np.pi, 2)
+        ridge = (base
+                 + 0.05 * np.sin(2 * np.pi * rng.uniform(0.6, 1.4) * x + phase1)
+                 + 0.02 * np.sin(2 * np.pi * rng.uniform(2.0, 4.0) * x + phase2))
+        # Only rows below the ridge's highest point change; the edge is
+        # anti-aliased over about one pixel
+        rows = slice(max(0, int((base - 0.07) * height) - 1), height)
+        coverage = np.clip((y[rows] - ridge) * height + 0.5, 0, 1)
+        shade = np.array(color, dtype=np.float32) * (1.0 - 0.15 * (y[rows] - base).clip(0, 1))[..., None]
+        image[rows] += (shade - image[rows]) * coverage[..., None]
+
+    return np.clip(image, 0, 255).astype(np.uint8)
+
+
+@lru_cache(maxsize=64)
+def comfort_png(emotion: str, seed: int = 0, size: Tuple[int, int] = (800, 600)) -> bytes:
+    """PNG bytes of the comfort scene for ``(emotion, seed)``, memoized."""
+    return _encode_png(render_comfort_scene(emotion, seed, size))
@@ -0,0 +1,249 @@
+"""Local image proxy for posters and comfort images.
+
+Each remote image is downloaded once, shrunk to a display-size JPEG and kept
+in a content-addressed disk cache (``<root>/<digest[:2]>/<digest>.jpg``), so
+identical thumbnails from different URLs are stored once. A small SQLite
+index maps ``(url, variant)`` to a digest and tracks last access; once the
+cache is over its byte budget the least recently used thumbnails are
+deleted. Thumbnails are small, so they are read back with plain file reads
+and handed to ``st.image`` as bytes.
+
+Renders use :meth:`ImageStore.get_cached`, which never touches the network:
+a miss starts the download in the background and the caller shows the
+remote URL meanwhile. Reads don't write to the index either; last-access
+times are kept in memory and written in batches.
+"""
+import hashlib
+import io
+import sqlite3
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import requests
+
+try:
+    from PIL import Image
+except ImportError:  # the store is disabled without Pillow
+    Image = None
+
+# Display sizes (width, height) the thumbnails are fitted into
+VARIANTS: Dict[str, Tuple[int, int]] = {
+    "poster": (400, 600),
+    "comfort": (1024, 768),
+}
+MAX_DOWNLOAD_BYTES = 10 * 1024 * 1024
+FAILURE_RETRY_SECONDS = 300  # don't retry a failed download on every render
+ACCESS_FLUSH_SECONDS = 60  # how stale the stored last-access times may get
+# Generated placeholders are cheap to fetch remotely and not worth a thumbnail
+PLACEHOLDER_HOSTS = frozenset({"placehold.co"})
+
+
+class ImageStore:
+    """Downloads, thumbnails and caches images on local disk."""
+
+    def __init__(self, root: str, max_bytes: int = 200 * 1024 * 1024,
+                 session: Optional[requests.Session] = None, timeout: float = 5.0,
+                 max_workers: int = 4):
+        if Image is None:
+            raise ImportError("ImageStore needs Pillow (pip install pillow)")
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.session = session or requests.Session()
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._inflight: Dict[Tuple[str, str], threading.Event] = {}
+        self._failed: Dict[Tuple[str, str], float] = {}
+        self._accessed: Dict[str, float] = {}  # digest -> last access, not yet stored
+        self._flushed_at = time.monotonic()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="images")
+        self._db = sqlite3.connect(str(self.root / "index.sqlite3"), check_same_thread=False)
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS urls ("
+            "  url TEXT NOT NULL, variant TEXT NOT NULL, digest TEXT NOT NULL,"
+            "  PRIMARY KEY (url, variant));"
+            "CREATE TABLE IF NOT EXISTS blobs ("
+            "  digest TEXT PRIMARY KEY, size INTEGER NOT NULL, accessed REAL NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS blobs_accessed ON blobs (accessed);")
+        self._db.commit()
+        self.total_bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+
+    def _path(self, digest: str) -> Path:
+        return self.root / digest[:2] / f"{digest}.jpg"
+
+    @staticmethod
+    def storable(url: str) -> bool:
+        """Whether ``url`` is worth a local thumbnail (not a placeholder)."""
+        return urllib.parse.urlsplit(url).hostname not in PLACEHOLDER_HOSTS
+
+    def _digest(self, url: str, variant: str) -> Optional[str]:
+        """Digest of the stored thumbnail, if any; call under the lock."""
+        row = self._db.execute(
+            "SELECT digest FROM urls WHERE url = ? AND variant = ?", (url, variant)).fetchone()
+        return row[0] if row else None
+
+    def _stored(self, url: str, variant: str) -> Optional[bytes]:
+        """Thumbnail bytes if stored.
+
+        Only the index lookup holds the lock; the file is read outside it,
+        so a slow disk read does not block other lookups.
+        """
+        with self._lock:
+            digest = self._digest(url, variant)
+            if digest is None:
+                return None
+            self._accessed[digest] = time.time()
+            if time.monotonic() - self._flushed_at >= ACCESS_FLUSH_SECONDS:
+                self._store_access()
+                self._db.commit()
+        try:
+            return self._path(digest).read_bytes()
+        except FileNotFoundError:
+            with self._lock:
+                self._forget(digest)
+            return None
+
+    def _forget(self, digest: str):
+        """Drop a thumbnail whose file is gone (e.g. evicted meanwhile); call under the lock."""
+        if self._path(digest).exists():
+            return  # stored again since
+        self._accessed.pop(digest, None)
+        row = self._db.execute("SELECT size FROM blobs WHERE digest = ?", (digest,)).fetchone()
+        if row is not None:
+            self.total_bytes -= row[0]
+        self._db.execute("DELETE FROM urls WHERE digest = ?", (digest,))
+        self._db.execute("DELETE FROM blobs WHERE digest = ?", (digest,))
+        self._db.commit()
+
+    def _store_access(self):
+        """Write the pending last-access times (uncommitted); call under the lock."""
+        if self._accessed:
+            self._db.executemany("UPDATE blobs SET accessed = ? WHERE digest = ?",
+                                 [(accessed, digest) for digest, accessed in self._accessed.items()])
+            self._accessed.clear()
+        self._flushed_at = time.monotonic()
+
+    def _recently_failed(self, key: Tuple[str, str]) -> bool:
+        return time.monotonic() - self._failed.get(key, -FAILURE_RETRY_SECONDS) < FAILURE_RETRY_SECONDS
+
+    def get_cached(self, url: str, variant: str = "poster") -> Optional[bytes]:
+        """Stored thumbnail bytes for ``url``, or None without waiting.
+
+        A miss starts downloading the image in the background, so a later
+        render finds it; meanwhile callers fall back to the remote URL.
+        """
+        if not self.storable(url):
+            return None
+        data = self._stored(url, variant)
+        if data is not None:
+            return data
+        key = (url, variant)
+        with self._lock:
+            if (key in self._inflight or self._recently_failed(key)
+                    or self._digest(url, variant) is not None):
+                return None
+            done = self._inflight[key] = threading.Event()
+        self._executor.submit(self._fill, url, variant, done)
+        return None
+
+    def get(self, url: str, variant: str = "poster") -> Optional[bytes]:
+        """JPEG thumbnail bytes for ``url``, downloading it on first use.
+
+        Blocks while downloading. Returns None if the image cannot be fetched
+        or decoded; callers can then fall back to the remote URL.
+        """
+        if not self.storable(url):
+            return None
+        key = (url, variant)
+        while True:
+            data = self._stored(url, variant)
+            if data is not None:
+                return data
+            with self._lock:
+                if self._recently_failed(key):
+                    return None
+                waiting = self._inflight.get(key)
+                if waiting is None:
+                    if self._digest(url, variant) is not None:
+                        continue  # stored since the lookup above
+                    done = self._inflight[key] = threading.Event()
+                    break
+            waiting.wait()
+        return self._fill(url, variant, done)
+
+    def _fill(self, url: str, variant: str, done: threading.Event) -> Optional[bytes]:
+        """Download and store one thumbnail, then wake callers waiting on ``done``."""
+        key = (url, variant)
+        try:
+            data = self._thumbnail(self._download(url), VARIANTS[variant])
+            self._put(url, variant, data)
+            return data
+        except (requests.RequestException, OSError, ValueError) as e:
+            print(f"Error caching image {url}: {e}")
+            with self._lock:
+                self._failed[key] = time.monotonic()
+            return None
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            done.set()
+
+    def _download(self, url: str) -> bytes:
+        with self.session.get(url, timeout=self.timeout, stream=True) as response:
+            response.raise_for_status()
+            chunks = []
+            size = 0
+            for chunk in response.iter_content(64 * 1024):
+                size += len(chunk)
+                if size > MAX_DOWNLOAD_BYTES:
+                    raise ValueError("image is too large")
+                chunks.append(chunk)
+        return b"".join(chunks)
+
+    @staticmethod
+    def _thumbnail(data: bytes, size: Tuple[int, int]) -> bytes:
+        """Re-encode as an RGB JPEG no larger than ``size``."""
+        with Image.open(io.BytesIO(data)) as image:
+            image = image.convert("RGB")
+            image.thumbnail(size)
+            out = io.BytesIO()
+            image.save(out, format="JPEG", quality=85, optimize=True)
+        return out.getvalue()
+
+    def _put(self, url: str, variant: str, data: bytes):
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._path(digest)
+        with self._lock:
+            known = self._db.execute("SELECT 1 FROM blobs WHERE digest = ?", (digest,)).fetchone()
+            if known is None or not path.exists():
+                path.parent.mkdir(exist_ok=True)
+                tmp_path = path.with_suffix(".tmp")
+                tmp_path.write_bytes(data)
+                tmp_path.replace(path)
+                if known is None:
+                    self.total_bytes += len(data)
+            self._db.execute("INSERT OR REPLACE INTO blobs (digest, size, accessed) VALUES (?, ?, ?)",
+                             (digest, len(data), time.time()))
+            self._db.execute("INSERT OR REPLACE INTO urls (url, variant, digest) VALUES (?, ?, ?)",
+                             (url, variant, digest))
+            self._store_access()  # eviction goes by the stored access times
+            self._evict()
+            self._db.commit()
+
+    def _evict(self):
+        """Drop least recently used thumbnails until under budget; call under the lock."""
+        if self.total_bytes <= self.max_bytes:
+            return
+        for digest, size in self._db.execute(
+                "SELECT digest, size FROM blobs ORDER BY accessed").fetchall():
+            if self.total_bytes <= self.max_bytes:
+                break
+            self._path(digest).unlink(missing_ok=True)
+            self._accessed.pop(digest, None)
+            self._db.execute("DELETE FROM urls WHERE digest = ?", (digest,))
+            self._db.execute("DELETE FROM blobs WHERE digest = ?", (digest,))
+            self.total_bytes -= size
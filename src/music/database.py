@@ -1,8 +1,19 @@
 """Song database module for music recommendations."""
-import json
 from dataclasses import dataclass
-from typing import List, Optional
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Set, Tuple
 from pathlib import Path
+import numpy as np
+from src.catalog.loader import LoadReport, iter_catalog_items, validate_item
+from src.catalog.mapped import LazyRecord, MappedCatalog, bind_records, read_field
+from src.search.bm25 import BM25Builder, BM25Index
+from src.search.embedding import EmbeddingBuilder, EmbeddingIndex
+from src.search.fields import FieldIndex, FieldIndexBuilder, Query, where
+from src.search.packed import StringIds, StringTable, with_prefix
+from src.search.tags import TagMatrix, TagMatrixBuilder
+from src.search.trigram import TrigramIndex, TrigramIndexBuilder
+
+CATALOG_SUFFIX = ".cat"
+ANN_SUFFIX = ".ivf.npz"  # ANN index next to a catalog compiled without its indexes
 
 
 @dataclass
@@ -20,61 +31,260 @@ class Song:
     why_it_helps: str
 
 
+SONG_CATALOG_SCHEMA = {
+    "id": "str",
+    "title": "str",
+    "artist": "str",
+    "emotions": "list",
+    "theme": "str",
+    "genre": "str",
+    "year": "int",
+    "spotify_url": "str",
+    "youtube_url": "str",
+    "why_it_helps": "str",
+}
+
+
+# Fields with secondary indexes for select()/where()
+SONG_INDEXED_FIELDS = ("artist", "genre", "emotions", "year")
+
+# Catalog kind of each indexed field
+SONG_INDEX_KINDS = {name: SONG_CATALOG_SCHEMA[name] for name in SONG_INDEXED_FIELDS}
+
+# Fields searchable by (fuzzy) name with lookup()/autocomplete()
+SONG_NAME_FIELDS = ("title", "artist")
+
+
+class MappedSong(LazyRecord, Song):
+    """Song whose fields are decoded from a memory-mapped catalog on access."""
+
+
 class SongDatabase:
     """Manages songs database."""
     
     def __init__(self, songs_file: str):
-        """Load songs from JSON file."""
-        self.songs: List[Song] = []
-        self._load_songs(songs_file)
-        self._index_by_emotion()
+        """Load songs from a JSON/JSON Lines file or a memory-mapped ``.cat`` catalog."""
+        self._reset(str(songs_file))
+        if Path(songs_file).suffix == CATALOG_SUFFIX:
+            self._open_catalog(songs_file)
+        else:
+            self._load_songs(songs_file)
+        self._finish_indexes()
+    
+    @classmethod
+    def from_catalog(cls, catalog: MappedCatalog) -> "SongDatabase":
+        """Build a database over an already mapped catalog (e.g. shared memory)."""
+        database = cls.__new__(cls)
+        database._reset("<mapped>")
+        database._attach_catalog(catalog)
+        database._finish_indexes()
+        return database
+    
+    @classmethod
+    def from_records(cls, records: Iterable[Dict[str, Any]]) -> "SongDatabase":
+        """Build a database from already validated song dicts (e.g. to recompile a catalog)."""
+        database = cls.__new__(cls)
+        database._reset("<records>")
+        for record in records:
+            database._add_song(Song(**record))
+        database.load_report.loaded = len(database.songs)
+        database._finish_indexes()
+        return database
+    
+    def _reset(self, source: str):
+        """Start with empty songs and indexes."""
+        self.songs: Sequence[Song] = []
+        self.id_index: Mapping[str, int] = {}  # id -> row in self.songs
+        self.catalog: Optional[MappedCatalog] = None
+        self.load_report = LoadReport(source)
+        self.text_index: Optional[BM25Index] = None
+        self.embeddings: Optional[EmbeddingIndex] = None
+        self.tag_matrix: Optional[TagMatrix] = None
+        self.fields: Optional[FieldIndex] = None
+        self.names: Optional[TrigramIndex] = None
+        self._text_builder = BM25Builder()
+        self._embedding_builder = EmbeddingBuilder()
+        self._tag_builder = TagMatrixBuilder()
+        self._name_builder = TrigramIndexBuilder()
+        self._field_builder = FieldIndexBuilder(SONG_INDEX_KINDS)
+        self._ann_file: Optional[str] = None
+        self._ann_digest = ""
+    
+    def _open_catalog(self, catalog_file: str):
+        """Map a compiled catalog; long text and URLs are decoded only when read."""
+        try:
+            self._attach_catalog(MappedCatalog.open(catalog_file))
+            if self.text_index is None:
+                self._ann_file = str(Path(catalog_file).with_suffix(ANN_SUFFIX))
+                self._ann_digest = self.catalog.digest
+            print(f"Mapped {len(self.songs)} songs from catalog")
+        except Exception as e:
+            print(f"Error opening songs catalog: {e}")
+    
+    def _attach_catalog(self, catalog: MappedCatalog):
+        """Rows of a mapped catalog, bound as lazy records on access, plus its indexes.
+        
+        Catalogs compiled with their indexes are used as they are; older
+        catalogs are indexed here, which decodes every record.
+        """
+        self.catalog = catalog
+        if "ids.offsets" in catalog.sections:
+            self.songs = bind_records(MappedSong, catalog)
+            self._load_indexes(catalog)
+        else:
+            print("Warning: catalog has no prebuilt indexes; rebuild it with build_catalog.py")
+            for song in bind_records(MappedSong, catalog):
+                self._add_song(song)
+        self.load_report.loaded = len(self.songs)
+    
+    def _load_indexes(self, catalog: MappedCatalog):
+        """Use the indexes stored in a compiled catalog (no records are decoded)."""
+        self.id_index = StringIds(StringTable.from_arrays(catalog.arrays("ids.")))
+        self.text_index = BM25Index.from_arrays(catalog.arrays("bm25."))
+        self.embeddings = EmbeddingIndex.from_arrays(catalog.arrays("embeddings."))
+        self.tag_matrix = TagMatrix.from_arrays(catalog.arrays("tags."))
+        self.fields = FieldIndex.from_arrays(SONG_INDEX_KINDS, catalog.arrays("fields."))
+        self.names = TrigramIndex.from_arrays(catalog.arrays("names."))
+        self._drop_builders()
+    
+    def index_sections(self) -> Dict[str, np.ndarray]:
+        """Every index as named arrays, to be stored in a compiled catalog."""
+        ids = StringTable.build((read_field(song, 'id') for song in self.songs), lookup=True)
+        sections = with_prefix("ids.", ids.to_arrays())
+        for prefix, index in (("bm25.", self.text_index), ("embeddings.", self.embeddings),
+                              ("tags.", self.tag_matrix), ("fields.", self.fields),
+                              ("names.", self.names)):
+            sections.update(with_prefix(prefix, index.to_arrays()))
+        return sections
     
     def _load_songs(self, songs_file: str):
-        """Load and validate songs from JSON."""
+        """Stream and validate songs item by item, indexing as they arrive.
+        
+        Rejected rows are recorded with line/offset in ``self.load_report``.
+        """
+        file_path = Path(songs_file)
+        if not file_path.exists():
+            print(f"Warning: Songs file not found: {songs_file}")
+            return
+        
         try:
-            file_path = Path(songs_file)
-            if not file_path.exists():
-                print(f"Warning: Songs file not found: {songs_file}")
-                return
-            
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            # Handle both list format and dict with 'songs' key
-            songs_data = data if isinstance(data, list) else data.get('songs', [])
-            
-            for song_data in songs_data:
-                try:
-                    song = Song(**song_data)
-                    self.songs.append(song)
-                except Exception as e:
-                    print(f"Error loading song {song_data.get('id', 'unknown')}: {e}")
-            
-            print(f"Loaded {len(self.songs)} songs from database")
-            
+            for line, offset, song_data in iter_catalog_items(file_path, 'songs', self.load_report):
+                error = validate_item(song_data, SONG_CATALOG_SCHEMA)
+                if error is None and song_data['id'] in self.id_index:
+                    error = "duplicate id"
+                if error:
+                    self.load_report.add_issue(line, offset, song_data, error)
+                    continue
+                self._add_song(Song(**song_data))
         except Exception as e:
             print(f"Error loading songs file: {e}")
+        
+        self.load_report.loaded = len(self.songs)
+        print(f"Loaded {len(self.songs)} songs from database")
+        if self.load_report.issues:
+            print(f"Skipped {len(self.load_report.issues)} invalid songs (see load_report)")
+    
+    def _add_song(self, song: Song):
+        """Append a song and add it to the indexes."""
+        self.id_index[song.id] = len(self.songs)
+        self.songs.append(song)
+        text = self._search_text(song)
+        self._text_builder.add(text)
+        self._embedding_builder.add(text)
+        self._tag_builder.add(song.emotions)
+        self._field_builder.add({name: read_field(song, name) for name in SONG_INDEXED_FIELDS})
+        for name in SONG_NAME_FIELDS:
+            self._name_builder.add(self.id_index[song.id], name, read_field(song, name))
     
-    def _index_by_emotion(self):
-        """Create emotion-to-songs index for faster lookup."""
-        self.emotion_index = {}
-        for song in self.songs:
-            for emotion in song.emotions:
-                if emotion not in self.emotion_index:
-                    self.emotion_index[emotion] = []
-                self.emotion_index[emotion].append(song)
+    @staticmethod
+    def _search_text(song: Song) -> str:
+        """Text indexed for full-text search."""
+        return f"{read_field(song, 'theme')} {read_field(song, 'why_it_helps')}"
     
-    def get_all_songs(self) -> List[Song]:
+    def _finish_indexes(self):
+        """Freeze indexes that need the whole catalog (BM25, IDF, ANN, tags, fields, names)."""
+        if self._text_builder is not None:
+            self.text_index = self._text_builder.build()
+            self.embeddings = self._embedding_builder.build()
+            self.tag_matrix = self._tag_builder.build()
+            self.fields = self._field_builder.build()
+            self.names = self._name_builder.build()
+            self._drop_builders()
+        self.embeddings.enable_ann(self._ann_file, digest=self._ann_digest)
+    
+    def _drop_builders(self):
+        """Release the load-time builders once the indexes are frozen."""
+        self._text_builder = None
+        self._embedding_builder = None
+        self._tag_builder = None
+        self._field_builder = None
+        self._name_builder = None
+    
+    def get_all_songs(self) -> Sequence[Song]:
         """Return all songs."""
         return self.songs
     
     def get_songs_by_emotion(self, emotion: str) -> List[Song]:
         """Get songs filtered by emotion tag."""
-        return self.emotion_index.get(emotion, [])
+        return [self.songs[row] for row in self.fields.postings("emotions", emotion)]
+    
+    def select(self, query: Query) -> List[Song]:
+        """Songs matching a field query, in catalog order.
+        
+        Example: ``db.select(Eq("emotions", "sadness") & Eq("artist", "IU") & Range("year", 2020))``
+        """
+        return [self.songs[row] for row in self.fields.rows(query)]
+    
+    def where(self, **conditions) -> List[Song]:
+        """Keyword form of ``select``, e.g. ``db.where(emotions="sadness", artist=["IU", "BTS"], year=(2020, None))``."""
+        return self.select(where(**conditions))
+    
+    def lookup(self, query: str, k: int = 10) -> List[Tuple[Song, float]]:
+        """Typo-tolerant search over song titles and artists; returns (song, similarity) pairs."""
+        results: Dict[int, float] = {}
+        for name_id, score in self.names.search(query, k):
+            for row in self.names.rows(name_id)[:k]:
+                results.setdefault(int(row), score)
+            if len(results) >= k:
+                break
+        return [(self.songs[row], score) for row, score in results.items()][:k]
+    
+    def autocomplete(self, prefix: str, k: int = 8) -> List[str]:
+        """Song titles and artists with a word starting with ``prefix``."""
+        return [self.names.names[name_id] for name_id in self.names.autocomplete(prefix, k)]
+    
+    def search_text(self, query: str, k: int = 10) -> List[Tuple[Song, float]]:
+        """Full-text BM25 search; returns (song, score) pairs, best first."""
+        if not self.text_index:
+            return []
+        return [(self.songs[doc_id], score) for doc_id, score in self.text_index.search(query, k)]
+    
+    def search_similar(self, query: str, k: int = 10,
+                       exclude_ids: Optional[Set[str]] = None,
+                       emotions: Optional[List[str]] = None) -> List[Tuple[Song, float]]:
+        """Embedding similarity search; returns (song, cosine) pairs, best first.
+        
+        ``emotions`` restricts results to songs carrying any of those tags.
+        """
+        if not self.embeddings:
+            return []
+        exclude = self.exclusion_mask(exclude_ids) if exclude_ids else None
+        allowed = self.emotion_mask(emotions) if emotions else None
+        return [(self.songs[row], score)
+                for row, score in self.embeddings.search(query, k, exclude, allowed)]
+    
+    def emotion_mask(self, emotions: List[str]) -> np.ndarray:
+        """Boolean row mask that is True for songs tagged with any of the emotions."""
+        return self.tag_matrix.mask(emotions)
+    
+    def exclusion_mask(self, ids: Set[str]) -> np.ndarray:
+        """Boolean row mask that is True for the given ids."""
+        mask = np.zeros(len(self.songs), dtype=bool)
+        rows = [self.id_index[i] for i in ids if i in self.id_index]
+        mask[rows] = True
+        return mask
     
     def get_song_by_id(self, song_id: str) -> Optional[Song]:
         """Get specific song by ID."""
-        for song in self.songs:
-            if song.id == song_id:
-                return song
-        return None
+        row = self.id_index.get(song_id)
+        return self.songs[row] if row is not None else None
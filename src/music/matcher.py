@@ -1,117 +1,251 @@
 """Song matching module for music recommendations."""
-from typing import List, Set
+from typing import TYPE_CHECKING, Dict, List, Optional, Set, Tuple
 import random
+import numpy as np
+from src.search.cursor import RecommendationCursor, ranking_fingerprint
+from src.search.diversity import attribute_similarity, mmr_order
+from src.search.fields import In
+from src.search.tags import EmotionTagWeights, mix_emotions, top_k
 from .database import Song, SongDatabase
 
+if TYPE_CHECKING:
+    from src.emotion.analyzer import EmotionResult
+
 
 class SongMatcher:
     """Matches emotions to relevant K-pop songs."""
     
-    # Map emotions to compatible emotion tags
+    # Map emotions to compatible emotion tags, weighted by how close they are
     EMOTION_MAPPINGS = {
-        "sadness": ["sadness", "heartbreak", "bittersweet", "longing"],
-        "anxiety": ["anxiety", "fear", "worry", "stress", "shyness"],
-        "anger": ["anger", "frustration", "empowerment"],
-        "loneliness": ["loneliness", "isolation", "longing"],
-        "disappointment": ["disappointment", "defeat", "acceptance"],
-        "fear": ["fear", "anxiety", "vulnerability"],
-        "frustration": ["frustration", "anger", "determination"],
-        "joy": ["joy", "happiness", "excitement", "confidence"],
-        "neutral": ["hope", "comfort", "peace"]
+        "sadness": {"sadness": 1.0, "heartbreak": 0.8, "bittersweet": 0.6, "longing": 0.6},
+        "anxiety": {"anxiety": 1.0, "fear": 0.7, "worry": 0.8, "stress": 0.7, "shyness": 0.4},
+        "anger": {"anger": 1.0, "frustration": 0.7, "empowerment": 0.5},
+        "loneliness": {"loneliness": 1.0, "isolation": 0.8, "longing": 0.6},
+        "disappointment": {"disappointment": 1.0, "defeat": 0.7, "acceptance": 0.5},
+        "fear": {"fear": 1.0, "anxiety": 0.7, "vulnerability": 0.6},
+        "frustration": {"frustration": 1.0, "anger": 0.6, "determination": 0.5},
+        "joy": {"joy": 1.0, "happiness": 0.9, "excitement": 0.7, "confidence": 0.5},
+        "neutral": {"hope": 0.6, "comfort": 0.6, "peace": 0.6}
     }
     
-    def __init__(self, database: SongDatabase):
-        """Initialize matcher with song database."""
+    # Score of a song tagged with exactly the requested emotion
+    EMOTION_MATCH_WEIGHT = 10
+    # Largest weight of a secondary emotion (shrinks as intensity rises)
+    SECONDARY_WEIGHT = 0.5
+    # How far emotion weights spread to tags that co-occur in the catalog
+    COOCCURRENCE_WEIGHT = 0.3
+    
+    # Diversity re-ranking (MMR): 0 = pure relevance, 1 = pure variety
+    DIVERSITY = 0.3
+    # What makes two songs similar for diversity purposes
+    DIVERSITY_WEIGHTS = {"artist": 1.0, "genre": 0.3, "tags": 0.5}
+    # Most candidates re-ranked per query, which bounds the MMR cost
+    MMR_POOL = 50
+    # Random noise on relevance so near-ties rotate between calls
+    VARIETY_JITTER = 0.15
+    
+    # "Try another" walks a shared ranked list of this many songs per emotion
+    CURSOR_DEPTH = 200
+    # Leading songs of that list that each session sees in its own order
+    CURSOR_TIER = 10
+    # Emotions whose ranked lists are kept (analysis labels are open-ended)
+    RANKED_CACHE_SIZE = 64
+    
+    # Weight of a full-strength BM25 match relative to the +10 exact emotion match
+    TEXT_MATCH_WEIGHT = 8
+    # How many full-text / semantic hits may join the emotion-tag candidates
+    TEXT_CANDIDATES = 20
+    # Weight of a perfect embedding similarity (cosine 1.0)
+    SEMANTIC_WEIGHT = 6
+    
+    def __init__(self, database: SongDatabase, semantic_ranking: bool = True,
+                 seed: Optional[int] = None):
+        """Initialize matcher with song database.
+        
+        ``semantic_ranking`` enables the embedding-similarity stage for
+        queries that include the user's text. ``seed`` makes the variety
+        in the diversity re-ranking reproducible.
+        """
         self.database = database
+        self.semantic_ranking = semantic_ranking
+        self.emotion_weights = EmotionTagWeights(
+            self.EMOTION_MAPPINGS, database.tag_matrix, self.COOCCURRENCE_WEIGHT)
+        self.base_scores = self._base_scores()
+        self.attribute_codes = self._attribute_codes()
+        self.rng = np.random.default_rng(seed)
+        self._ranked: Dict[str, Tuple[np.ndarray, int]] = {}
     
     def match_songs(self, emotion: str, count: int = 3, 
-                    exclude_ids: Set[str] = None) -> List[Song]:
-        """Match and rank songs for given emotion."""
-        if exclude_ids is None:
-            exclude_ids = set()
+                    exclude_ids: Set[str] = None,
+                    query_text: Optional[str] = None) -> List[Song]:
+        """Match and rank songs for given emotion.
         
-        # Get compatible emotion tags
-        emotion_tags = self.EMOTION_MAPPINGS.get(emotion, [emotion])
+        With ``query_text`` (what the user wrote) BM25 relevance and
+        embedding similarity over the song text are blended into the emotion
+        score, and strong text matches are considered even when their emotion
+        tags differ.
+        """
+        return self._match({emotion: 1.0}, count, exclude_ids, query_text)
+    
+    def match_songs_for_result(self, result: "EmotionResult", count: int = 3,
+                               exclude_ids: Optional[Set[str]] = None,
+                               query_text: Optional[str] = None) -> List[Song]:
+        """Match songs for a full emotion analysis result.
         
-        # Collect matching songs
-        candidates = []
-        for tag in emotion_tags:
-            songs = self.database.get_songs_by_emotion(tag)
-            candidates.extend(songs)
+        The primary and secondary emotions are mixed by intensity and
+        spread to co-occurring catalog tags, then scored in the same single
+        pass as ``match_songs``.
+        """
+        weights = mix_emotions(result.primary_emotion, result.secondary_emotions,
+                               result.intensity, self.SECONDARY_WEIGHT)
+        return self._match(weights, count, exclude_ids, query_text, prior=True)
+    
+    def _match(self, emotion_weights: Dict[str, float], count: int,
+               exclude_ids: Optional[Set[str]], query_text: Optional[str],
+               prior: bool = False) -> List[Song]:
+        """Score every song in one pass and return the top ``count``.
+        
+        ``emotion_weights`` maps emotions to how much each contributes; their
+        weighted tags are matched against the item x tag matrix at once.
+        ``prior`` adds the tag co-occurrence prior.
+        """
+        songs = self.database.get_all_songs()
+        if not songs:
+            return []
+        
+        # Weighted emotion-tag match for every song (one sparse product)
+        tag_weights = self.emotion_weights.tag_weights(emotion_weights, prior)
+        tag_scores = self.database.tag_matrix.scores(tag_weights)
+        candidates = tag_scores > 0
+        scores = self.base_scores + self.EMOTION_MATCH_WEIGHT * tag_scores
+        
+        # Blend in full-text relevance to what the user actually wrote
+        if query_text:
+            hits = self.database.search_text(query_text, k=self.TEXT_CANDIDATES)
+            if hits:
+                best = hits[0][1]
+                for song, score in hits:
+                    row = self.database.id_index[song.id]
+                    scores[row] += self.TEXT_MATCH_WEIGHT * score / best
+                    candidates[row] = True
+        
+        # Semantic similarity: one matrix-vector product over the catalog
+        if query_text and self.semantic_ranking:
+            hits = self.database.search_similar(
+                query_text, k=self.TEXT_CANDIDATES, exclude_ids=exclude_ids)
+            for song, score in hits:
+                row = self.database.id_index[song.id]
+                scores[row] += self.SEMANTIC_WEIGHT * score
+                candidates[row] = True
         
         # If no matches, use fallback general songs
-        if not candidates:
-            candidates = self._get_fallback_songs()
+        if not candidates.any():
+            candidates = self._fallback_mask()
         
-        # Remove duplicates and excluded songs
-        seen_ids = set()
-        unique_candidates = []
-        for song in candidates:
-            if song.id not in seen_ids and song.id not in exclude_ids:
-                seen_ids.add(song.id)
-                unique_candidates.append(song)
+        # Remove excluded songs
+        if exclude_ids:
+            candidates &= ~self.database.exclusion_mask(exclude_ids)
         
-        # Rank songs
-        ranked = self._rank_songs(unique_candidates, emotion)
+        # Partial top-k selection, then diversify a bounded pool (MMR)
+        pool = min(max(4 * count, 20), self.MMR_POOL)
+        rows = top_k(scores, max(count, pool), candidates)
+        head = rows[:pool]
+        order = mmr_order(scores[head], self._similarity(head), count,
+                          self.DIVERSITY, self.rng, self.VARIETY_JITTER)
+        rows = np.concatenate([head[order], rows[len(head):]])
+        ranked = [songs[row] for row in rows]
         
         # Return top N
         return ranked[:count]
     
     def get_another_song(self, emotion: str, shown_ids: Set[str]) -> Song:
         """Get next song not in shown_ids."""
-        matches = self.match_songs(emotion, count=10, exclude_ids=shown_ids)
-        
-        if matches:
-            return matches[0]
-        
-        # If all exhausted, allow repeats but notify
-        all_matches = self.match_songs(emotion, count=1, exclude_ids=set())
-        return all_matches[0] if all_matches else self._get_generic_song()
-    
-    def _rank_songs(self, songs: List[Song], emotion: str) -> List[Song]:
-        """Rank songs by relevance."""
-        scored_songs = []
-        
-        for song in songs:
-            score = 0
-            
-            # Exact emotion match
-            if emotion in song.emotions:
-                score += 10
-            
-            # Recent songs (favor newer releases)
-            if song.year >= 2020:
-                score += 3
-            if song.year >= 2023:
-                score += 2
-            
-            # Artist diversity (slightly prefer major artists)
-            major_artists = ["BTS", "SEVENTEEN", "IU", "BLACKPINK"]
-            if song.artist in major_artists:
-                score += 2
-            
-            scored_songs.append((score, song))
-        
-        # Sort by score descending
-        scored_songs.sort(key=lambda x: x[0], reverse=True)
-        
-        # Add some randomness to top results for variety
-        top_songs = [s for _, s in scored_songs]
-        if len(top_songs) > 5:
-            # Shuffle top 5 to add variety
-            top_5 = top_songs[:5]
-            rest = top_songs[5:]
-            random.shuffle(top_5)
-            return top_5 + rest
-        
-        return top_songs
+        return self.next_song(emotion, shown_ids)[0]
+    
+    def next_song(self, emotion: str, shown_ids: Set[str],
+                   cursor: Optional[RecommendationCursor] = None) -> Tuple[Song, RecommendationCursor]:
+        """Next song for a session's "try another", in constant time.
+        
+        ``cursor`` is the session's cursor for this emotion; a missing or
+        stale one (other emotion, reloaded catalog) starts over. Store the
+        returned cursor back. Its ``repeat`` flag is set once every ranked
+        song has been offered and songs start coming around again.
+        """
+        ranked, fingerprint = self._ranked_rows(emotion)
+        if cursor is None or not cursor.matches(emotion, fingerprint):
+            cursor = RecommendationCursor.start(emotion, ranked, self.CURSOR_TIER, self.rng)
+        if not len(ranked):
+            return self._get_generic_song(), cursor
+        
+        songs = self.database.get_all_songs()
+        row = cursor.advance(ranked, lambda row: songs[row].id in shown_ids)
+        return songs[row], cursor
+    
+    def _ranked_rows(self, emotion: str) -> Tuple[np.ndarray, int]:
+        """Diversified emotion-only ranking, computed once and shared by all sessions."""
+        cached = self._ranked.get(emotion)
+        if cached is not None:
+            return cached
+        
+        tag_scores = self.database.tag_matrix.scores(self.emotion_weights.tag_weights({emotion: 1.0}))
+        scores = self.base_scores + self.EMOTION_MATCH_WEIGHT * tag_scores
+        candidates = tag_scores > 0
+        if not candidates.any():
+            candidates = self._fallback_mask()
+        
+        rows = top_k(scores, self.CURSOR_DEPTH, candidates)
+        head = rows[:self.MMR_POOL]
+        order = mmr_order(scores[head], self._similarity(head), len(head), self.DIVERSITY)
+        rows = np.concatenate([head[order], rows[len(head):]]).astype(np.uint32)
+        
+        if len(self._ranked) >= self.RANKED_CACHE_SIZE:
+            self._ranked.clear()
+        cached = self._ranked[emotion] = (rows, ranking_fingerprint(rows))
+        return cached
+    
+    def _base_scores(self) -> np.ndarray:
+        """Emotion-independent part of every song's score."""
+        fields = self.database.fields
+        years = fields.int_values('year')
+        scores = np.zeros(len(years), dtype=np.float32)
+        
+        # Recent songs (favor newer releases)
+        scores += 3 * (years >= 2020)
+        scores += 2 * (years >= 2023)
+        
+        # Artist diversity (slightly prefer major artists)
+        major_artists = ["BTS", "SEVENTEEN", "IU", "BLACKPINK"]
+        scores[fields.rows(In("artist", major_artists))] += 2
+        # Small whole numbers, so one byte per row is enough
+        return scores.astype(np.uint8)
+    
+    def _attribute_codes(self) -> Dict[str, np.ndarray]:
+        """Integer code per song for each categorical diversity attribute."""
+        return {name: self.database.fields.codes(name) for name in ("artist", "genre")}
+    
+    def _similarity(self, rows: np.ndarray) -> np.ndarray:
+        """Pairwise song similarity among candidate rows."""
+        codes = {name: values[rows] for name, values in self.attribute_codes.items()}
+        return attribute_similarity(codes, self.DIVERSITY_WEIGHTS,
+                                    self.database.tag_matrix.dense(rows))
+    
+    def _fallback_mask(self) -> np.ndarray:
+        """Row mask of the general fallback songs."""
+        mask = np.zeros(len(self.database.get_all_songs()), dtype=bool)
+        mask[self._fallback_rows()] = True
+        return mask
+    
+    def _fallback_rows(self) -> np.ndarray:
+        """Rows of songs with broad appeal, answered from the emotions index."""
+        rows = self.database.fields.rows(In("emotions", ["joy", "hope"]))
+        if len(rows):
+            return rows
+        return np.arange(min(10, len(self.database.get_all_songs())))
     
     def _get_fallback_songs(self) -> List[Song]:
         """Get general uplifting songs as fallback."""
-        # Return songs with broad appeal
         all_songs = self.database.get_all_songs()
-        fallback = [s for s in all_songs if "joy" in s.emotions or "hope" in s.emotions]
-        return fallback if fallback else all_songs[:10]
+        return [all_songs[row] for row in self._fallback_rows()]
     
     def _get_generic_song(self) -> Song:
         """Get a generic uplifting song as last resort."""
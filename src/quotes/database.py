@@ -1,8 +1,19 @@
 """Movie quotes database module."""
-import json
 from dataclasses import dataclass
-from typing import List, Optional
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Set, Tuple
 from pathlib import Path
+import numpy as np
+from src.catalog.loader import LoadReport, iter_catalog_items, validate_item
+from src.catalog.mapped import LazyRecord, MappedCatalog, bind_records, read_field
+from src.search.bm25 import BM25Builder, BM25Index
+from src.search.embedding import EmbeddingBuilder, EmbeddingIndex
+from src.search.fields import FieldIndex, FieldIndexBuilder, Query, where
+from src.search.packed import StringIds, StringTable, with_prefix
+from src.search.tags import TagMatrix, TagMatrixBuilder
+from src.search.trigram import TrigramIndex, TrigramIndexBuilder
+
+CATALOG_SUFFIX = ".cat"
+ANN_SUFFIX = ".ivf.npz"  # ANN index next to a catalog compiled without its indexes
 
 
 @dataclass
@@ -16,60 +27,265 @@ class Quote:
     emotions: List[str]
     themes: List[str]
     genre: str
+    poster_url: Optional[str] = None  # baked in by prefetch_posters.py
+
+
+QUOTE_CATALOG_SCHEMA = {
+    "id": "str",
+    "text": "str",
+    "movie": "str",
+    "character": "str",
+    "year": "int",
+    "emotions": "list",
+    "themes": "list",
+    "genre": "str",
+    "poster_url": "str",
+}
+
+# Fields a source catalog may leave out (or set to null)
+QUOTE_OPTIONAL_FIELDS = ("poster_url",)
+
+
+# Fields with secondary indexes for select()/where()
+QUOTE_INDEXED_FIELDS = ("movie", "character", "genre", "emotions", "themes", "year")
+
+# Catalog kind of each indexed field
+QUOTE_INDEX_KINDS = {name: QUOTE_CATALOG_SCHEMA[name] for name in QUOTE_INDEXED_FIELDS}
+
+# Fields searchable by (fuzzy) name with lookup()/autocomplete()
+QUOTE_NAME_FIELDS = ("movie", "character")
+
+
+class MappedQuote(LazyRecord, Quote):
+    """Quote whose fields are decoded from a memory-mapped catalog on access."""
 
 
 class QuoteDatabase:
     """Manages movie quotes database."""
     
     def __init__(self, quotes_file: str):
-        """Load quotes from JSON file."""
-        self.quotes: List[Quote] = []
-        self._load_quotes(quotes_file)
-        self._index_by_emotion()
+        """Load quotes from a JSON/JSON Lines file or a memory-mapped ``.cat`` catalog."""
+        self._reset(str(quotes_file))
+        if Path(quotes_file).suffix == CATALOG_SUFFIX:
+            self._open_catalog(quotes_file)
+        else:
+            self._load_quotes(quotes_file)
+        self._finish_indexes()
+    
+    @classmethod
+    def from_catalog(cls, catalog: MappedCatalog) -> "QuoteDatabase":
+        """Build a database over an already mapped catalog (e.g. shared memory)."""
+        database = cls.__new__(cls)
+        database._reset("<mapped>")
+        database._attach_catalog(catalog)
+        database._finish_indexes()
+        return database
+    
+    @classmethod
+    def from_records(cls, records: Iterable[Dict[str, Any]]) -> "QuoteDatabase":
+        """Build a database from already validated quote dicts (e.g. to recompile a catalog)."""
+        database = cls.__new__(cls)
+        database._reset("<records>")
+        for record in records:
+            database._add_quote(Quote(**record))
+        database.load_report.loaded = len(database.quotes)
+        database._finish_indexes()
+        return database
+    
+    def _reset(self, source: str):
+        """Start with empty quotes and indexes."""
+        self.quotes: Sequence[Quote] = []
+        self.id_index: Mapping[str, int] = {}  # id -> row in self.quotes
+        self.catalog: Optional[MappedCatalog] = None
+        self.load_report = LoadReport(source)
+        self.text_index: Optional[BM25Index] = None
+        self.embeddings: Optional[EmbeddingIndex] = None
+        self.tag_matrix: Optional[TagMatrix] = None
+        self.fields: Optional[FieldIndex] = None
+        self.names: Optional[TrigramIndex] = None
+        self._text_builder = BM25Builder()
+        self._embedding_builder = EmbeddingBuilder()
+        self._tag_builder = TagMatrixBuilder()
+        self._name_builder = TrigramIndexBuilder()
+        self._field_builder = FieldIndexBuilder(QUOTE_INDEX_KINDS)
+        self._ann_file: Optional[str] = None
+        self._ann_digest = ""
+    
+    def _open_catalog(self, catalog_file: str):
+        """Map a compiled catalog; quote text is decoded only when read."""
+        try:
+            self._attach_catalog(MappedCatalog.open(catalog_file))
+            if self.text_index is None:
+                self._ann_file = str(Path(catalog_file).with_suffix(ANN_SUFFIX))
+                self._ann_digest = self.catalog.digest
+            print(f"Mapped {len(self.quotes)} quotes from catalog")
+        except Exception as e:
+            print(f"Error opening quotes catalog: {e}")
+    
+    def _attach_catalog(self, catalog: MappedCatalog):
+        """Rows of a mapped catalog, bound as lazy records on access, plus its indexes.
+        
+        Catalogs compiled with their indexes are used as they are; older
+        catalogs are indexed here, which decodes every record.
+        """
+        self.catalog = catalog
+        if "ids.offsets" in catalog.sections:
+            self.quotes = bind_records(MappedQuote, catalog)
+            self._load_indexes(catalog)
+        else:
+            print("Warning: catalog has no prebuilt indexes; rebuild it with build_catalog.py")
+            for quote in bind_records(MappedQuote, catalog):
+                self._add_quote(quote)
+        self.load_report.loaded = len(self.quotes)
+    
+    def _load_indexes(self, catalog: MappedCatalog):
+        """Use the indexes stored in a compiled catalog (no records are decoded)."""
+        self.id_index = StringIds(StringTable.from_arrays(catalog.arrays("ids.")))
+        self.text_index = BM25Index.from_arrays(catalog.arrays("bm25."))
+        self.embeddings = EmbeddingIndex.from_arrays(catalog.arrays("embeddings."))
+        self.tag_matrix = TagMatrix.from_arrays(catalog.arrays("tags."))
+        self.fields = FieldIndex.from_arrays(QUOTE_INDEX_KINDS, catalog.arrays("fields."))
+        self.names = TrigramIndex.from_arrays(catalog.arrays("names."))
+        self._drop_builders()
+    
+    def index_sections(self) -> Dict[str, np.ndarray]:
+        """Every index as named arrays, to be stored in a compiled catalog."""
+        ids = StringTable.build((read_field(quote, 'id') for quote in self.quotes), lookup=True)
+        sections = with_prefix("ids.", ids.to_arrays())
+        for prefix, index in (("bm25.", self.text_index), ("embeddings.", self.embeddings),
+                              ("tags.", self.tag_matrix), ("fields.", self.fields),
+                              ("names.", self.names)):
+            sections.update(with_prefix(prefix, index.to_arrays()))
+        return sections
     
     def _load_quotes(self, quotes_file: str):
-        """Load and validate quotes from JSON."""
+        """Stream and validate quotes item by item, indexing as they arrive.
+        
+        Rejected rows are recorded with line/offset in ``self.load_report``.
+        """
+        file_path = Path(quotes_file)
+        if not file_path.exists():
+            print(f"Warning: Quotes file not found: {quotes_file}")
+            return
+        
         try:
-            file_path = Path(quotes_file)
-            if not file_path.exists():
-                print(f"Warning: Quotes file not found: {quotes_file}")
-                return
-            
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            for quote_data in data.get('quotes', []):
-                try:
-                    quote = Quote(**quote_data)
-                    self.quotes.append(quote)
-                except Exception as e:
-                    print(f"Error loading quote {quote_data.get('id', 'unknown')}: {e}")
-            
-            print(f"Loaded {len(self.quotes)} quotes from database")
-            
+            for line, offset, quote_data in iter_catalog_items(file_path, 'quotes', self.load_report):
+                error = validate_item(quote_data, QUOTE_CATALOG_SCHEMA, QUOTE_OPTIONAL_FIELDS)
+                if error is None and quote_data['id'] in self.id_index:
+                    error = "duplicate id"
+                if error:
+                    self.load_report.add_issue(line, offset, quote_data, error)
+                    continue
+                self._add_quote(Quote(**quote_data))
         except Exception as e:
             print(f"Error loading quotes file: {e}")
+        
+        self.load_report.loaded = len(self.quotes)
+        print(f"Loaded {len(self.quotes)} quotes from database")
+        if self.load_report.issues:
+            print(f"Skipped {len(self.load_report.issues)} invalid quotes (see load_report)")
     
-    def _index_by_emotion(self):
-        """Create emotion-to-quotes index for faster lookup."""
-        self.emotion_index = {}
-        for quote in self.quotes:
-            for emotion in quote.emotions:
-                if emotion not in self.emotion_index:
-                    self.emotion_index[emotion] = []
-                self.emotion_index[emotion].append(quote)
+    def _add_quote(self, quote: Quote):
+        """Append a quote and add it to the indexes."""
+        self.id_index[quote.id] = len(self.quotes)
+        self.quotes.append(quote)
+        text = self._search_text(quote)
+        self._text_builder.add(text)
+        self._embedding_builder.add(text)
+        self._tag_builder.add(quote.emotions)
+        self._field_builder.add({name: read_field(quote, name) for name in QUOTE_INDEXED_FIELDS})
+        for name in QUOTE_NAME_FIELDS:
+            self._name_builder.add(self.id_index[quote.id], name, read_field(quote, name))
     
-    def get_all_quotes(self) -> List[Quote]:
+    @staticmethod
+    def _search_text(quote: Quote) -> str:
+        """Text indexed for full-text search."""
+        return ' '.join([read_field(quote, 'text')] + read_field(quote, 'themes'))
+    
+    def _finish_indexes(self):
+        """Freeze indexes that need the whole catalog (BM25, IDF, ANN, tags, fields, names)."""
+        if self._text_builder is not None:
+            self.text_index = self._text_builder.build()
+            self.embeddings = self._embedding_builder.build()
+            self.tag_matrix = self._tag_builder.build()
+            self.fields = self._field_builder.build()
+            self.names = self._name_builder.build()
+            self._drop_builders()
+        self.embeddings.enable_ann(self._ann_file, digest=self._ann_digest)
+    
+    def _drop_builders(self):
+        """Release the load-time builders once the indexes are frozen."""
+        self._text_builder = None
+        self._embedding_builder = None
+        self._tag_builder = None
+        self._field_builder = None
+        self._name_builder = None
+    
+    def get_all_quotes(self) -> Sequence[Quote]:
         """Return all quotes."""
         return self.quotes
     
     def get_quotes_by_emotion(self, emotion: str) -> List[Quote]:
         """Get quotes filtered by emotion tag."""
-        return self.emotion_index.get(emotion, [])
+        return [self.quotes[row] for row in self.fields.postings("emotions", emotion)]
+    
+    def select(self, query: Query) -> List[Quote]:
+        """Quotes matching a field query, in catalog order.
+        
+        Example: ``db.select(Eq("emotions", "sadness") & Eq("genre", "animation") & Range("year", 2010))``
+        """
+        return [self.quotes[row] for row in self.fields.rows(query)]
+    
+    def where(self, **conditions) -> List[Quote]:
+        """Keyword form of ``select``, e.g. ``db.where(emotions="sadness", genre="animation", year=(2010, None))``."""
+        return self.select(where(**conditions))
+    
+    def lookup(self, query: str, k: int = 10) -> List[Tuple[Quote, float]]:
+        """Typo-tolerant search over movie titles and character names; returns (quote, similarity) pairs."""
+        results: Dict[int, float] = {}
+        for name_id, score in self.names.search(query, k):
+            for row in self.names.rows(name_id)[:k]:
+                results.setdefault(int(row), score)
+            if len(results) >= k:
+                break
+        return [(self.quotes[row], score) for row, score in results.items()][:k]
+    
+    def autocomplete(self, prefix: str, k: int = 8) -> List[str]:
+        """Movie titles and character names with a word starting with ``prefix``."""
+        return [self.names.names[name_id] for name_id in self.names.autocomplete(prefix, k)]
+    
+    def search_text(self, query: str, k: int = 10) -> List[Tuple[Quote, float]]:
+        """Full-text BM25 search; returns (quote, score) pairs, best first."""
+        if not self.text_index:
+            return []
+        return [(self.quotes[doc_id], score) for doc_id, score in self.text_index.search(query, k)]
+    
+    def search_similar(self, query: str, k: int = 10,
+                       exclude_ids: Optional[Set[str]] = None,
+                       emotions: Optional[List[str]] = None) -> List[Tuple[Quote, float]]:
+        """Embedding similarity search; returns (quote, cosine) pairs, best first.
+        
+        ``emotions`` restricts results to quotes carrying any of those tags.
+        """
+        if not self.embeddings:
+            return []
+        exclude = self.exclusion_mask(exclude_ids) if exclude_ids else None
+        allowed = self.emotion_mask(emotions) if emotions else None
+        return [(self.quotes[row], score)
+                for row, score in self.embeddings.search(query, k, exclude, allowed)]
+    
+    def emotion_mask(self, emotions: List[str]) -> np.ndarray:
+        """Boolean row mask that is True for quotes tagged with any of the emotions."""
+        return self.tag_matrix.mask(emotions)
+    
+    def exclusion_mask(self, ids: Set[str]) -> np.ndarray:
+        """Boolean row mask that is True for the given ids."""
+        mask = np.zeros(len(self.quotes), dtype=bool)
+        rows = [self.id_index[i] for i in ids if i in self.id_index]
+        mask[rows] = True
+        return mask
     
     def get_quote_by_id(self, quote_id: str) -> Optional[Quote]:
         """Get specific quote by ID."""
-        for quote in self.quotes:
-            if quote.id == quote_id:
-                return quote
-        return None
+        row = self.id_index.get(quote_id)
+        return self.quotes[row] if row is not None else None
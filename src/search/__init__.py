@@ -0,0 +1,15 @@
+"""Text search and ranking helpers for the quote and song catalogs."""
+from .ann import IVFIndex
+from .bm25 import BM25Builder, BM25Index
+from .embedding import EmbeddingBuilder, EmbeddingIndex, HashingEmbedder
+from .tokenizer import tokenize
+
+__all__ = [
+    'BM25Builder',
+    'BM25Index',
+    'EmbeddingBuilder',
+    'EmbeddingIndex',
+    'HashingEmbedder',
+    'IVFIndex',
+    'tokenize'
+]
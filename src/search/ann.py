@@ -0,0 +1,151 @@
+"""Inverted-file (IVF) approximate nearest-neighbour index in pure NumPy.
+
+Vectors are clustered with spherical k-means into ``n_lists`` coarse cells.
+A query is compared with the cell centroids first and only the vectors of
+the ``n_probe`` closest cells are scored, so query cost scales with
+``n_probe / n_lists`` of the catalog instead of all of it. Raising
+``n_probe`` trades latency for recall; ``n_probe == n_lists`` is exact.
+"""
+from typing import Dict, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+
+
+def _assign(vectors: np.ndarray, centroids: np.ndarray, batch: int = 65536) -> np.ndarray:
+    """Index of the most similar centroid for every vector, in batches."""
+    labels = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), batch):
+        labels[start:start + batch] = np.argmax(vectors[start:start + batch] @ centroids.T, axis=1)
+    return labels
+
+
+def train_centroids(vectors: np.ndarray, n_lists: int, iterations: int = 10,
+                    seed: int = 0, sample_per_list: int = 64) -> np.ndarray:
+    """Spherical k-means on a random sample of the (unit-length) vectors."""
+    rng = np.random.default_rng(seed)
+    sample_size = min(len(vectors), n_lists * sample_per_list)
+    sample = vectors[rng.choice(len(vectors), sample_size, replace=False)]
+    centroids = sample[rng.choice(sample_size, n_lists, replace=False)].copy()
+
+    for _ in range(iterations):
+        labels = _assign(sample, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, sample)
+        empty = np.bincount(labels, minlength=n_lists) == 0
+        # Re-seed empty cells from random sample points
+        sums[empty] = sample[rng.choice(sample_size, int(empty.sum()))]
+        centroids = _normalize(sums)
+    return centroids.astype(np.float32)
+
+
+class IVFIndex:
+    """IVF index over the rows of a unit-length float32 matrix (inner product = cosine).
+
+    Each cell is a contiguous slice of ``rows`` (row numbers grouped by
+    cell). The vectors themselves stay in ``matrix``, which is the caller's
+    array and is never copied; a probed cell gathers its rows from it.
+    ``digest`` identifies the data the index was trained on, so a saved
+    index can be checked against the catalog it is loaded for.
+    """
+
+    def __init__(self, centroids: np.ndarray, offsets: np.ndarray,
+                 rows: np.ndarray, matrix: np.ndarray, n_probe: int = 8,
+                 digest: str = ""):
+        self.centroids = centroids
+        self.offsets = offsets
+        self.rows = rows
+        self.matrix = matrix
+        self.n_probe = n_probe
+        self.digest = digest
+
+    @property
+    def n_lists(self) -> int:
+        return len(self.centroids)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    @classmethod
+    def build(cls, matrix: np.ndarray, n_lists: Optional[int] = None,
+              iterations: int = 10, seed: int = 0, n_probe: int = 8,
+              digest: str = "") -> "IVFIndex":
+        """Cluster the rows of ``matrix`` into cells (default ``sqrt(n)`` cells)."""
+        matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+        if n_lists is None:
+            n_lists = max(1, int(np.sqrt(len(matrix))))
+        n_lists = min(n_lists, len(matrix))
+
+        centroids = train_centroids(matrix, n_lists, iterations, seed)
+        labels = _assign(matrix, centroids)
+        order = np.argsort(labels, kind="stable").astype(np.int64)
+        offsets = np.zeros(n_lists + 1, dtype=np.int64)
+        np.cumsum(np.bincount(labels, minlength=n_lists), out=offsets[1:])
+        return cls(centroids, offsets, order, matrix, n_probe, digest)
+
+    def search(self, query: np.ndarray, k: int = 10, n_probe: Optional[int] = None,
+               allowed: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        """Approximate top-k ``(row, score)`` pairs, best first.
+
+        ``allowed`` is an optional boolean mask over original rows (emotion
+        filter minus exclusions); it is applied inside each probed cell so
+        filtered-out rows are never scored.
+        """
+        n_probe = min(n_probe or self.n_probe, self.n_lists)
+        cell_scores = self.centroids @ query
+        if n_probe < self.n_lists:
+            cells = np.argpartition(cell_scores, -n_probe)[-n_probe:]
+        else:
+            cells = np.arange(self.n_lists)
+
+        found_rows = []
+        found_scores = []
+        for cell in cells:
+            start, end = self.offsets[cell], self.offsets[cell + 1]
+            if start == end:
+                continue
+            rows = self.rows[start:end]
+            if allowed is not None:
+                rows = rows[allowed[rows]]
+                if not len(rows):
+                    continue
+            found_rows.append(rows)
+            found_scores.append(self.matrix[rows] @ query)
+
+        if not found_rows:
+            return []
+        rows = np.concatenate(found_rows)
+        scores = np.concatenate(found_scores)
+        if len(scores) > k:
+            top = np.argpartition(scores, -k)[-k:]
+        else:
+            top = np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(int(rows[i]), float(scores[i])) for i in top]
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """The index (without the vectors) as named arrays."""
+        return {"centroids": self.centroids, "offsets": self.offsets, "rows": self.rows,
+                "n_probe": np.array([self.n_probe], dtype=np.int64)}
+
+    @classmethod
+    def from_arrays(cls, arrays: Mapping[str, np.ndarray], matrix: np.ndarray) -> "IVFIndex":
+        return cls(arrays["centroids"], arrays["offsets"], arrays["rows"], matrix,
+                   int(arrays["n_probe"][0]))
+
+    def save(self, path: str):
+        """Write the index (without the vectors) to a ``.npz`` file."""
+        np.savez(path, centroids=self.centroids, offsets=self.offsets, rows=self.rows,
+                 n_probe=np.int64(self.n_probe), digest=np.str_(self.digest))
+
+    @classmethod
+    def load(cls, path: str, matrix: np.ndarray) -> "IVFIndex":
+        """Load an index written by ``save`` over the matrix it was built from."""
+        with np.load(path) as data:
+            digest = str(data["digest"]) if "digest" in data.files else ""
+            return cls(data["centroids"], data["offsets"], data["rows"], matrix,
+                       int(data["n_probe"]), digest)
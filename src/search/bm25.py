@@ -0,0 +1,254 @@
+"""BM25 inverted index over catalog text."""
+from array import array
+from collections import Counter
+from typing import Dict, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+from .packed import StringIds, StringTable, csr, strip_prefix, with_prefix
+from .tokenizer import tokenize
+
+
+class BM25Builder:
+    """Accumulates documents one at a time while a catalog is loading."""
+
+    def __init__(self):
+        self.vocab: Dict[str, int] = {}
+        self._doc_ids: List[array] = []
+        self._freqs: List[array] = []
+        self._doc_lengths = array("I")
+
+    def add(self, text: str) -> int:
+        """Tokenize and index one document; returns its document id."""
+        doc_id = len(self._doc_lengths)
+        tokens = tokenize(text)
+        for term, freq in Counter(tokens).items():
+            term_id = self.vocab.get(term)
+            if term_id is None:
+                term_id = self.vocab[term] = len(self._doc_ids)
+                self._doc_ids.append(array("I"))
+                self._freqs.append(array("I"))
+            self._doc_ids[term_id].append(doc_id)
+            self._freqs[term_id].append(freq)
+        self._doc_lengths.append(len(tokens))
+        return doc_id
+
+    def build(self, k1: float = 1.2, b: float = 0.75) -> "BM25Index":
+        """Freeze the postings into an index with precomputed BM25 impacts."""
+        n_docs = len(self._doc_lengths)
+        lengths = np.frombuffer(self._doc_lengths, dtype=np.uint32).astype(np.float32)
+        avg_length = float(lengths.mean()) if n_docs and lengths.any() else 1.0
+        norm = k1 * (1.0 - b + b * lengths / avg_length)
+
+        doc_ids = []
+        impacts = []
+        for ids, freqs in zip(self._doc_ids, self._freqs):
+            ids = np.frombuffer(ids, dtype=np.uint32).copy()
+            freqs = np.frombuffer(freqs, dtype=np.uint32).astype(np.float32)
+            df = len(ids)
+            idf = np.log1p((n_docs - df + 0.5) / (df + 0.5))
+            doc_ids.append(ids)
+            impacts.append((idf * freqs * (k1 + 1.0) / (freqs + norm[ids])).astype(np.float32))
+        offsets, doc_ids = csr(doc_ids, np.uint32)
+        _, impacts = csr(impacts, np.float32)
+        return BM25Index(StringTable.build(self.vocab, lookup=True), offsets, doc_ids, impacts, n_docs)
+
+
+def impact_order(offsets: np.ndarray, impacts: np.ndarray) -> np.ndarray:
+    """Posting positions sorted by term, then by impact (highest first)."""
+    terms = np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+    return np.lexsort((-impacts, terms))
+
+
+class BM25Index:
+    """Immutable BM25 index.
+
+    Each term's posting list is a slice of two flat arrays: ``uint32``
+    document ids and ``float32`` impacts (the term's full BM25 contribution
+    to that document, precomputed at build time), delimited by ``offsets``.
+    The same postings are also kept in impact order (``ranked_*``), and
+    terms in more than ``DENSE_SHARE`` of the documents also get a dense
+    impact column (at most twice the size of their postings), so adding
+    them up is a streaming vector add instead of a scatter.
+
+    A query first scores the documents at the head of each impact-ordered
+    list exactly. If their k-th best score reaches the sum of each list's
+    first unseen impact, no other document can beat them and the search is
+    done. Otherwise that k-th score is a lower bound, so after accumulating
+    every score only the documents reaching it are ranked, instead of a
+    selection over the whole catalog. Results are exact either way. The
+    arrays are what a compiled catalog stores, so a mapped index is used
+    in place.
+    """
+
+    HEAD = 64  # postings per term scored in the impact-ordered pass
+    DENSE_SHARE = 0.25
+
+    def __init__(self, terms: StringTable, offsets: np.ndarray, doc_ids: np.ndarray,
+                 impacts: np.ndarray, n_docs: int,
+                 ranked_doc_ids: Optional[np.ndarray] = None,
+                 ranked_impacts: Optional[np.ndarray] = None,
+                 dense_ids: Optional[np.ndarray] = None, dense: Optional[np.ndarray] = None):
+        self.terms = terms
+        self.vocab = StringIds(terms)
+        self._offsets = offsets
+        self._doc_ids = doc_ids
+        self._impacts = impacts
+        self.n_docs = n_docs
+        if ranked_doc_ids is None:
+            order = impact_order(offsets, impacts)
+            ranked_doc_ids, ranked_impacts = doc_ids[order], impacts[order]
+        self._ranked_doc_ids = ranked_doc_ids
+        self._ranked_impacts = ranked_impacts
+        if dense is None:
+            dense_ids, dense = self._build_dense()
+        self._dense_ids = dense_ids
+        self._dense = dense
+
+    def _build_dense(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Dense impact columns for the most frequent terms."""
+        frequent = np.flatnonzero(np.diff(self._offsets) > self.DENSE_SHARE * self.n_docs)
+        dense_ids = np.full(len(self._offsets) - 1, -1, dtype=np.int32)
+        dense_ids[frequent] = np.arange(len(frequent), dtype=np.int32)
+        dense = np.zeros((len(frequent), self.n_docs), dtype=np.float32)
+        for column, term_id in enumerate(frequent):
+            doc_ids, impacts = self._postings(term_id)
+            dense[column, doc_ids] = impacts
+        return dense_ids, dense
+
+    def __len__(self) -> int:
+        return self.n_docs
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """The index as named arrays (see ``MappedCatalog.arrays``)."""
+        arrays = with_prefix("terms.", self.terms.to_arrays())
+        arrays.update(offsets=self._offsets, doc_ids=self._doc_ids, impacts=self._impacts,
+                      ranked_doc_ids=self._ranked_doc_ids, ranked_impacts=self._ranked_impacts,
+                      dense_ids=self._dense_ids, dense=self._dense,
+                      n_docs=np.array([self.n_docs], dtype=np.int64))
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays: Mapping[str, np.ndarray]) -> "BM25Index":
+        dense = arrays.get("dense")
+        if dense is not None and dense.ndim == 1:
+            dense = dense.reshape(0, int(arrays["n_docs"][0]))  # no frequent terms
+        return cls(StringTable.from_arrays(strip_prefix(arrays, "terms.")), arrays["offsets"],
+                   arrays["doc_ids"], arrays["impacts"], int(arrays["n_docs"][0]),
+                   arrays.get("ranked_doc_ids"), arrays.get("ranked_impacts"),
+                   arrays.get("dense_ids"), dense)
+
+    def _term_ids(self, query: str) -> List[int]:
+        """Distinct indexed query terms, dense ones first (a fixed order keeps
+        float32 sums identical however the scores are computed)."""
+        found = {self.terms.find(t) for t in tokenize(query)}
+        found.discard(-1)
+        return sorted(found, key=lambda term_id: (self._dense_ids[term_id] < 0, term_id))
+
+    def _postings(self, term_id: int) -> Tuple[np.ndarray, np.ndarray]:
+        start, end = self._offsets[term_id], self._offsets[term_id + 1]
+        return self._doc_ids[start:end], self._impacts[start:end]
+
+    def _accumulate(self, term_ids: List[int]) -> np.ndarray:
+        scores = np.zeros(self.n_docs, dtype=np.float32)
+        for term_id in term_ids:
+            column = self._dense_ids[term_id]
+            if column >= 0:
+                scores += self._dense[column]
+                continue
+            doc_ids, impacts = self._postings(term_id)
+            # Ids are unique within one posting list, so fancy-index add is safe
+            scores[doc_ids] += impacts
+        return scores
+
+    def _score_candidates(self, term_ids: List[int], candidates: np.ndarray) -> np.ndarray:
+        """Exact scores of a few documents, summed like ``_accumulate``."""
+        scores = np.zeros(len(candidates), dtype=np.float32)
+        for term_id in term_ids:
+            column = self._dense_ids[term_id]
+            if column >= 0:
+                scores += self._dense[column][candidates]
+                continue
+            doc_ids, impacts = self._postings(term_id)
+            found = np.searchsorted(doc_ids, candidates)
+            found[found == len(doc_ids)] = 0
+            scores += np.where(doc_ids[found] == candidates, impacts[found], np.float32(0))
+        return scores
+
+    def _search_heads(self, term_ids: List[int], k: int, exclude: Optional[np.ndarray]):
+        """Best k of the documents at the head of each impact-ordered list.
+
+        Returns ``(doc_ids, scores, complete)``; ``complete`` is True when no
+        other document can beat them. Otherwise the k-th score is still a
+        lower bound on the true k-th score.
+        """
+        depth = max(self.HEAD, 4 * k)
+        heads = []
+        bound = 0.0
+        for term_id in term_ids:
+            start, end = int(self._offsets[term_id]), int(self._offsets[term_id + 1])
+            heads.append(self._ranked_doc_ids[start:min(start + depth, end)])
+            if start + depth < end:
+                bound += float(self._ranked_impacts[start + depth])
+        candidates = np.unique(np.concatenate(heads))
+        if exclude is not None:
+            candidates = candidates[~exclude[candidates]]
+        scores = self._score_candidates(term_ids, candidates)
+        candidates, scores = self._top(candidates, scores, k)
+        # Strictly above the bound, so an unseen document cannot even tie
+        complete = not bound or (len(scores) >= k and float(scores[k - 1]) > bound)
+        return candidates, scores, complete
+
+    def scores(self, query: str) -> Optional[np.ndarray]:
+        """BM25 score of every document, or None if no query term is indexed."""
+        term_ids = self._term_ids(query)
+        if not term_ids:
+            return None
+        return self._accumulate(term_ids)
+
+    def search(self, query: str, k: int = 10,
+               exclude: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        """Top-k ``(doc_id, score)`` pairs, best first (ties by document id).
+
+        ``exclude`` is an optional boolean mask of documents to skip.
+        """
+        term_ids = self._term_ids(query)
+        if not term_ids or k <= 0:
+            return []
+        floor = np.float32(0)
+        postings = sum(int(self._offsets[t + 1] - self._offsets[t]) for t in term_ids)
+        if postings * 4 >= self.n_docs:
+            doc_ids, head_scores, complete = self._search_heads(term_ids, k, exclude)
+            if complete:
+                keep = head_scores[:k] > 0
+                return self._pairs(doc_ids[:k][keep], head_scores[:k][keep])
+            if len(head_scores) >= k:
+                floor = head_scores[k - 1]
+
+        scores = self._accumulate(term_ids)
+        if exclude is not None:
+            scores[exclude] = 0.0
+        if postings * 4 < self.n_docs:
+            # Few matches: rank only the documents in the posting lists
+            hits = np.unique(np.concatenate([self._postings(t)[0] for t in term_ids]))
+            hits = hits[scores[hits] > 0]
+        else:
+            # Only documents reaching the heads' k-th score can be in the top
+            # k, and a comparison is much cheaper than a selection over all
+            hits = np.flatnonzero(scores >= floor) if floor else np.flatnonzero(scores)
+        hits, hit_scores = self._top(hits, scores[hits], k)
+        return self._pairs(hits[:k], hit_scores[:k])
+
+    @staticmethod
+    def _top(doc_ids: np.ndarray, scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Documents by descending score, then document id: the top k plus
+        any further ties with the k-th, so callers can cut at k."""
+        if len(scores) > k:
+            keep = scores >= np.partition(scores, len(scores) - k)[len(scores) - k]
+            doc_ids, scores = doc_ids[keep], scores[keep]
+        order = np.lexsort((doc_ids, -scores))
+        return doc_ids[order], scores[order]
+
+    @staticmethod
+    def _pairs(doc_ids: np.ndarray, scores: np.ndarray) -> List[Tuple[int, float]]:
+        return [(int(doc_id), float(score)) for doc_id, score in zip(doc_ids, scores)]
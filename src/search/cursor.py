@@ -0,0 +1,74 @@
+"""Per-session cursors over a matcher's precomputed ranked list.
+
+The ranked list for an emotion is computed once per catalog and shared by
+every session. A session only keeps where it is in that list plus its own
+shuffle of the top tier, so "try another" is a constant-time step instead
+of a new ranking pass.
+"""
+from dataclasses import dataclass
+from typing import Callable, Optional, Tuple
+import zlib
+
+import numpy as np
+
+
+def ranking_fingerprint(ranked: np.ndarray) -> int:
+    """Checksum identifying a ranked list, so stale cursors can be detected."""
+    return zlib.crc32(np.ascontiguousarray(ranked, dtype=np.uint32).tobytes())
+
+
+@dataclass
+class RecommendationCursor:
+    """Where one session is in the ranked list of one emotion.
+
+    ``tier`` is the session's permutation of the top-tier positions as packed
+    ``uint16``; positions past the tier are walked in ranked order. ``repeat``
+    turns on once the list has been exhausted and the walk starts over.
+    """
+    emotion: str
+    fingerprint: int
+    tier: bytes
+    position: int = 0
+    repeat: bool = False
+
+    @classmethod
+    def start(cls, emotion: str, ranked: np.ndarray, tier_size: int,
+              rng: Optional[np.random.Generator] = None) -> "RecommendationCursor":
+        """New cursor at the top of ``ranked`` with a shuffled top tier."""
+        rng = rng or np.random.default_rng()
+        tier = rng.permutation(min(tier_size, len(ranked), 0xFFFF)).astype(np.uint16)
+        return cls(emotion, ranking_fingerprint(ranked), tier.tobytes())
+
+    def matches(self, emotion: str, fingerprint: int) -> bool:
+        return self.emotion == emotion and self.fingerprint == fingerprint
+
+    def _row_at(self, ranked: np.ndarray, position: int) -> int:
+        if position < len(self.tier) // 2:
+            position = int.from_bytes(self.tier[2 * position:2 * position + 2], "little")
+        return int(ranked[position])
+
+    def advance(self, ranked: np.ndarray,
+                seen: Optional[Callable[[int], bool]] = None) -> int:
+        """Return the next row and move past it.
+
+        On the first pass rows for which ``seen(row)`` is true are skipped
+        (each position is visited at most once per pass, so this is O(1)
+        amortized). When the list runs out the cursor wraps and sets
+        ``repeat``; repeated passes do not skip anything.
+        """
+        while True:
+            if self.position >= len(ranked):
+                self.position = 0
+                self.repeat = True
+            row = self._row_at(ranked, self.position)
+            self.position += 1
+            if self.repeat or seen is None or not seen(row):
+                return row
+
+    def to_state(self) -> Tuple[str, int, bytes, int, bool]:
+        """Compact, picklable form for Streamlit session state."""
+        return (self.emotion, self.fingerprint, self.tier, self.position, self.repeat)
+
+    @classmethod
+    def from_state(cls, state: Optional[Tuple]) -> Optional["RecommendationCursor"]:
+        return cls(*state) if state else None
@@ -0,0 +1,71 @@
+"""Maximal marginal relevance (MMR) re-ranking for recommendation variety.
+
+Candidates are picked greedily: each step takes the candidate with the best
+``(1 - diversity) * relevance - diversity * similarity to anything already
+picked``. Similarity combines shared categorical attributes (artist, movie,
+genre) and emotion-tag overlap, computed as one matrix over a bounded pool
+of top candidates, so the cost does not depend on catalog size.
+"""
+from typing import Dict, Optional
+
+import numpy as np
+
+
+def attribute_similarity(codes: Dict[str, np.ndarray], weights: Dict[str, float],
+                         tags: Optional[np.ndarray] = None) -> np.ndarray:
+    """Pairwise similarity in ``[0, 1]`` for a pool of candidates.
+
+    ``codes`` maps an attribute name to one integer code per candidate (equal
+    codes mean the same artist/movie/genre). ``tags`` is an optional
+    ``(candidates, tags)`` 0/1 matrix compared by Jaccard overlap under the
+    ``"tags"`` weight.
+    """
+    n = len(next(iter(codes.values()))) if codes else len(tags)
+    similarity = np.zeros((n, n), dtype=np.float32)
+    total = 0.0
+    for name, values in codes.items():
+        weight = weights.get(name, 0.0)
+        if weight:
+            similarity += weight * (values[:, None] == values[None, :])
+            total += weight
+
+    weight = weights.get("tags", 0.0)
+    if tags is not None and weight:
+        overlap = tags @ tags.T
+        sizes = np.diag(overlap)
+        union = sizes[:, None] + sizes[None, :] - overlap
+        similarity += weight * np.divide(overlap, union, out=np.zeros_like(overlap),
+                                         where=union > 0)
+        total += weight
+
+    return similarity / total if total else similarity
+
+
+def mmr_order(relevance: np.ndarray, similarity: np.ndarray, count: int,
+              diversity: float = 0.3, rng: Optional[np.random.Generator] = None,
+              jitter: float = 0.0) -> np.ndarray:
+    """Indices of ``count`` candidates in MMR order.
+
+    ``relevance`` is rescaled to ``[0, 1]`` over the pool. ``jitter`` adds up
+    to that much uniform noise from ``rng`` so equally good candidates rotate
+    between calls; with a seeded generator the order is reproducible.
+    """
+    n = len(relevance)
+    count = min(count, n)
+    relevance = relevance.astype(np.float32)
+    spread = relevance.max() - relevance.min() if n else 0.0
+    relevance = (relevance - relevance.min()) / spread if spread > 0 else np.ones(n, np.float32)
+    if jitter and rng is not None:
+        relevance = relevance + jitter * rng.random(n, dtype=np.float32)
+
+    order = np.empty(count, dtype=np.intp)
+    max_similarity = np.zeros(n, dtype=np.float32)
+    available = np.ones(n, dtype=bool)
+    for step in range(count):
+        gain = (1.0 - diversity) * relevance - diversity * max_similarity
+        gain[~available] = -np.inf
+        pick = int(np.argmax(gain))
+        order[step] = pick
+        available[pick] = False
+        np.maximum(max_similarity, similarity[pick], out=max_similarity)
+    return order
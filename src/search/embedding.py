@@ -0,0 +1,180 @@
+"""Local hashed TF-IDF embeddings and brute-force similarity search.
+
+No model download and no network: every term (and adjacent term pair) is
+hashed into a fixed number of buckets with a stable CRC32 hash, weighted by
+the bucket's inverse document frequency, and L2-normalized. All catalog
+vectors live in one contiguous float32 matrix, so ranking a query is a single
+matrix-vector product followed by a partial top-k selection. Large catalogs
+additionally get an IVF index (see ``ann``) so a query only scores a few
+clusters instead of every row.
+"""
+import zlib
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+from .ann import IVFIndex
+from .packed import strip_prefix, with_prefix
+from .tokenizer import tokenize
+
+DEFAULT_DIM = 512
+ANN_MIN_ITEMS = 50_000  # below this, exact search is already sub-millisecond
+
+
+def _features(text: str) -> List[str]:
+    """Terms plus adjacent term pairs, so short phrases carry some signal."""
+    tokens = tokenize(text)
+    return tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+
+def _hash_counts(text: str, dim: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Signed hashed feature counts as (bucket indices, values)."""
+    buckets = Counter()
+    for feature in _features(text):
+        h = zlib.crc32(feature.encode("utf-8"))
+        # The top bit picks a sign so colliding features tend to cancel out
+        buckets[h % dim] += -1.0 if h & 0x80000000 else 1.0
+    if not buckets:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+    indices = np.fromiter(buckets.keys(), dtype=np.int64, count=len(buckets))
+    values = np.fromiter(buckets.values(), dtype=np.float32, count=len(buckets))
+    return indices, values
+
+
+class HashingEmbedder:
+    """Embeds text into the same space as an EmbeddingIndex."""
+
+    def __init__(self, idf: np.ndarray):
+        self.idf = idf.astype(np.float32)
+        self.dim = len(idf)
+
+    def embed(self, text: str) -> np.ndarray:
+        """Unit-length float32 vector for a piece of text."""
+        vector = np.zeros(self.dim, dtype=np.float32)
+        indices, values = _hash_counts(text, self.dim)
+        vector[indices] = np.sign(values) * np.log1p(np.abs(values)) * self.idf[indices]
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+class EmbeddingIndex:
+    """Contiguous ``(n, dim)`` float32 matrix of unit-length item vectors."""
+
+    def __init__(self, matrix: np.ndarray, embedder: HashingEmbedder):
+        self.matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+        self.embedder = embedder
+        self.ann: Optional[IVFIndex] = None
+
+    def __len__(self) -> int:
+        return len(self.matrix)
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """The matrix, IDF weights and ANN index (if any) as named arrays."""
+        arrays = {"matrix": self.matrix, "idf": self.embedder.idf}
+        if self.ann is not None:
+            arrays.update(with_prefix("ann.", self.ann.to_arrays()))
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays: Mapping[str, np.ndarray]) -> "EmbeddingIndex":
+        index = cls(arrays["matrix"], HashingEmbedder(arrays["idf"]))
+        if "ann.centroids" in arrays:
+            index.ann = IVFIndex.from_arrays(strip_prefix(arrays, "ann."), index.matrix)
+        return index
+
+    def enable_ann(self, path: Optional[str] = None, min_items: int = ANN_MIN_ITEMS,
+                   n_probe: Optional[int] = None, digest: str = ""):
+        """Use an IVF index for search once the catalog has ``min_items`` rows.
+
+        A prebuilt index at ``path`` is loaded only when it was built for the
+        catalog with this ``digest`` (and covers the same rows); a stale or
+        unlabelled one is ignored and an index is trained here instead. An
+        index that came with a compiled catalog is kept as is.
+        """
+        if len(self) < min_items:
+            return
+        if self.ann is None and path and Path(path).exists():
+            try:
+                ann = IVFIndex.load(path, self.matrix)
+                if digest and ann.digest == digest and len(ann) == len(self) \
+                        and ann.centroids.shape[1] == self.matrix.shape[1]:
+                    self.ann = ann
+                else:
+                    print(f"Warning: ignoring ANN index {path} built for a different catalog")
+            except Exception as e:
+                print(f"Warning: could not load ANN index {path}: {e}")
+        if self.ann is None:
+            self.ann = IVFIndex.build(self.matrix, digest=digest)
+        if n_probe:
+            self.ann.n_probe = n_probe
+
+    def similarities(self, query: str) -> Optional[np.ndarray]:
+        """Cosine similarity of every item to the query (None if it embeds to zero)."""
+        vector = self.embedder.embed(query)
+        if not vector.any():
+            return None
+        return self.matrix @ vector
+
+    def search(self, query: str, k: int = 10,
+               exclude: Optional[np.ndarray] = None,
+               allowed: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        """Top-k ``(row, similarity)`` pairs with positive similarity, best first.
+
+        ``exclude`` is an optional boolean mask of rows to skip and ``allowed``
+        an optional boolean mask of the only rows to consider.
+        """
+        if self.ann is not None:
+            vector = self.embedder.embed(query)
+            if not vector.any():
+                return []
+            if exclude is not None:
+                allowed = ~exclude if allowed is None else allowed & ~exclude
+            return [(row, score) for row, score in self.ann.search(vector, k, allowed=allowed)
+                    if score > 0]
+
+        scores = self.similarities(query)
+        if scores is None:
+            return []
+        if exclude is not None:
+            scores[exclude] = -np.inf
+        if allowed is not None:
+            scores[~allowed] = -np.inf
+        if k < len(scores):
+            top = np.argpartition(scores, -k)[-k:]
+        else:
+            top = np.arange(len(scores))
+        top = top[scores[top] > 0]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(int(row), float(scores[row])) for row in top]
+
+
+class EmbeddingBuilder:
+    """Collects hashed term counts while a catalog loads, then builds the index."""
+
+    def __init__(self, dim: int = DEFAULT_DIM):
+        self.dim = dim
+        self._rows: List[Tuple[np.ndarray, np.ndarray]] = []
+
+    def add(self, text: str) -> int:
+        """Hash one document; returns its row."""
+        self._rows.append(_hash_counts(text, self.dim))
+        return len(self._rows) - 1
+
+    def build(self) -> EmbeddingIndex:
+        """Weight by bucket IDF, normalize rows and pack them into one matrix."""
+        n = len(self._rows)
+        df = np.zeros(self.dim, dtype=np.float32)
+        for indices, _ in self._rows:
+            df[indices] += 1.0
+        idf = np.log((1.0 + n) / (1.0 + df)) + 1.0
+        embedder = HashingEmbedder(idf)
+
+        matrix = np.zeros((n, self.dim), dtype=np.float32)
+        for row, (indices, values) in enumerate(self._rows):
+            matrix[row, indices] = np.sign(values) * np.log1p(np.abs(values)) * idf[indices]
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        np.divide(matrix, norms, out=matrix, where=norms > 0)
+        self._rows = []
+        return EmbeddingIndex(matrix, embedder)
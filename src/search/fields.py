@@ -0,0 +1,254 @@
+"""Secondary indexes over catalog fields and a small composable query API.
+
+String and list fields get hash indexes (value -> sorted row ids, packed as
+one string table plus CSR posting arrays); int fields are kept as one sorted
+value array so ranges are two binary searches.
+Queries combine conditions with ``&`` and ``|`` and are answered by merging
+sorted posting lists, smallest first, without touching the records::
+
+    Eq("emotions", "sadness") & Eq("genre", "animation") & Range("year", 2010)
+"""
+from abc import ABC, abstractmethod
+from array import array
+from typing import Any, Dict, Iterable, List, Mapping, Optional
+
+import numpy as np
+
+from .packed import StringTable, csr, strip_prefix, with_prefix
+
+_EMPTY = np.empty(0, dtype=np.uint32)
+
+
+class Query(ABC):
+    """Base class for conditions; combine with ``&`` and ``|``."""
+
+    def __and__(self, other: "Query") -> "Query":
+        return And(self, other)
+
+    def __or__(self, other: "Query") -> "Query":
+        return Or(self, other)
+
+    @abstractmethod
+    def rows(self, index: "FieldIndex") -> np.ndarray:
+        """Sorted ``uint32`` row ids matching this condition."""
+
+
+class Eq(Query):
+    """``field == value``; for list fields, the list contains ``value``."""
+
+    def __init__(self, field: str, value: Any):
+        self.field = field
+        self.value = value
+
+    def rows(self, index: "FieldIndex") -> np.ndarray:
+        if index.kinds.get(self.field) == "int":
+            return Range(self.field, self.value, self.value).rows(index)
+        return index.postings(self.field, self.value)
+
+
+class In(Query):
+    """``field`` equals (or, for list fields, contains) any of ``values``."""
+
+    def __init__(self, field: str, values: Iterable[Any]):
+        self.field = field
+        self.values = list(values)
+
+    def rows(self, index: "FieldIndex") -> np.ndarray:
+        lists = [Eq(self.field, value).rows(index) for value in self.values]
+        return np.unique(np.concatenate(lists)) if lists else _EMPTY
+
+
+class Range(Query):
+    """``low <= field <= high`` on an int field; either bound may be None."""
+
+    def __init__(self, field: str, low: Optional[int] = None, high: Optional[int] = None):
+        self.field = field
+        self.low = low
+        self.high = high
+
+    def rows(self, index: "FieldIndex") -> np.ndarray:
+        return index.range_rows(self.field, self.low, self.high)
+
+
+class And(Query):
+    def __init__(self, *parts: Query):
+        self.parts = parts
+
+    def rows(self, index: "FieldIndex") -> np.ndarray:
+        if not self.parts:
+            return np.arange(index.n_items, dtype=np.uint32)
+        lists = sorted((part.rows(index) for part in self.parts), key=len)
+        result = lists[0]
+        for rows in lists[1:]:
+            if not len(result):
+                break
+            result = np.intersect1d(result, rows, assume_unique=True)
+        return result
+
+
+class Or(Query):
+    def __init__(self, *parts: Query):
+        self.parts = parts
+
+    def rows(self, index: "FieldIndex") -> np.ndarray:
+        lists = [part.rows(index) for part in self.parts]
+        return np.unique(np.concatenate(lists)) if lists else _EMPTY
+
+
+def where(**conditions: Any) -> Query:
+    """AND of keyword conditions: a tuple is an inclusive ``(low, high)``
+    range, a list or set is ``In``, anything else is ``Eq``."""
+    parts = []
+    for field, value in conditions.items():
+        if isinstance(value, tuple):
+            parts.append(Range(field, *value))
+        elif isinstance(value, (list, set, frozenset)):
+            parts.append(In(field, value))
+        else:
+            parts.append(Eq(field, value))
+    return And(*parts)
+
+
+class FieldIndex:
+    """Frozen secondary indexes for one catalog.
+
+    ``keys`` holds each string/list field's distinct values; the rows of
+    value ``i`` are ``rows[field][offsets[field][i]:offsets[field][i + 1]]``.
+    Int fields keep ``sorted_values`` with the matching ``rows``.
+    ``by_row`` optionally holds the per-row codes of string fields and
+    values of int fields, as stored in a compiled catalog, so that workers
+    mapping the catalog do not each expand them.
+    """
+
+    def __init__(self, kinds: Dict[str, str], keys: Dict[str, StringTable],
+                 offsets: Dict[str, np.ndarray], sorted_values: Dict[str, np.ndarray],
+                 rows: Dict[str, np.ndarray], n_items: int,
+                 by_row: Optional[Dict[str, np.ndarray]] = None):
+        self.kinds = kinds
+        self._keys = keys
+        self._offsets = offsets
+        self._sorted_values = sorted_values
+        self._rows = rows
+        self.n_items = n_items
+        self._by_row = by_row or {}
+
+    def _check(self, field: str):
+        if field not in self.kinds:
+            raise KeyError(f"Field is not indexed: {field}")
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """The indexes as named arrays (see ``MappedCatalog.arrays``)."""
+        arrays = {"n_items": np.array([self.n_items], dtype=np.int64)}
+        for field in self.kinds:
+            arrays[f"{field}.rows"] = self._rows[field]
+            if field in self._keys:
+                arrays.update(with_prefix(f"{field}.keys.", self._keys[field].to_arrays()))
+                arrays[f"{field}.offsets"] = self._offsets[field]
+            else:
+                arrays[f"{field}.values"] = self._sorted_values[field]
+            if self.kinds[field] == "str":
+                arrays[f"{field}.by_row"] = self.codes(field).astype(np.int32)
+            elif self.kinds[field] == "int":
+                arrays[f"{field}.by_row"] = self.int_values(field)
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, kinds: Dict[str, str], arrays: Mapping[str, np.ndarray]) -> "FieldIndex":
+        keys, offsets, sorted_values, rows, by_row = {}, {}, {}, {}, {}
+        for field, kind in kinds.items():
+            rows[field] = arrays[f"{field}.rows"]
+            if f"{field}.by_row" in arrays:
+                by_row[field] = arrays[f"{field}.by_row"]
+            if kind == "int":
+                sorted_values[field] = arrays[f"{field}.values"]
+            else:
+                keys[field] = StringTable.from_arrays(strip_prefix(arrays, f"{field}.keys."))
+                offsets[field] = arrays[f"{field}.offsets"]
+        return cls(kinds, keys, offsets, sorted_values, rows, int(arrays["n_items"][0]), by_row)
+
+    def postings(self, field: str, value: Any) -> np.ndarray:
+        """Rows whose ``field`` is (or contains) ``value``."""
+        self._check(field)
+        key = self._keys[field].find(value) if isinstance(value, str) else -1
+        if key < 0:
+            return _EMPTY
+        offsets = self._offsets[field]
+        return self._rows[field][offsets[key]:offsets[key + 1]]
+
+    def values(self, field: str) -> List[Any]:
+        """Distinct values of a string or list field."""
+        self._check(field)
+        return list(self._keys[field])
+
+    def codes(self, field: str) -> np.ndarray:
+        """Per-row code of a string field's value (its position in ``values``)."""
+        self._check(field)
+        if field in self._by_row:
+            return self._by_row[field]
+        offsets = self._offsets[field]
+        codes = np.zeros(self.n_items, dtype=np.int64)
+        codes[self._rows[field]] = np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+        return codes
+
+    def int_values(self, field: str) -> np.ndarray:
+        """Per-row values of an int field."""
+        self._check(field)
+        if field in self._by_row:
+            return self._by_row[field]
+        values = np.zeros(self.n_items, dtype=np.int64)
+        values[self._rows[field]] = self._sorted_values[field]
+        return values
+
+    def range_rows(self, field: str, low: Optional[int], high: Optional[int]) -> np.ndarray:
+        """Rows with ``low <= field <= high`` via binary search on the sorted values."""
+        self._check(field)
+        values = self._sorted_values[field]
+        start = 0 if low is None else int(np.searchsorted(values, low, side="left"))
+        end = len(values) if high is None else int(np.searchsorted(values, high, side="right"))
+        return np.sort(self._rows[field][start:end])
+
+    def rows(self, query: Query) -> np.ndarray:
+        return query.rows(self)
+
+
+class FieldIndexBuilder:
+    """Collects field values while a catalog loads.
+
+    ``kinds`` maps each indexed field to its catalog kind: ``str`` and
+    ``list`` get hash indexes, ``int`` a sorted range index.
+    """
+
+    def __init__(self, kinds: Dict[str, str]):
+        self.kinds = kinds
+        self._postings: Dict[str, Dict[Any, array]] = {
+            field: {} for field, kind in kinds.items() if kind != "int"}
+        self._numbers: Dict[str, array] = {
+            field: array("q") for field, kind in kinds.items() if kind == "int"}
+        self._count = 0
+
+    def add(self, values: Dict[str, Any]) -> int:
+        """Index one item's field values; returns its row."""
+        row = self._count
+        for field, kind in self.kinds.items():
+            value = values[field]
+            if kind == "int":
+                self._numbers[field].append(int(value or 0))
+                continue
+            for key in (set(value) if kind == "list" else (value,)):
+                self._postings[field].setdefault(key, array("I")).append(row)
+        self._count += 1
+        return row
+
+    def build(self) -> FieldIndex:
+        # Rows are added in increasing order, so every posting list is sorted
+        keys, offsets, sorted_values, rows = {}, {}, {}, {}
+        for field, values in self._postings.items():
+            keys[field] = StringTable.build(values, lookup=True)
+            offsets[field], rows[field] = csr(
+                (np.frombuffer(ids, dtype=np.uint32) for ids in values.values()), np.uint32)
+        for field, numbers in self._numbers.items():
+            numbers = np.frombuffer(numbers, dtype=np.int64)
+            order = np.argsort(numbers, kind="stable")
+            sorted_values[field] = numbers[order]
+            rows[field] = order.astype(np.uint32)
+        return FieldIndex(self.kinds, keys, offsets, sorted_values, rows, self._count)
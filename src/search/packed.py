@@ -0,0 +1,132 @@
+"""Flat-array building blocks for indexes stored inside compiled catalogs.
+
+Every index can be written out as a handful of named NumPy arrays and
+rebuilt from them without copying (see ``MappedCatalog.arrays``). Strings
+are packed into one UTF-8 blob with an offsets array, so a table of a
+million names opens in constant time and decodes a name only when read.
+"""
+import hashlib
+from typing import Dict, Iterable, Iterator, Mapping, Optional
+
+import numpy as np
+
+
+def string_hash(text: str) -> int:
+    """Stable 64-bit hash of a string (Python's ``hash`` is salted per process)."""
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def with_prefix(prefix: str, arrays: Mapping[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """Namespace an index's arrays, e.g. ``vocab.offsets``."""
+    return {prefix + name: array for name, array in arrays.items()}
+
+
+def strip_prefix(arrays: Mapping[str, np.ndarray], prefix: str) -> Dict[str, np.ndarray]:
+    """The arrays under ``prefix``, with the prefix removed."""
+    return {name[len(prefix):]: array for name, array in arrays.items() if name.startswith(prefix)}
+
+
+def csr(lists: Iterable[np.ndarray], dtype=np.uint32):
+    """Concatenate variable-length lists into ``(offsets, values)``."""
+    lists = list(lists)
+    offsets = np.zeros(len(lists) + 1, dtype=np.int64)
+    np.cumsum([len(values) for values in lists], out=offsets[1:])
+    values = np.concatenate(lists).astype(dtype) if lists else np.empty(0, dtype=dtype)
+    return offsets, values
+
+
+class StringTable:
+    """Immutable sequence of strings packed into one UTF-8 blob.
+
+    String ``i`` is ``blob[offsets[i]:offsets[i + 1]]``. Tables built with
+    ``lookup=True`` also keep their strings' 64-bit hashes in sorted order,
+    so ``find`` is one binary search plus one string comparison. Tables of
+    sorted strings support ``bisect_left`` (UTF-8 byte order is code point
+    order, so it matches ``sorted``).
+    """
+
+    def __init__(self, offsets: np.ndarray, blob: np.ndarray,
+                 hashes: Optional[np.ndarray] = None, hash_ids: Optional[np.ndarray] = None):
+        self.offsets = offsets
+        self.blob = blob
+        self.hashes = hashes
+        self.hash_ids = hash_ids
+
+    @classmethod
+    def build(cls, strings: Iterable[str], lookup: bool = False) -> "StringTable":
+        encoded = [text.encode("utf-8") for text in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(data) for data in encoded], out=offsets[1:])
+        blob = np.frombuffer(b"".join(encoded), dtype=np.uint8).copy()
+        hashes = hash_ids = None
+        if lookup:
+            hashes = np.fromiter(
+                (int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little")
+                 for data in encoded), dtype=np.uint64, count=len(encoded))
+            hash_ids = np.argsort(hashes, kind="stable").astype(np.uint32)
+            hashes = hashes[hash_ids]
+        return cls(offsets, blob, hashes, hash_ids)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        return self.blob[self.offsets[i]:self.offsets[i + 1]].tobytes().decode("utf-8")
+
+    def __iter__(self) -> Iterator[str]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def find(self, text: str) -> int:
+        """Position of ``text``, or -1 if absent (needs ``lookup=True``)."""
+        h = np.uint64(string_hash(text))
+        i = int(np.searchsorted(self.hashes, h))
+        while i < len(self.hashes) and self.hashes[i] == h:
+            string_id = int(self.hash_ids[i])
+            if self[string_id] == text:
+                return string_id
+            i += 1
+        return -1
+
+    def bisect_left(self, text: str, lo: int = 0) -> int:
+        """Insertion point of ``text`` in a table of sorted strings."""
+        hi = len(self)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self[mid] < text:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        arrays = {"offsets": self.offsets, "blob": self.blob}
+        if self.hashes is not None:
+            arrays.update(hashes=self.hashes, hash_ids=self.hash_ids)
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays: Mapping[str, np.ndarray]) -> "StringTable":
+        return cls(arrays["offsets"], arrays["blob"], arrays.get("hashes"), arrays.get("hash_ids"))
+
+
+class StringIds(Mapping):
+    """Read-only ``{string: position}`` mapping over a lookup StringTable."""
+
+    def __init__(self, table: StringTable):
+        self.table = table
+
+    def __getitem__(self, text: str) -> int:
+        position = self.table.find(text) if isinstance(text, str) else -1
+        if position < 0:
+            raise KeyError(text)
+        return position
+
+    def __contains__(self, text) -> bool:
+        return isinstance(text, str) and self.table.find(text) >= 0
+
+    def __len__(self) -> int:
+        return len(self.table)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.table)
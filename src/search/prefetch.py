@@ -0,0 +1,129 @@
+"""Background prefetch of "try another" alternates for one session.
+
+Each key (kind, emotion and catalog version) keeps a small queue of ready
+alternates. Clicks take from the queue without waiting; the queue is then
+topped up on a shared thread pool, including slow work such as poster
+lookups. Advancing the session's recommendation cursor happens under a lock,
+so queued and on-demand alternates never repeat each other, and queued ones
+that the session has since been shown are skipped when taken.
+"""
+import threading
+from collections import deque
+from concurrent.futures import Executor, Future
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+# step(cursor_state) -> (item, repeat, new_cursor_state)
+Step = Callable[[Optional[tuple]], Tuple[Any, bool, tuple]]
+# resolve(item) -> poster URL (or None)
+Resolve = Callable[[Any], Optional[str]]
+
+
+@dataclass
+class Alternate:
+    """A recommendation ready to be shown."""
+    item: Any
+    repeat: bool = False
+    poster_url: Optional[str] = None
+
+
+class AlternatePrefetcher:
+    """Per-session queues of prefetched alternates.
+
+    ``cursors`` is the session's dict of compact cursor states; it is
+    updated in place, so it can live in Streamlit session state. Every
+    ``clear`` starts a new generation: fills still running for an older one
+    stop stepping cursors and drop what they resolved.
+    """
+
+    def __init__(self, executor: Executor, cursors: Dict[str, tuple], depth: int = 2,
+                 resolve_timeout: float = 2.0):
+        self.executor = executor
+        self.cursors = cursors
+        self.depth = depth
+        self.resolve_timeout = resolve_timeout
+        self._lock = threading.Lock()
+        self._queues: Dict[str, Deque[Alternate]] = {}
+        self._pending: Dict[str, Future] = {}
+        self._generation = 0
+        self.served = 0
+        self.prefetched = 0
+
+    def _advance(self, key: str, step: Step, generation: int) -> Optional[Alternate]:
+        """Step the key's cursor; None if the prefetcher was cleared since ``generation``."""
+        with self._lock:
+            if generation != self._generation:
+                return None
+            item, repeat, self.cursors[key] = step(self.cursors.get(key))
+        return Alternate(item, repeat)
+
+    def take(self, key: str, step: Step, resolve: Optional[Resolve] = None,
+             shown: Optional[Callable[[Any], bool]] = None) -> Alternate:
+        """Next alternate: a prefetched one if ready, otherwise stepped now.
+
+        Queued alternates for which ``shown(item)`` is now true (e.g. a later
+        turn recommended them directly) are dropped, unless the cursor had
+        already started repeating. An alternate stepped now gets its poster
+        from ``resolve`` only if that finishes within ``resolve_timeout``;
+        otherwise, or if it fails, it comes without one.
+        """
+        with self._lock:
+            queue = self._queues.get(key)
+            alternate = queue.popleft() if queue else None
+            while (alternate is not None and shown is not None
+                   and not alternate.repeat and shown(alternate.item)):
+                alternate = queue.popleft() if queue else None
+            self.served += 1
+            if alternate is not None:
+                self.prefetched += 1
+                return alternate
+            item, repeat, self.cursors[key] = step(self.cursors.get(key))
+        alternate = Alternate(item, repeat)
+        if resolve is not None:
+            future = self.executor.submit(resolve, item)
+            try:
+                alternate.poster_url = future.result(timeout=self.resolve_timeout)
+            except Exception as e:
+                # A slow lookup keeps running on the pool (and fills the poster cache)
+                print(f"Alternate for {key} shown without a poster: {type(e).__name__}: {e}")
+        return alternate
+
+    def fill(self, key: str, step: Step, resolve: Optional[Resolve] = None):
+        """Top up the key's queue to ``depth`` in the background."""
+        with self._lock:
+            pending = self._pending.get(key)
+            if pending is not None and not pending.done():
+                return
+            if len(self._queues.get(key, ())) >= self.depth:
+                return
+            self._pending[key] = self.executor.submit(
+                self._fill, key, step, resolve, self._generation)
+
+    def _fill(self, key: str, step: Step, resolve: Optional[Resolve], generation: int):
+        try:
+            while len(self._queues.get(key, ())) < self.depth:
+                alternate = self._advance(key, step, generation)
+                if alternate is None:
+                    return
+                if resolve is not None:
+                    alternate.poster_url = resolve(alternate.item)
+                with self._lock:
+                    if generation != self._generation:
+                        return  # cleared while resolving
+                    self._queues.setdefault(key, deque()).append(alternate)
+        except Exception as e:
+            print(f"Error prefetching alternates for {key}: {e}")
+
+    def clear(self):
+        """Drop everything queued and every cursor (e.g. when the conversation
+        is reset); fills still running are discarded."""
+        with self._lock:
+            self._generation += 1
+            self._queues.clear()
+            self._pending.clear()
+            self.cursors.clear()
+
+    @property
+    def hit_rate(self) -> Optional[float]:
+        """Share of served alternates that were already prefetched."""
+        return self.prefetched / self.served if self.served else None
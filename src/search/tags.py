@@ -0,0 +1,185 @@
+"""Sparse emotion-tag matrices for scoring every catalog item at once.
+
+The catalog side is an item x tag matrix stored as coordinate arrays (one
+entry per item/tag pair). The matcher side is a weighted emotion x tag
+matrix built from ``EMOTION_MAPPINGS``. A query mixes emotion rows into one
+dense tag-weight vector, and a single ``bincount`` over the item x tag
+entries turns that into a score for every item.
+
+A tag co-occurrence prior (how often tags appear together in the catalog)
+can be folded into the emotion rows once, so queries that use it cost the
+same as queries that do not.
+"""
+from array import array
+from typing import Dict, Iterable, List, Mapping, Optional
+
+import numpy as np
+
+from .packed import StringTable, strip_prefix, with_prefix
+
+
+class TagMatrix:
+    """Item x tag incidence matrix in coordinate form.
+
+    Entries are ordered by item, so ``indptr`` (as in CSR) gives each item's
+    slice of ``tag_ids``.
+    """
+
+    def __init__(self, vocab: Dict[str, int], item_rows: np.ndarray,
+                 tag_ids: np.ndarray, n_items: int, indptr: Optional[np.ndarray] = None):
+        self.vocab = vocab
+        self.item_rows = item_rows
+        self.tag_ids = tag_ids
+        self.n_items = n_items
+        if indptr is None:
+            indptr = np.zeros(n_items + 1, dtype=np.intp)
+            np.cumsum(np.bincount(item_rows, minlength=n_items), out=indptr[1:])
+        self.indptr = indptr
+
+    def __len__(self) -> int:
+        return self.n_items
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """The matrix as named arrays (see ``MappedCatalog.arrays``)."""
+        arrays = with_prefix("vocab.", StringTable.build(self.vocab).to_arrays())
+        arrays.update(item_rows=self.item_rows, tag_ids=self.tag_ids, indptr=self.indptr)
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays: Mapping[str, np.ndarray]) -> "TagMatrix":
+        vocab = StringTable.from_arrays(strip_prefix(arrays, "vocab."))
+        return cls({tag: i for i, tag in enumerate(vocab)}, arrays["item_rows"],
+                   arrays["tag_ids"], len(arrays["indptr"]) - 1, arrays["indptr"])
+
+    def scores(self, tag_weights: np.ndarray) -> np.ndarray:
+        """Sum of tag weights for every item (a sparse matrix-vector product)."""
+        return np.bincount(self.item_rows, weights=tag_weights[self.tag_ids],
+                           minlength=self.n_items).astype(np.float32)
+
+    def cooccurrence(self) -> np.ndarray:
+        """Dense tag x tag matrix of P(tag j | tag i) over items, zero diagonal.
+
+        Items are grouped by tag count so every group is one vectorized
+        pass; emotion vocabularies are small, so the dense result is too.
+        """
+        n_tags = len(self.vocab)
+        counts = np.zeros(n_tags * n_tags, dtype=np.float64)
+        degrees = np.diff(self.indptr)
+        for degree in np.unique(degrees[degrees > 1]):
+            starts = self.indptr[:-1][degrees == degree]
+            tags = self.tag_ids[starts[:, None] + np.arange(degree)]
+            for i in range(degree):
+                for j in range(degree):
+                    if i != j:
+                        counts += np.bincount(tags[:, i] * n_tags + tags[:, j],
+                                              minlength=n_tags * n_tags)
+        counts = counts.reshape(n_tags, n_tags)
+        tag_counts = np.bincount(self.tag_ids, minlength=n_tags)
+        return (counts / np.maximum(tag_counts, 1)[:, None]).astype(np.float32)
+
+    def dense(self, rows: np.ndarray) -> np.ndarray:
+        """0/1 ``(len(rows), tags)`` float32 matrix of the given items' tags."""
+        out = np.zeros((len(rows), len(self.vocab)), dtype=np.float32)
+        starts = self.indptr[rows]
+        lengths = self.indptr[rows + 1] - starts
+        owners = np.repeat(np.arange(len(rows)), lengths)
+        within = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        out[owners, self.tag_ids[np.repeat(starts, lengths) + within]] = 1.0
+        return out
+
+    def mask(self, tags: Iterable[str]) -> np.ndarray:
+        """Boolean item mask that is True for items carrying any of the tags."""
+        wanted = np.zeros(len(self.vocab), dtype=bool)
+        wanted[[self.vocab[t] for t in tags if t in self.vocab]] = True
+        mask = np.zeros(self.n_items, dtype=bool)
+        mask[self.item_rows[wanted[self.tag_ids]]] = True
+        return mask
+
+
+class TagMatrixBuilder:
+    """Collects item tags while a catalog loads."""
+
+    def __init__(self):
+        self.vocab: Dict[str, int] = {}
+        self._item_rows = array("I")
+        self._tag_ids = array("I")
+        self._count = 0
+
+    def add(self, tags: List[str]) -> int:
+        """Add one item's tags; returns its row."""
+        row = self._count
+        for tag in set(tags):
+            tag_id = self.vocab.setdefault(tag, len(self.vocab))
+            self._item_rows.append(row)
+            self._tag_ids.append(tag_id)
+        self._count += 1
+        return row
+
+    def build(self) -> TagMatrix:
+        return TagMatrix(self.vocab,
+                         np.frombuffer(self._item_rows, dtype=np.uint32).astype(np.intp),
+                         np.frombuffer(self._tag_ids, dtype=np.uint32).astype(np.intp),
+                         self._count)
+
+
+class EmotionTagWeights:
+    """Weighted emotion x tag matrix over a catalog's tag vocabulary.
+
+    ``mappings`` maps an emotion to ``{tag: weight}``. Emotions without a
+    mapping match their own tag with weight 1.0, and tags the catalog does
+    not use are dropped. With ``prior_weight`` the rows are also spread to
+    co-occurring tags (``row + prior_weight * row @ P``), computed once here.
+    """
+
+    def __init__(self, mappings: Dict[str, Dict[str, float]], tag_matrix: TagMatrix,
+                 prior_weight: float = 0.0):
+        self.vocab = tag_matrix.vocab
+        self.emotions = {emotion: i for i, emotion in enumerate(mappings)}
+        self.matrix = np.zeros((len(mappings), len(self.vocab)), dtype=np.float32)
+        for emotion, tags in mappings.items():
+            for tag, weight in tags.items():
+                if tag in self.vocab:
+                    self.matrix[self.emotions[emotion], self.vocab[tag]] = weight
+
+        self.prior_weight = prior_weight
+        self.cooccurrence = tag_matrix.cooccurrence() if prior_weight else None
+        self.expanded = (self.matrix + prior_weight * self.matrix @ self.cooccurrence
+                         if prior_weight else self.matrix)
+
+    def tag_weights(self, emotion_weights: Dict[str, float], prior: bool = False) -> np.ndarray:
+        """Mix emotions (``{emotion: weight}``) into one tag-weight vector."""
+        mix = np.zeros(len(self.emotions), dtype=np.float32)
+        weights = np.zeros(len(self.vocab), dtype=np.float32)
+        for emotion, weight in emotion_weights.items():
+            row = self.emotions.get(emotion)
+            if row is not None:
+                mix[row] += weight
+            elif emotion in self.vocab:
+                tag = self.vocab[emotion]
+                weights[tag] += weight
+                if prior and self.cooccurrence is not None:
+                    weights += weight * self.prior_weight * self.cooccurrence[tag]
+        return weights + mix @ (self.expanded if prior else self.matrix)
+
+
+def mix_emotions(primary: str, secondary: List[str], intensity: float,
+                 secondary_weight: float) -> Dict[str, float]:
+    """Query weights for a primary emotion and its secondary emotions.
+
+    The primary emotion always weighs 1.0. Secondary emotions weigh up to
+    ``secondary_weight``, less the more intense the primary emotion is.
+    """
+    intensity = min(max(float(intensity), 0.0), 1.0)
+    weights = {primary: 1.0}
+    for emotion in secondary:
+        if emotion and emotion not in weights:
+            weights[emotion] = secondary_weight * (1.0 - 0.5 * intensity)
+    return weights
+
+
+def top_k(scores: np.ndarray, k: int, candidates: Optional[np.ndarray] = None) -> np.ndarray:
+    """Rows of the ``k`` best scores, best first, optionally among candidates only."""
+    rows = np.flatnonzero(candidates) if candidates is not None else np.arange(len(scores))
+    if len(rows) > k:
+        rows = rows[np.argpartition(-scores[rows], k)[:k]]
+    return rows[np.argsort(-scores[rows], kind="stable")]
@@ -0,0 +1,36 @@
+"""Tokenizer for mixed English and CJK catalog text."""
+import re
+from typing import List
+
+# Latin words (with simple contractions) or runs of CJK / kana / Hangul characters
+_TOKEN_RE = re.compile(
+    r"[a-z0-9]+(?:'[a-z]+)?"
+    r"|[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff]+"
+)
+
+STOPWORDS = frozenset("""
+a an and are as at be but by for from has have i if in into is it its me my
+of on or so that the their them they this to was we were what when with you your
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into search terms.
+
+    English is lowercased and stripped of stopwords and possessive ``'s``.
+    CJK has no word boundaries, so each run is indexed as overlapping
+    character bigrams (a single character stays a unigram).
+    """
+    tokens = []
+    for match in _TOKEN_RE.finditer(text.lower()):
+        token = match.group()
+        if token[0] < "\u3040":
+            if token.endswith("'s"):
+                token = token[:-2]
+            if token not in STOPWORDS:
+                tokens.append(token)
+        elif len(token) == 1:
+            tokens.append(token)
+        else:
+            tokens.extend(token[i:i + 2] for i in range(len(token) - 1))
+    return tokens
@@ -0,0 +1,247 @@
+"""Trigram index for typo-tolerant name search and prefix autocomplete.
+
+Names (song titles, artists, movies, characters) are deduplicated, then
+split into padded character trigrams. A query collects candidates from only
+its few rarest trigrams (enough to catch names within ``max_edits`` typos,
+capped by ``posting_budget``), then counts shared trigrams exactly for those
+candidates and ranks them by Dice similarity. Work per query therefore
+depends on the candidates, not on catalog size.
+Autocomplete is a binary search over a sorted list of word-start suffixes.
+Everything is kept in flat arrays and string tables, so a compiled catalog
+stores the index and a mapped catalog uses it without rebuilding.
+"""
+import re
+from array import array
+from typing import Dict, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+from .packed import StringTable, csr, strip_prefix, with_prefix
+
+_NON_WORD = re.compile(r"[\W_]+", re.UNICODE)
+
+
+def normalize(text: str) -> str:
+    """Lowercase and collapse punctuation/whitespace to single spaces."""
+    return _NON_WORD.sub(" ", text.lower()).strip()
+
+
+def trigrams(text: str) -> List[str]:
+    """Distinct padded trigrams of normalized text (``"  sp"``, ``" sp"``, ...)."""
+    padded = f"  {text} "
+    return list(dict.fromkeys(padded[i:i + 3] for i in range(len(padded) - 2)))
+
+
+class TrigramIndex:
+    """Frozen trigram and prefix index over distinct names.
+
+    Name ``i`` is ``names[i]``, came from field ``fields[name_fields[i]]``
+    and occurs on catalog rows ``row_ids[row_offsets[i]:row_offsets[i + 1]]``.
+    Trigram ``g`` of ``grams`` is on names ``name_ids[gram_offsets[g]:gram_offsets[g + 1]]``.
+    """
+
+    BITSET_SHARE = 128
+
+    def __init__(self, names: StringTable, fields: List[str], name_fields: np.ndarray,
+                 row_offsets: np.ndarray, row_ids: np.ndarray, name_lengths: np.ndarray,
+                 grams: StringTable, gram_offsets: np.ndarray, name_ids: np.ndarray,
+                 prefix_keys: StringTable, prefix_names: np.ndarray,
+                 bitset_ids: Optional[np.ndarray] = None, bitsets: Optional[np.ndarray] = None,
+                 max_edits: int = 2, posting_budget: int = 2_000):
+        self.names = names
+        self.fields = fields
+        self.name_fields = name_fields
+        self._row_offsets = row_offsets
+        self._row_ids = row_ids
+        self._name_lengths = name_lengths
+        self._grams = grams
+        self._gram_offsets = gram_offsets
+        self._name_ids = name_ids
+        self._prefix_keys = prefix_keys
+        self._prefix_names = prefix_names
+        self.max_edits = max_edits
+        self.posting_budget = posting_budget
+        if bitsets is None:
+            bitset_ids, bitsets = self._build_bitsets()
+        self._bitset_ids = bitset_ids
+        self._bitsets = bitsets
+        self._gram_ids: Optional[Dict[str, int]] = None
+
+    def _build_bitsets(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Packed bitsets for trigrams on more than 1 in ``BITSET_SHARE`` names.
+
+        Testing candidates against a bitset is one vectorized lookup instead
+        of a binary search per candidate; the bitsets cost at most four times
+        the posting lists they shadow.
+        """
+        n_names = len(self.names)
+        counts = np.diff(self._gram_offsets)
+        common = np.flatnonzero(counts * self.BITSET_SHARE > n_names)
+        bitset_ids = np.full(len(counts), -1, dtype=np.int32)
+        bitset_ids[common] = np.arange(len(common), dtype=np.int32)
+        bitsets = np.zeros((len(common), (n_names + 7) // 8), dtype=np.uint8)
+        for i, gram_id in enumerate(common):
+            mask = np.zeros(n_names, dtype=bool)
+            mask[self._postings(gram_id)] = True
+            bitsets[i] = np.packbits(mask)
+        return bitset_ids, bitsets
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """The index as named arrays (see ``MappedCatalog.arrays``)."""
+        arrays = with_prefix("names.", self.names.to_arrays())
+        arrays.update(with_prefix("fields.", StringTable.build(self.fields).to_arrays()))
+        arrays.update(with_prefix("grams.", self._grams.to_arrays()))
+        arrays.update(with_prefix("prefix_keys.", self._prefix_keys.to_arrays()))
+        arrays.update(
+            name_fields=self.name_fields, row_offsets=self._row_offsets, row_ids=self._row_ids,
+            name_lengths=self._name_lengths, gram_offsets=self._gram_offsets,
+            name_ids=self._name_ids, prefix_names=self._prefix_names,
+            bitset_ids=self._bitset_ids, bitsets=self._bitsets,
+            params=np.array([self.max_edits, self.posting_budget], dtype=np.int64))
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays: Mapping[str, np.ndarray]) -> "TrigramIndex":
+        def table(prefix: str) -> StringTable:
+            return StringTable.from_arrays(strip_prefix(arrays, prefix))
+
+        max_edits, posting_budget = (int(value) for value in arrays["params"])
+        return cls(table("names."), list(table("fields.")), arrays["name_fields"],
+                   arrays["row_offsets"], arrays["row_ids"], arrays["name_lengths"],
+                   table("grams."), arrays["gram_offsets"], arrays["name_ids"],
+                   table("prefix_keys."), arrays["prefix_names"],
+                   arrays["bitset_ids"], arrays["bitsets"], max_edits, posting_budget)
+
+    def _lookup_grams(self, grams: List[str]) -> List[int]:
+        """Ids of the indexed grams among ``grams``.
+
+        The gram vocabulary is small (a few thousand entries even for a
+        million names), so it is decoded into a dict on first use.
+        """
+        if self._gram_ids is None:
+            self._gram_ids = {gram: gram_id for gram_id, gram in enumerate(self._grams)}
+        return [self._gram_ids[gram] for gram in grams if gram in self._gram_ids]
+
+    def _postings(self, gram_id: int) -> np.ndarray:
+        return self._name_ids[self._gram_offsets[gram_id]:self._gram_offsets[gram_id + 1]]
+
+    def field(self, name_id: int) -> str:
+        """Catalog field a name came from."""
+        return self.fields[self.name_fields[name_id]]
+
+    def rows(self, name_id: int) -> np.ndarray:
+        """Catalog rows carrying a name."""
+        return self._row_ids[self._row_offsets[name_id]:self._row_offsets[name_id + 1]]
+
+    def search(self, query: str, k: int = 10,
+               min_similarity: float = 0.3) -> List[Tuple[int, float]]:
+        """Best ``(name_id, similarity)`` pairs for a possibly misspelled query."""
+        grams = trigrams(normalize(query))
+        present = self._lookup_grams(grams)
+        if not present:
+            return []
+        lists = [self._postings(g) for g in present]
+        order = sorted(range(len(present)), key=lambda i: len(lists[i]))
+        present, lists = [present[i] for i in order], [lists[i] for i in order]
+
+        # One edit changes at most three trigrams, so any name within
+        # ``max_edits`` edits shares one of the 3 * max_edits + 1 rarest trigrams
+        seeds = lists[:3 * self.max_edits + 1]
+        while len(seeds) > 1 and sum(len(p) for p in seeds) > self.posting_budget:
+            seeds = seeds[:-1]
+        # Sorted candidates keep the binary searches below cache-friendly
+        candidates = np.sort(np.concatenate(seeds))
+        candidates = candidates[np.concatenate(([True], candidates[1:] != candidates[:-1]))]
+
+        # Exact shared-trigram counts for the candidates only
+        shared = np.zeros(len(candidates), dtype=np.int32)
+        for gram, postings in zip(present, lists):
+            if self._bitset_ids[gram] >= 0:
+                bits = self._bitsets[self._bitset_ids[gram]]
+                shared += (bits[candidates >> 3] >> (7 - (candidates & 7)).astype(np.uint8)) & 1
+                continue
+            found = np.searchsorted(postings, candidates)
+            found[found == len(postings)] = 0
+            shared += postings[found] == candidates
+        scores = 2.0 * shared / (len(grams) + self._name_lengths[candidates])
+
+        keep = scores >= min_similarity
+        ids, scores = candidates[keep], scores[keep]
+        if len(scores) > k:
+            top = np.argpartition(-scores, k)[:k]
+            ids, scores = ids[top], scores[top]
+        order = np.argsort(-scores, kind="stable")
+        return [(int(ids[i]), float(scores[i])) for i in order]
+
+    def autocomplete(self, prefix: str, k: int = 8) -> List[int]:
+        """Name ids with a word starting with ``prefix``, alphabetical by that word."""
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        start = self._prefix_keys.bisect_left(prefix)
+        end = self._prefix_keys.bisect_left(prefix + "\uffff", start)
+        found: Dict[int, None] = {}
+        for name_id in self._prefix_names[start:end]:
+            found.setdefault(int(name_id))
+            if len(found) >= k:
+                break
+        return list(found)
+
+
+class TrigramIndexBuilder:
+    """Collects names while a catalog loads."""
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self._names: List[str] = []
+        self._fields: List[str] = []
+        self._rows: List[array] = []
+
+    def add(self, row: int, field: str, text: Optional[str]):
+        """Index one name of one catalog row."""
+        key = normalize(text or "")
+        if not key:
+            return
+        name_id = self._ids.get(key)
+        if name_id is None:
+            name_id = self._ids[key] = len(self._names)
+            self._names.append(text)
+            self._fields.append(field)
+            self._rows.append(array("I"))
+        self._rows[name_id].append(row)
+
+    def build(self, max_edits: int = 2, posting_budget: int = 2_000) -> TrigramIndex:
+        postings: Dict[str, array] = {}
+        lengths = np.zeros(len(self._names), dtype=np.int32)
+        prefix_entries = []
+        for key, name_id in self._ids.items():
+            grams = trigrams(key)
+            lengths[name_id] = len(grams)
+            for gram in grams:
+                postings.setdefault(gram, array("I")).append(name_id)
+            for match in re.finditer(r"\S+", key):
+                prefix_entries.append((key[match.start():], name_id))
+        prefix_entries.sort()
+
+        fields = list(dict.fromkeys(self._fields))
+        field_codes = {field: code for code, field in enumerate(fields)}
+        row_offsets, row_ids = csr((np.frombuffer(rows, dtype=np.uint32) for rows in self._rows))
+        gram_offsets, name_ids = csr((np.frombuffer(ids, dtype=np.uint32) for ids in postings.values()))
+        return TrigramIndex(
+            StringTable.build(self._names),
+            fields,
+            np.array([field_codes[field] for field in self._fields], dtype=np.uint8),
+            row_offsets,
+            row_ids,
+            lengths,
+            StringTable.build(postings, lookup=True),
+            gram_offsets,
+            name_ids,
+            StringTable.build(key for key, _ in prefix_entries),
+            np.array([name_id for _, name_id in prefix_entries], dtype=np.uint32),
+            max_edits=max_edits,
+            posting_budget=posting_budget,
+        )
@@ -10,7 +10,9 @@ from .components import (
     display_loading,
     display_favorites_sidebar,
     display_user_message,
-    display_comfort_image
+    display_comfort_image,
+    turn_summary_html,
+    history_summary_html
 )
 from .styles import get_custom_css
 
@@ -26,5 +28,7 @@ __all__ = [
     'display_favorites_sidebar',
     'display_user_message',
     'display_comfort_image',
+    'turn_summary_html',
+    'history_summary_html',
     'get_custom_css'
 ]
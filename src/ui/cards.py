@@ -0,0 +1,155 @@
+"""Prebuilt, HTML-escaped card markup for catalog items.
+
+Every quote and song card used to be an f-string rebuilt on each render
+with the catalog text pasted in unescaped. The builders below escape all
+catalog text, and ``CardCache`` keeps the result per ``(kind, item id,
+layout variant)`` so a render is a dictionary lookup. The cache is tied to
+a catalog version and is emptied when a reloaded catalog is published.
+"""
+import threading
+from collections import OrderedDict
+from html import escape
+from typing import Callable, Dict, Optional, Tuple
+from urllib.parse import quote_plus
+
+from src.catalog.mapped import same_record
+
+
+def _safe_url(url: str) -> str:
+    """Escaped URL for an ``href``; anything but http(s) becomes ``#``."""
+    if not url or not url.startswith(("http://", "https://")):
+        return "#"
+    return escape(url)
+
+
+def quote_card_html(quote) -> str:
+    """Quote text and attribution as an escaped card."""
+    return (
+        f'<div class="quote-card">'
+        f'<div class="quote-text">"{escape(quote.text)}"</div>'
+        f'<div class="quote-attribution">'
+        f'— {escape(quote.character)}, <em>{escape(quote.movie)}</em> ({escape(str(quote.year))})'
+        f'</div></div>'
+    )
+
+
+def quote_search_link_html(quote) -> str:
+    """Web search link for the quote's movie."""
+    query = quote_plus(f"{quote.movie} {quote.year} movie")
+    return (f'<a href="https://www.google.com/search?q={escape(query)}" target="_blank" '
+            f'rel="noopener noreferrer">🔍 Search for this movie</a>')
+
+
+def favorite_quote_html(quote) -> str:
+    """Compact quote entry for the favorites sidebar."""
+    return (
+        f'<div style="background: #f0f8ff; padding: 0.75rem; margin: 0.5rem 0; '
+        f'border-radius: 6px; font-size: 0.875rem;">'
+        f'<em>"{escape(quote.text)}"</em><br>'
+        f'<small>— {escape(quote.movie)} ({escape(str(quote.year))})</small>'
+        f'</div>'
+    )
+
+
+def song_card_html(song) -> str:
+    """Song title, artist and why it helps as an escaped card."""
+    return (
+        f'<div class="quote-card" style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: white;">'
+        f'<div style="font-size: 1.5rem; font-weight: bold; margin-bottom: 0.5rem;">🎤 {escape(song.title)}</div>'
+        f'<div style="font-size: 1.1rem; margin-bottom: 1rem; opacity: 0.9;">by {escape(song.artist)}</div>'
+        f'<div style="background: rgba(255,255,255,0.2); padding: 0.75rem; border-radius: 8px; margin: 1rem 0;">'
+        f'<strong>🎯 Why this helps:</strong><br>{escape(song.why_it_helps)}</div>'
+        f'<div style="font-size: 0.875rem; opacity: 0.8;">{escape(song.genre)} • {escape(str(song.year))}</div>'
+        f'</div>'
+    )
+
+
+def song_link_html(song) -> str:
+    """YouTube button for a song (``#`` for non-http URLs)."""
+    return (
+        f'<div style="margin: 1rem 0; text-align: center;">'
+        f'<a href="{_safe_url(song.youtube_url)}" target="_blank" rel="noopener noreferrer" '
+        f'style="display: inline-block; background: #FF0000; color: white; '
+        f'padding: 1rem 2rem; border-radius: 8px; text-decoration: none; '
+        f'font-weight: bold; box-shadow: 0 2px 4px rgba(0,0,0,0.2);">📺 Watch on YouTube</a>'
+        f'</div>'
+    )
+
+
+def playlist_song_html(song) -> str:
+    """Compact song entry for the playlist sidebar."""
+    return (
+        f'<div style="background: linear-gradient(135deg, rgba(102,126,234,0.1) 0%, rgba(118,75,162,0.1) 100%); '
+        f'padding: 0.75rem; margin: 0.5rem 0; border-radius: 6px; font-size: 0.875rem; '
+        f'border-left: 3px solid #667eea;">'
+        f'<strong>{escape(song.title)}</strong><br>'
+        f'<small>🎤 {escape(song.artist)}</small>'
+        f'</div>'
+    )
+
+
+# (kind, layout variant) -> builder
+CARD_BUILDERS: Dict[Tuple[str, str], Callable[[object], str]] = {
+    ("quote", "card"): quote_card_html,
+    ("quote", "search"): quote_search_link_html,
+    ("quote", "favorite"): favorite_quote_html,
+    ("song", "card"): song_card_html,
+    ("song", "link"): song_link_html,
+    ("song", "playlist"): playlist_song_html,
+}
+
+
+def build_card_html(kind: str, item, variant: str) -> str:
+    """Build the markup for ``item`` without caching."""
+    return CARD_BUILDERS[(kind, variant)](item)
+
+
+class CardCache:
+    """Bounded LRU of card HTML for one catalog version, shared by all sessions.
+
+    Sessions keep items from older catalogs around (e.g. in their
+    conversation history) after a reload, and a reloaded catalog may reuse
+    their ids for different text. Only items of the current catalog are
+    therefore cached; older ones are built on each render.
+    """
+
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self.version = None
+        self._resolve: Optional[Callable[[str, str], object]] = None
+        self._lock = threading.Lock()
+        self._cards: "OrderedDict[Tuple[str, str, str], str]" = OrderedDict()
+
+    def sync(self, version, resolve: Optional[Callable[[str, str], object]] = None):
+        """Drop every card when a newer catalog version is published.
+
+        ``resolve(kind, item_id)`` returns the current catalog's item for an
+        id; only items that are the same record of the same catalog build are
+        cached. Runs that still use an older version don't switch the cache back.
+        """
+        with self._lock:
+            if self.version is None or version > self.version:
+                self._cards.clear()
+                self.version = version
+                self._resolve = resolve
+
+    def get(self, kind: str, item, variant: str) -> str:
+        """Card HTML for ``item`` in the given layout, built on first use."""
+        resolve = self._resolve
+        if resolve is not None and not same_record(resolve(kind, item.id), item):
+            return build_card_html(kind, item, variant)
+        key = (kind, item.id, variant)
+        with self._lock:
+            html = self._cards.get(key)
+            if html is not None:
+                self._cards.move_to_end(key)
+                return html
+        html = build_card_html(kind, item, variant)
+        with self._lock:
+            self._cards[key] = html
+            if len(self._cards) > self.max_entries:
+                self._cards.popitem(last=False)
+        return html
+
+    def __len__(self) -> int:
+        return len(self._cards)
@@ -1,8 +1,11 @@
 """UI components for Streamlit app."""
+from html import escape
+from typing import Optional
 import streamlit as st
 from src.emotion.analyzer import EmotionResult
 from src.quotes.database import Quote
 from config.settings import settings
+from .cards import build_card_html
 
 
 def display_header():
@@ -25,54 +28,89 @@ def display_disclaimer():
     """, unsafe_allow_html=True)
 
 
-def display_emotion_analysis(emotion_result: EmotionResult):
-    """Display emotion analysis result."""
+def emotion_analysis_html(emotion_result: EmotionResult) -> str:
+    """Emotion badge, intensity bar and secondary emotions as one HTML block."""
     if emotion_result.is_crisis:
-        display_crisis_alert()
-        return
+        return crisis_alert_html()
     
     emotion = emotion_result.primary_emotion
     intensity = emotion_result.intensity
     emoji = settings.EMOTION_EMOJIS.get(emotion, "😐")
     
-    st.markdown(f"""
-        <div class="emotion-badge">
-            {emoji} <strong>{emotion.capitalize()}</strong> 
-            (Intensity: {intensity:.1f})
-        </div>
-    """, unsafe_allow_html=True)
-    
     # Intensity bar
     from .styles import get_intensity_color
     color = get_intensity_color(intensity)
-    st.markdown(f"""
-        <div class="intensity-bar">
-            <div class="intensity-fill" style="width: {intensity*100}%; background: {color};"></div>
-        </div>
-    """, unsafe_allow_html=True)
-    
+    html = (
+        f'<div class="emotion-badge">{emoji} <strong>{escape(emotion.capitalize())}</strong> '
+        f'(Intensity: {intensity:.1f})</div>'
+        f'<div class="intensity-bar"><div class="intensity-fill" '
+        f'style="width: {intensity*100}%; background: {color};"></div></div>'
+    )
     if emotion_result.secondary_emotions:
-        st.caption(f"Also detected: {', '.join(emotion_result.secondary_emotions)}")
+        also = escape(', '.join(emotion_result.secondary_emotions))
+        html += f'<div style="font-size: 0.875rem; opacity: 0.6;">Also detected: {also}</div>'
+    return html
+
+
+def display_emotion_analysis(emotion_result: EmotionResult):
+    """Display emotion analysis result."""
+    st.markdown(emotion_analysis_html(emotion_result), unsafe_allow_html=True)
+
+
+def crisis_alert_html() -> str:
+    """Crisis resources message as an HTML block."""
+    return f'<div class="crisis-alert">{settings.CRISIS_MESSAGE}</div>'
 
 
 def display_crisis_alert():
     """Display crisis resources."""
-    st.markdown(f"""
-        <div class="crisis-alert">
-            {settings.CRISIS_MESSAGE}
-        </div>
-    """, unsafe_allow_html=True)
+    st.markdown(crisis_alert_html(), unsafe_allow_html=True)
+
+
+def transformation_html(original: str, transformed: str) -> str:
+    """Original thought and its reframe as one escaped HTML card."""
+    return (
+        f'<div class="transformation-card">'
+        f'<div class="original-text">💭 Your thought: "{escape(original)}"</div>'
+        f'<div class="arrow">↓</div>'
+        f'<div class="transformed-text">✨ Positive perspective: {escape(transformed)}</div>'
+        f'</div>'
+    )
+
+
+def turn_summary_html(user_input: str, emotion_result: EmotionResult,
+                      transformed: Optional[str] = None) -> str:
+    """User message, emotion analysis and reframe of one turn as a single
+    markdown block, so a finished turn costs one element instead of many."""
+    parts = [
+        user_message_html(user_input),
+        "### 🧠 Emotion Analysis",
+        emotion_analysis_html(emotion_result),
+    ]
+    if transformed is not None:
+        parts += ["### ✨ Positive Reframing", transformation_html(user_input, transformed)]
+    return "\n\n".join(parts)
+
+
+def history_summary_html(entries: list, max_chars: int = 80) -> str:
+    """One-line summaries (emotion and opening words) of collapsed turns."""
+    lines = []
+    for entry in entries:
+        emotion = entry['emotion'].primary_emotion
+        emoji = settings.EMOTION_EMOJIS.get(emotion, "😐")
+        message = entry['user_input']
+        if len(message) > max_chars:
+            message = message[:max_chars].rstrip() + "…"
+        lines.append(
+            f'<div style="padding: 0.25rem 0; font-size: 0.875rem; opacity: 0.7;">'
+            f'{emoji} <strong>{escape(emotion.capitalize())}</strong> · {escape(message)}</div>'
+        )
+    return "".join(lines)
 
 
 def display_transformation(original: str, transformed: str, key_suffix: str = ""):
     """Display original and transformed sentences."""
-    st.markdown(f"""
-        <div class="transformation-card">
-            <div class="original-text">💭 Your thought: "{original}"</div>
-            <div class="arrow">↓</div>
-            <div class="transformed-text">✨ Positive perspective: {transformed}</div>
-        </div>
-    """, unsafe_allow_html=True)
+    st.markdown(transformation_html(original, transformed), unsafe_allow_html=True)
     
     # Reframe button
     if st.button("🔄 Reframe differently", key=f"reframe_{key_suffix}"):
@@ -80,8 +118,32 @@ def display_transformation(original: str, transformed: str, key_suffix: str = ""
     return False
 
 
-def display_movie_quote(quote: Quote, key_suffix: str = "", show_poster: bool = True):
-    """Display movie quote card with optional poster."""
+def _image_source(url: str, variant: str):
+    """Local thumbnail bytes from the image store, or the remote URL as a fallback.
+
+    Never waits for a download: an image not stored yet is fetched in the
+    background and shown from its remote URL until then.
+    """
+    image_store = getattr(st.session_state, 'image_store', None)
+    data = image_store.get_cached(url, variant) if image_store else None
+    return data or url
+
+
+def _card_html(kind: str, item, variant: str) -> str:
+    """Card markup from the shared card cache, or built directly without one."""
+    card_cache = getattr(st.session_state, 'card_cache', None)
+    if card_cache is None:
+        return build_card_html(kind, item, variant)
+    return card_cache.get(kind, item, variant)
+
+
+def display_movie_quote(quote: Quote, key_suffix: str = "", show_poster: bool = True,
+                        poster_url: Optional[str] = None):
+    """Display movie quote card with optional poster.
+    
+    ``poster_url`` skips the poster lookup when it was already resolved
+    (e.g. by the alternate prefetcher).
+    """
     # Create columns for poster and quote
     if show_poster:
         col_poster, col_quote = st.columns([1, 2])
@@ -89,34 +151,23 @@ def display_movie_quote(quote: Quote, key_suffix: str = "", show_poster: bool =
         with col_poster:
             # Get movie poster
             poster_fetcher = getattr(st.session_state, 'poster_fetcher', None)
-            if poster_fetcher:
+            if poster_url is None:
+                poster_url = quote.poster_url  # baked into the catalog, if prefetched
+            if poster_url is None and poster_fetcher:
                 poster_url = poster_fetcher.search_movie_poster(quote.movie, quote.year)
+            if poster_url:
                 try:
-                    st.image(poster_url, use_container_width=True, caption=f"🎬 {quote.movie}")
+                    st.image(_image_source(poster_url, "poster"), use_container_width=True,
+                             caption=f"🎬 {quote.movie}")
                     # Add link to search for movie
-                    movie_search = quote.movie.replace(" ", "+")
-                    st.markdown(f"[🔍 Search for this movie](https://www.google.com/search?q={movie_search}+{quote.year}+movie)", unsafe_allow_html=True)
+                    st.markdown(_card_html("quote", quote, "search"), unsafe_allow_html=True)
                 except Exception as e:
                     print(f"Error displaying poster: {e}")
         
         with col_quote:
-            st.markdown(f"""
-                <div class="quote-card">
-                    <div class="quote-text">"{quote.text}"</div>
-                    <div class="quote-attribution">
-                        — {quote.character}, <em>{quote.movie}</em> ({quote.year})
-                    </div>
-                </div>
-            """, unsafe_allow_html=True)
+            st.markdown(_card_html("quote", quote, "card"), unsafe_allow_html=True)
     else:
-        st.markdown(f"""
-            <div class="quote-card">
-                <div class="quote-text">"{quote.text}"</div>
-                <div class="quote-attribution">
-                    — {quote.character}, <em>{quote.movie}</em> ({quote.year})
-                </div>
-            </div>
-        """, unsafe_allow_html=True)
+        st.markdown(_card_html("quote", quote, "card"), unsafe_allow_html=True)
     
     col1, col2 = st.columns([1, 1])
     
@@ -149,12 +200,7 @@ def display_favorites_sidebar():
         st.sidebar.subheader("❤️ Your Favorite Quotes")
         
         for quote in st.session_state.favorites:
-            st.sidebar.markdown(f"""
-                <div style="background: #f0f8ff; padding: 0.75rem; margin: 0.5rem 0; border-radius: 6px; font-size: 0.875rem;">
-                    <em>"{quote.text}"</em><br>
-                    <small>— {quote.movie} ({quote.year})</small>
-                </div>
-            """, unsafe_allow_html=True)
+            st.sidebar.markdown(_card_html("quote", quote, "favorite"), unsafe_allow_html=True)
         
         # Export button
         if st.sidebar.button("📥 Export Favorites"):
@@ -168,14 +214,7 @@ def display_favorites_sidebar():
         st.sidebar.subheader("🎵 My Playlist")
         
         for song in st.session_state.playlist:
-            st.sidebar.markdown(f"""
-                <div style="background: linear-gradient(135deg, rgba(102,126,234,0.1) 0%, rgba(118,75,162,0.1) 100%); 
-                     padding: 0.75rem; margin: 0.5rem 0; border-radius: 6px; font-size: 0.875rem;
-                     border-left: 3px solid #667eea;">
-                    <strong>{song.title}</strong><br>
-                    <small>🎤 {song.artist}</small>
-                </div>
-            """, unsafe_allow_html=True)
+            st.sidebar.markdown(_card_html("song", song, "playlist"), unsafe_allow_html=True)
         
         # Export playlist button
         if st.sidebar.button("📥 Export Playlist"):
@@ -224,13 +263,14 @@ def export_playlist():
     )
 
 
+def user_message_html(message: str) -> str:
+    """User message as an escaped HTML block."""
+    return f'<div class="user-message">{escape(message)}</div>'
+
+
 def display_user_message(message: str):
     """Display user message."""
-    st.markdown(f"""
-        <div class="user-message">
-            {message}
-        </div>
-    """, unsafe_allow_html=True)
+    st.markdown(user_message_html(message), unsafe_allow_html=True)
 
 
 def display_song_card(song, key_suffix: str = ""):
@@ -238,35 +278,10 @@ def display_song_card(song, key_suffix: str = ""):
     st.markdown("### 🎵 K-pop Recommendation")
     
     # Song info
-    st.markdown(f"""
-        <div class="quote-card" style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: white;">
-            <div style="font-size: 1.5rem; font-weight: bold; margin-bottom: 0.5rem;">
-                🎤 {song.title}
-            </div>
-            <div style="font-size: 1.1rem; margin-bottom: 1rem; opacity: 0.9;">
-                by {song.artist}
-            </div>
-            <div style="background: rgba(255,255,255,0.2); padding: 0.75rem; border-radius: 8px; margin: 1rem 0;">
-                <strong>🎯 Why this helps:</strong><br>
-                {song.why_it_helps}
-            </div>
-            <div style="font-size: 0.875rem; opacity: 0.8;">
-                {song.genre} • {song.year}
-            </div>
-        </div>
-    """, unsafe_allow_html=True)
+    st.markdown(_card_html("song", song, "card"), unsafe_allow_html=True)
     
-    # YouTube link - using direct markdown link
-    st.markdown(f"""
-        <div style="margin: 1rem 0; text-align: center;">
-            <a href="{song.youtube_url}" target="_blank" rel="noopener noreferrer" 
-               style="display: inline-block; background: #FF0000; color: white; 
-                      padding: 1rem 2rem; border-radius: 8px; text-decoration: none;
-                      font-weight: bold; box-shadow: 0 2px 4px rgba(0,0,0,0.2);">
-                📺 Watch on YouTube
-            </a>
-        </div>
-    """, unsafe_allow_html=True)
+    # YouTube link
+    st.markdown(_card_html("song", song, "link"), unsafe_allow_html=True)
     
     # Display URL for debugging
     st.caption(f"🔗 {song.youtube_url}")
@@ -289,8 +304,8 @@ def display_song_card(song, key_suffix: str = ""):
     return False
 
 
-def display_comfort_image(emotion: str, key_suffix: str = ""):
-    """Display AI-generated comfort image based on emotion."""
+def display_comfort_image(emotion: str, key_suffix: str = "", seed: int = 0):
+    """Display a locally generated comfort image based on emotion."""
     st.markdown("### 🎨 Comfort Image for You")
     
     # Check if we have image generator
@@ -298,10 +313,11 @@ def display_comfort_image(emotion: str, key_suffix: str = ""):
     
     if image_gen:
         try:
-            # Get image URL
-            image_url = image_gen.generate_comfort_image(emotion)
-            if image_url:
-                st.image(image_url, use_container_width=True, caption=f"A peaceful scene to comfort your {emotion}")
+            # PNG bytes, rendered locally (no network)
+            image = image_gen.generate_comfort_image(emotion, seed)
+            if image:
+                st.image(image, use_container_width=True,
+                         caption=f"A peaceful scene to comfort your {emotion}")
             else:
                 st.info("💡 Image temporarily unavailable")
         except Exception as e:
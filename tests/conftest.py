@@ -0,0 +1,5 @@
+"""Make the repository root importable when running ``pytest`` from anywhere."""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
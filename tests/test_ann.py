@@ -0,0 +1,70 @@
+import numpy as np
+
+from src.search.ann import IVFIndex
+from src.search.embedding import EmbeddingBuilder
+
+
+def unit_vectors(n=2000, dim=32, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((20, dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, 20, n)] + rng.standard_normal((n, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def test_probing_every_cell_is_exact():
+    matrix = unit_vectors()
+    index = IVFIndex.build(matrix, n_lists=16)
+    query = matrix[7]
+    found = [row for row, _ in index.search(query, 10, n_probe=16)]
+    expected = np.argsort(-(matrix @ query), kind="stable")[:10]
+    assert found == expected.tolist()
+
+
+def test_cells_index_the_matrix_without_copying_it():
+    matrix = unit_vectors()
+    index = IVFIndex.build(matrix, n_lists=16)
+    assert index.matrix is matrix
+    assert sorted(index.rows.tolist()) == list(range(len(matrix)))
+
+
+def test_allowed_mask_filters_inside_cells():
+    matrix = unit_vectors()
+    index = IVFIndex.build(matrix, n_lists=16)
+    allowed = np.zeros(len(matrix), dtype=bool)
+    allowed[::3] = True
+    rows = [row for row, _ in index.search(matrix[0], 20, n_probe=16, allowed=allowed)]
+    assert rows and all(row % 3 == 0 for row in rows)
+
+
+def test_save_and_load_keep_the_digest(tmp_path):
+    matrix = unit_vectors()
+    index = IVFIndex.build(matrix, n_lists=16, digest="abc")
+    path = tmp_path / "index.ivf.npz"
+    index.save(str(path))
+    loaded = IVFIndex.load(str(path), matrix)
+    assert loaded.digest == "abc"
+    assert loaded.matrix is matrix
+    np.testing.assert_array_equal(loaded.rows, index.rows)
+
+
+def _embeddings(texts):
+    builder = EmbeddingBuilder(dim=64)
+    for text in texts:
+        builder.add(text)
+    return builder.build()
+
+
+def test_enable_ann_ignores_an_index_for_another_catalog(tmp_path):
+    texts = [f"hope light {i} dream {i % 7}" for i in range(300)]
+    path = tmp_path / "quotes.ivf.npz"
+    stale = _embeddings(texts)
+    stale.enable_ann(min_items=1, digest="old")
+    stale.ann.save(str(path))
+
+    embeddings = _embeddings(texts)
+    embeddings.enable_ann(str(path), min_items=1, digest="new")
+    assert embeddings.ann.digest == "new"
+
+    reused = _embeddings(texts)
+    reused.enable_ann(str(path), min_items=1, digest="old")
+    np.testing.assert_array_equal(reused.ann.centroids, stale.ann.centroids)
@@ -0,0 +1,98 @@
+import random
+
+import numpy as np
+import pytest
+
+from src.music.database import SongDatabase
+from src.music.matcher import SongMatcher
+from src.quotes.database import QuoteDatabase
+from src.quotes.matcher import QuoteMatcher
+from src.search.bm25 import BM25Builder, BM25Index
+
+WORDS = "hope light dark alone together fear brave heart rain night dream home".split()
+
+
+def synthetic_index(n_docs=3000, seed=3):
+    rng = random.Random(seed)
+    builder = BM25Builder()
+    for _ in range(n_docs):
+        words = rng.choices(WORDS, k=rng.randint(3, 20))
+        words += [f"rare{rng.randint(0, 400)}" for _ in range(2)]
+        builder.add(" ".join(words) + " 希望光明")
+    return builder.build()
+
+
+def brute_force(index, query, k, exclude=None):
+    scores = index.scores(query)
+    if scores is None:
+        return []
+    if exclude is not None:
+        scores[exclude] = 0.0
+    rows = np.flatnonzero(scores)
+    rows = rows[np.lexsort((rows, -scores[rows]))][:k]
+    return [(int(row), float(scores[row])) for row in rows]
+
+
+@pytest.fixture(scope="module")
+def index():
+    return synthetic_index()
+
+
+@pytest.mark.parametrize("query", [
+    "hope", "alone night", "brave heart rain dream", "rare7 light", "rare13", "希望",
+    "hope light dark alone together fear", "nothing matches this",
+])
+def test_search_matches_brute_force(index, query):
+    for k in (1, 10, 50):
+        assert index.search(query, k) == brute_force(index, query, k)
+
+
+def test_exclude_mask(index):
+    exclude = np.zeros(len(index), dtype=bool)
+    for doc_id, _ in index.search("brave heart", 20):
+        exclude[doc_id] = True
+    found = index.search("brave heart", 10, exclude=exclude)
+    assert found == brute_force(index, "brave heart", 10, exclude)
+    assert not any(exclude[doc_id] for doc_id, _ in found)
+
+
+def test_frequent_terms_get_dense_columns(index):
+    assert index._dense_ids[index.vocab["hope"]] >= 0
+    assert index._dense_ids[index.vocab["rare7"]] < 0
+
+
+def test_array_round_trip(index):
+    loaded = BM25Index.from_arrays(index.to_arrays())
+    for query in ("hope rain", "rare21", "希望"):
+        assert loaded.search(query, 10) == index.search(query, 10)
+
+
+def test_matchers_rank_items_sharing_rare_query_terms_first():
+    quotes = QuoteDatabase.from_records(
+        [dict(id=f"q{i}", text=f"{WORDS[i % len(WORDS)]} and {WORDS[-1 - i % len(WORDS)]}",
+              movie="Movie", character="Someone", year=1995, emotions=["sadness"],
+              themes=["comfort"], genre="comedy") for i in range(30)]
+        + [dict(id="keeper", text="The lighthouse keeper kept the lamp lit.", movie="Movie",
+                character="Someone", year=1995, emotions=["sadness"], themes=["comfort"],
+                genre="comedy")])
+    songs = SongDatabase.from_records(
+        [dict(id=f"s{i}", title=f"Song {i}", artist="Band", emotions=["sadness"],
+              theme=WORDS[i % len(WORDS)], genre="Ballad", year=2015, why_it_helps="Gentle.",
+              spotify_url="", youtube_url="") for i in range(30)]
+        + [dict(id="keeper", title="Beacon", artist="Band", emotions=["sadness"],
+                theme="A lighthouse keeper waiting out the storm", genre="Ballad", year=2015,
+                why_it_helps="Gentle.", spotify_url="", youtube_url="")])
+    query = "I feel like a lighthouse keeper nobody visits"
+    for seed in range(5):
+        # Semantic ranking off, so only full-text relevance separates them
+        quote_matcher = QuoteMatcher(quotes, semantic_ranking=False, seed=seed)
+        song_matcher = SongMatcher(songs, semantic_ranking=False, seed=seed)
+        assert quote_matcher.match_quotes("sadness", count=3, query_text=query)[0].id == "keeper"
+        assert song_matcher.match_songs("sadness", count=3, query_text=query)[0].id == "keeper"
+
+        matched = quote_matcher.match_quotes("sadness", count=31, exclude_ids={"keeper", "q0"},
+                                             query_text=query)
+        assert len(matched) == 29 and not {q.id for q in matched} & {"keeper", "q0"}
+        matched = song_matcher.match_songs("sadness", count=31, exclude_ids={"keeper"},
+                                           query_text=query)
+        assert len(matched) == 30 and "keeper" not in {s.id for s in matched}
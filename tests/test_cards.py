@@ -0,0 +1,85 @@
+from dataclasses import asdict, replace
+
+from src.catalog.mapped import MappedCatalog, bind_records, encode_catalog
+from src.quotes.database import QUOTE_CATALOG_SCHEMA, MappedQuote, Quote
+from src.ui.cards import CardCache, build_card_html
+
+
+def quote(text="Just keep swimming.", **fields):
+    values = dict(id="q1", text=text, movie="Finding Nemo", character="Dory", year=2003,
+                  emotions=["hope"], themes=["perseverance"], genre="animation")
+    values.update(fields)
+    return Quote(**values)
+
+
+def catalog(*items):
+    """Resolver over one catalog version, like ``CatalogSnapshot.item``."""
+    by_id = {item.id: item for item in items}
+    return lambda kind, item_id: by_id.get(item_id)
+
+
+def test_catalog_text_is_escaped():
+    html = build_card_html("quote", quote('<script>alert("x")</script>', movie="A & B"), "card")
+    assert "<script>" not in html and "&lt;script&gt;" in html and "A &amp; B" in html
+    link = build_card_html("quote", quote(movie='"><img src=x>'), "search")
+    assert "<img" not in link
+
+
+def test_cards_are_built_once():
+    cache = CardCache()
+    current = quote()
+    cache.sync(1, catalog(current))
+    html = cache.get("quote", current, "card")
+    current.__dict__["text"] = "mutated"  # would show up if the card were rebuilt
+    assert cache.get("quote", current, "card") is html
+    assert len(cache) == 1
+
+
+def test_items_from_an_older_catalog_are_not_cached():
+    cache = CardCache()
+    old = quote("Old text")
+    cache.sync(1, catalog(old))
+    old_html = cache.get("quote", old, "card")
+
+    new = replace(old, text="New text")
+    cache.sync(2, catalog(new))
+    # A session still rendering the old object gets its own text...
+    assert cache.get("quote", old, "card") == old_html
+    assert len(cache) == 0
+    # ...and it does not leak into the current catalog's card
+    assert "New text" in cache.get("quote", new, "card")
+    assert "Old text" not in cache.get("quote", new, "card")
+
+
+def test_runs_on_an_older_version_do_not_switch_back():
+    cache = CardCache()
+    old, new = quote("Old text"), quote("New text")
+    cache.sync(2, catalog(new))
+    cache.get("quote", new, "card")
+    cache.sync(1, catalog(old))
+    assert cache.version == 2 and len(cache) == 1
+    assert "Old text" in cache.get("quote", old, "card")
+    assert len(cache) == 1
+
+
+def test_lazy_records_are_cached_by_row():
+    records = [asdict(quote(id=f"q{i}", text=f"Line {i}")) for i in range(3)]
+    quotes = bind_records(MappedQuote, MappedCatalog(encode_catalog(records, QUOTE_CATALOG_SCHEMA)))
+    cache = CardCache()
+    cache.sync(1, lambda kind, item_id: quotes[int(item_id[1:])])
+    html = cache.get("quote", quotes[1], "card")
+    # A fresh binding of the same row is the same item
+    assert cache.get("quote", quotes[1], "card") is html and len(cache) == 1
+
+    edited = bind_records(MappedQuote, MappedCatalog(encode_catalog(
+        [dict(r, text="Edited") for r in records], QUOTE_CATALOG_SCHEMA)))
+    cache.sync(2, lambda kind, item_id: edited[int(item_id[1:])])
+    assert "Line 1" in cache.get("quote", quotes[1], "card") and len(cache) == 0
+    assert "Edited" in cache.get("quote", edited[1], "card") and len(cache) == 1
+
+
+def test_lru_is_bounded():
+    cache = CardCache(max_entries=2)
+    for i in range(5):
+        cache.get("quote", quote(id=f"q{i}"), "card")
+    assert len(cache) == 2
@@ -0,0 +1,68 @@
+import json
+import os
+
+import pytest
+
+from src.catalog.manager import CatalogManager
+
+
+def quote(i, text="hold on"):
+    return {"id": f"q{i}", "text": f"{text} {i}", "movie": "Up", "character": "Carl",
+            "year": 2009, "emotions": ["sadness"], "themes": ["hope"], "genre": "animation"}
+
+
+SONG = {"id": "s1", "title": "Spring Day", "artist": "BTS", "emotions": ["sadness"],
+        "theme": "longing", "genre": "ballad", "year": 2017, "spotify_url": "",
+        "youtube_url": "", "why_it_helps": "comfort"}
+
+
+@pytest.fixture()
+def sources(tmp_path):
+    quotes, songs = tmp_path / "quotes.json", tmp_path / "songs.json"
+    quotes.write_text(json.dumps({"quotes": [quote(i) for i in range(3)]}))
+    songs.write_text(json.dumps({"songs": [SONG]}))
+    return quotes, songs
+
+
+@pytest.fixture()
+def manager(sources):
+    return CatalogManager(str(sources[0]), str(sources[1]), poll_interval=0)
+
+
+def test_edit_publishes_a_new_snapshot(manager, sources):
+    old = manager.snapshot
+    assert manager.check_for_changes() is False
+
+    sources[0].write_text(json.dumps({"quotes": [quote(i, "keep going") for i in range(4)]}))
+    assert manager.check_for_changes() is True
+    new = manager.snapshot
+    assert new is not old and new.version == 2 and manager.reload_count == 1
+    assert new.quote_db.get_quote_by_id("q3").text == "keep going 3"
+    # Readers holding the old snapshot keep a consistent view
+    assert old.quote_db.get_quote_by_id("q3") is None
+    assert old.quote_db.get_quote_by_id("q0").text == "hold on 0"
+
+
+def test_touching_a_file_is_not_a_change(manager, sources):
+    stat = os.stat(sources[0])
+    os.utime(sources[0], ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert manager.check_for_changes() is False
+    assert manager.version == 1
+
+
+def test_broken_source_keeps_the_current_snapshot(manager, sources):
+    good = manager.snapshot
+    sources[0].write_text('{"quotes": [')
+    assert manager.check_for_changes() is False
+    assert manager.snapshot is good and "empty" in manager.last_error
+    # The same broken content is not retried on every poll
+    assert manager.check_for_changes() is False
+
+    sources[0].write_text(json.dumps({"quotes": [quote(9)]}))
+    assert manager.check_for_changes() is True
+    assert manager.last_error is None and manager.stats()["version"] == 2
+
+
+def test_reload_always_publishes(manager):
+    assert manager.reload() is True
+    assert manager.version == 2
@@ -0,0 +1,93 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from check_urls import HostRateLimiter, check_link, check_links
+
+
+class Links(BaseHTTPRequestHandler):
+    requests = []
+    throttled = set()
+
+    def respond(self, status, retry_after=None):
+        self.send_response(status)
+        if retry_after is not None:
+            self.send_header("Retry-After", retry_after)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_HEAD(self):
+        type(self).requests.append(("HEAD", self.path))
+        if self.path == "/no-head":
+            self.respond(405)
+        elif self.path == "/busy" and self.path not in self.throttled:
+            self.throttled.add(self.path)
+            self.respond(429, "0")
+        else:
+            self.respond(404 if self.path == "/gone" else 200)
+
+    def do_GET(self):
+        type(self).requests.append(("GET", self.path))
+        self.respond(200)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture()
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Links)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    Links.requests = []
+    Links.throttled = set()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+
+
+def test_check_link_statuses(server):
+    limiter = HostRateLimiter(0)
+    assert check_link(f"{server}/ok", limiter)["ok"] is True
+    gone = check_link(f"{server}/gone", limiter)
+    assert gone["ok"] is False and gone["status"] == 404
+    # Hosts that refuse HEAD are checked with GET
+    assert check_link(f"{server}/no-head", limiter)["ok"] is True
+    assert ("GET", "/no-head") in Links.requests
+    # 429 is retried
+    assert check_link(f"{server}/busy", limiter)["status"] == 200
+    assert Links.requests.count(("HEAD", "/busy")) == 2
+
+
+def test_unreachable_links_report_the_error(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr("check_urls.RETRIES", 3)
+    monkeypatch.setattr("check_urls.time.sleep", sleeps.append)
+    result = check_link("http://127.0.0.1:9/nothing", HostRateLimiter(0), timeout=1)
+    assert result["ok"] is False and result["status"] is None and result["error"]
+    assert sleeps == [1, 2]  # no backoff after the last attempt
+
+
+def test_fresh_results_come_from_the_cache(server):
+    links = {f"{server}/ok": ["song:s1:spotify_url"],
+             f"{server}/gone": ["quote:q1:poster_url", "quote:q2:poster_url"]}
+    cache = {f"{server}/ok": {"ok": True, "status": 200, "error": None, "checked": time.time()}}
+    report, rechecked = check_links(links, cache, workers=2, host_rate=0, max_age=3600)
+    assert rechecked == 1 and Links.requests == [("HEAD", "/gone")]
+    assert (report["total"], report["ok"], report["broken"], report["unchecked"]) == (2, 1, 1, 0)
+    broken, ok = report["links"]
+    assert broken["used_by"] == ["quote:q1:poster_url", "quote:q2:poster_url"]
+    assert not broken["from_cache"] and ok["from_cache"]
+
+    # With no max age everything is rechecked
+    _, rechecked = check_links(links, cache, workers=2, host_rate=0, max_age=0)
+    assert rechecked == 2
+
+
+def test_host_rate_limit_spaces_requests_per_host():
+    limiter = HostRateLimiter(20)
+    started = time.monotonic()
+    for _ in range(3):
+        limiter.wait("a.example")
+    limiter.wait("b.example")
+    assert 0.09 <= time.monotonic() - started < 0.5
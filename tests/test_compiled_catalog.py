@@ -0,0 +1,83 @@
+import json
+
+import numpy as np
+
+from build_catalog import build
+from src.catalog.mapped import MappedCatalog, encode_catalog, write_catalog
+from src.quotes.database import QUOTE_CATALOG_SCHEMA, QuoteDatabase
+from src.search.packed import StringIds, StringTable
+
+QUOTES = [
+    {"id": f"q{i}", "text": f"hope {i} keeps the light on through the storm {i % 5}",
+     "movie": f"Movie {i % 7}", "character": f"Hero {i % 11}", "year": 1990 + i % 30,
+     "emotions": ["sadness", "hope"] if i % 2 else ["joy"], "themes": ["courage"],
+     "genre": "drama" if i % 3 else "animation"}
+    for i in range(60)
+]
+
+
+def test_string_table_lookup_and_bisect():
+    table = StringTable.build(["beta", "alpha", "gamma", "ünïcode"], lookup=True)
+    assert list(table) == ["beta", "alpha", "gamma", "ünïcode"]
+    assert table.find("gamma") == 2
+    assert table.find("ünïcode") == 3
+    assert table.find("delta") == -1
+
+    ids = StringIds(table)
+    assert ids["alpha"] == 1 and "beta" in ids and "delta" not in ids
+    assert ids.get("delta") is None
+
+    ordered = StringTable.build(sorted(["pear", "apple", "plum", "peach"]))
+    assert ordered.bisect_left("pe") == 1
+    assert ordered.bisect_left("pe￿") == 3
+
+
+def test_sections_round_trip_without_copying(tmp_path):
+    path = tmp_path / "quotes.cat"
+    sections = {"a.ints": np.arange(5, dtype=np.uint32),
+                "a.matrix": np.arange(12, dtype=np.float32).reshape(4, 3),
+                "b.empty": np.empty(0, dtype=np.int64)}
+    write_catalog(str(path), QUOTES[:3], QUOTE_CATALOG_SCHEMA, sections)
+
+    catalog = MappedCatalog.open(str(path))
+    assert catalog.get(2, "id") == "q2"
+    arrays = catalog.arrays("a.")
+    np.testing.assert_array_equal(arrays["ints"], sections["a.ints"])
+    np.testing.assert_array_equal(arrays["matrix"], sections["a.matrix"])
+    assert not arrays["matrix"].flags.writeable
+    assert len(catalog.array("b.empty")) == 0
+    catalog.close()  # arrays still refer to the mapping; must not raise
+    assert arrays["ints"].sum() == 10
+
+
+def test_compiled_catalog_opens_without_rebuilding(tmp_path):
+    source = tmp_path / "quotes.json"
+    source.write_text(json.dumps({"quotes": QUOTES}))
+    target = tmp_path / "quotes.cat"
+    build("quotes", str(source), str(target))
+
+    built = QuoteDatabase(str(source))
+    mapped = QuoteDatabase(str(target))
+    assert all("text" not in quote.__dict__ for quote in mapped.quotes)
+
+    def ids(pairs):
+        return [(item.id, round(score, 6)) for item, score in pairs]
+
+    assert ids(mapped.search_text("storm hope")) == ids(built.search_text("storm hope"))
+    assert ids(mapped.search_similar("light storm")) == ids(built.search_similar("light storm"))
+    assert ids(mapped.lookup("Movei 3")) == ids(built.lookup("Movei 3"))
+    assert mapped.autocomplete("her") == built.autocomplete("her")
+    assert [q.id for q in mapped.where(genre="animation", year=(2000, None))] == \
+        [q.id for q in built.where(genre="animation", year=(2000, None))]
+    assert [q.id for q in mapped.get_quotes_by_emotion("joy")] == \
+        [q.id for q in built.get_quotes_by_emotion("joy")]
+    np.testing.assert_array_equal(mapped.fields.codes("movie"), built.fields.codes("movie"))
+    assert mapped.get_quote_by_id("q5").text == QUOTES[5]["text"]
+    assert mapped.get_quote_by_id("missing") is None
+
+
+def test_catalog_without_indexes_is_indexed_on_open():
+    catalog = MappedCatalog(encode_catalog(QUOTES, QUOTE_CATALOG_SCHEMA))
+    database = QuoteDatabase.from_catalog(catalog)
+    assert [q.id for q, _ in database.search_text("storm")][:1]
+    assert database.get_quote_by_id("q7").movie == "Movie 0"
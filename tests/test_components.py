@@ -0,0 +1,28 @@
+from src.emotion.analyzer import EmotionResult
+from src.ui import history_summary_html, turn_summary_html
+
+
+def test_turn_summary_is_one_escaped_block():
+    result = EmotionResult("sadness", 0.7, ["loneliness", "<fear>"])
+    html = turn_summary_html("I <b>failed</b> & cried", result, "You tried & learned")
+    assert "I &lt;b&gt;failed&lt;/b&gt; &amp; cried" in html and "<b>failed" not in html
+    assert "Also detected: loneliness, &lt;fear&gt;" in html
+    assert "width: 70.0%" in html
+    assert html.index("Emotion Analysis") < html.index("Positive Reframing")
+    assert "You tried &amp; learned" in html
+
+
+def test_turn_summary_without_a_reframe_or_in_crisis():
+    assert "Positive Reframing" not in turn_summary_html("hi", EmotionResult("joy", 0.2, []))
+    crisis = turn_summary_html("help", EmotionResult("despair", 1.0, [], is_crisis=True))
+    assert 'class="crisis-alert"' in crisis and "intensity-bar" not in crisis
+
+
+def test_history_summary_lines():
+    entries = [{"user_input": "short <one>", "emotion": EmotionResult("fear", 0.5, [])},
+               {"user_input": "word " * 30, "emotion": EmotionResult("mystery", 0.5, [])}]
+    html = history_summary_html(entries, max_chars=20)
+    first, second = html.split("</div>")[:2]
+    assert "<strong>Fear</strong> · short &lt;one&gt;" in first
+    assert "😐 <strong>Mystery</strong> · word word word word…" in second
+    assert history_summary_html([]) == ""
@@ -0,0 +1,77 @@
+import pickle
+from dataclasses import replace
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from src.quotes.database import QuoteDatabase
+from src.quotes.matcher import QuoteMatcher
+from src.search.cursor import RecommendationCursor, ranking_fingerprint
+
+QUOTES_FILE = Path(__file__).resolve().parent.parent / "data" / "quotes.json"
+RANKED = np.array([40, 41, 42, 43, 44, 45, 46, 47], dtype=np.uint32)
+
+
+def walk(cursor, steps, seen=None):
+    return [cursor.advance(RANKED, seen) for _ in range(steps)]
+
+
+def test_tier_is_shuffled_and_the_tail_is_ranked():
+    cursor = RecommendationCursor.start("sadness", RANKED, 4, np.random.default_rng(0))
+    rows = walk(cursor, 8)
+    assert sorted(rows[:4]) == [40, 41, 42, 43] and rows[4:] == [44, 45, 46, 47]
+    assert not cursor.repeat
+
+
+def test_first_pass_skips_seen_rows_then_wraps():
+    cursor = RecommendationCursor.start("sadness", RANKED, 0)
+    assert walk(cursor, 5, lambda row: row % 2 == 0) == [41, 43, 45, 47, 40]
+    # Once wrapped nothing is skipped, so a fully seen list still yields rows
+    assert cursor.repeat
+    assert walk(cursor, 2, lambda row: True) == [41, 42]
+
+
+def test_state_round_trip():
+    cursor = RecommendationCursor.start("fear", RANKED, 6, np.random.default_rng(3))
+    walk(cursor, 3)
+    state = pickle.loads(pickle.dumps(cursor.to_state()))
+    restored = RecommendationCursor.from_state(state)
+    assert restored == cursor
+    assert walk(restored, 10) == walk(cursor, 10)
+    assert RecommendationCursor.from_state(None) is None
+
+
+def test_matches_checks_emotion_and_fingerprint():
+    cursor = RecommendationCursor.start("fear", RANKED, 4)
+    assert cursor.matches("fear", ranking_fingerprint(RANKED))
+    assert not cursor.matches("joy", ranking_fingerprint(RANKED))
+    assert not cursor.matches("fear", ranking_fingerprint(RANKED[::-1]))
+
+
+@pytest.fixture(scope="module")
+def matcher():
+    return QuoteMatcher(QuoteDatabase(str(QUOTES_FILE)), seed=0)
+
+
+def test_next_quote_walks_the_whole_ranking(matcher):
+    ranked, _ = matcher._ranked_rows("sadness")
+    shown, cursor = set(), None
+    for _ in range(len(ranked)):
+        quote, cursor = matcher.next_quote("sadness", shown, cursor)
+        assert quote.id not in shown
+        shown.add(quote.id)
+    assert not cursor.repeat
+    matcher.next_quote("sadness", shown, cursor)
+    assert cursor.repeat
+
+
+def test_stale_cursor_starts_over(matcher):
+    _, cursor = matcher.next_quote("fear", set())
+    _, cursor = matcher.next_quote("fear", set(), cursor)
+    assert cursor.position == 2
+
+    _, fresh = matcher.next_quote("fear", set(), replace(cursor, fingerprint=cursor.fingerprint + 1))
+    assert fresh is not cursor and fresh.position == 1
+    _, other = matcher.next_quote("loneliness", set(), cursor)
+    assert other.emotion == "loneliness" and other.position == 1
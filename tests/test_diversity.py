@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from src.search.diversity import attribute_similarity, mmr_order
+
+
+def test_attribute_similarity_mixes_codes_and_tags():
+    codes = {"movie": np.array([0, 0, 1]), "genre": np.array([5, 6, 6])}
+    tags = np.array([[1, 1, 0], [1, 0, 0], [0, 0, 0]], dtype=np.float32)
+    similarity = attribute_similarity(codes, {"movie": 2.0, "genre": 1.0, "tags": 1.0}, tags)
+    assert similarity[0, 1] == pytest.approx((2.0 + 0.5) / 4)  # same movie, tags 1/2
+    assert similarity[1, 2] == pytest.approx(1.0 / 4)  # genre only; empty tags share nothing
+    assert similarity[2, 2] == pytest.approx(3.0 / 4)
+    np.testing.assert_allclose(similarity, similarity.T)
+
+
+def test_attribute_similarity_ignores_unweighted_attributes():
+    codes = {"movie": np.array([0, 0]), "artist": np.array([1, 2])}
+    assert attribute_similarity(codes, {"artist": 1.0})[0, 1] == 0.0
+    assert not attribute_similarity(codes, {}).any()
+
+
+def test_no_diversity_is_a_relevance_sort():
+    relevance = np.array([0.2, 0.9, 0.5, 0.7])
+    order = mmr_order(relevance, np.ones((4, 4), np.float32), 4, diversity=0.0)
+    assert list(order) == [1, 3, 2, 0]
+
+
+def test_diversity_spreads_same_movie_items():
+    # Three near-equal candidates from one movie, one weaker from another
+    relevance = np.array([1.0, 0.98, 0.96, 0.6])
+    similarity = attribute_similarity({"movie": np.array([0, 0, 0, 1])}, {"movie": 1.0})
+    assert list(mmr_order(relevance, similarity, 2, diversity=0.0)) == [0, 1]
+    assert list(mmr_order(relevance, similarity, 2, diversity=0.5)) == [0, 3]
+
+
+def test_jitter_is_reproducible_with_a_seed():
+    relevance = np.ones(20)
+    similarity = np.zeros((20, 20), np.float32)
+    first = mmr_order(relevance, similarity, 5, rng=np.random.default_rng(7), jitter=0.1)
+    again = mmr_order(relevance, similarity, 5, rng=np.random.default_rng(7), jitter=0.1)
+    other = mmr_order(relevance, similarity, 5, rng=np.random.default_rng(8), jitter=0.1)
+    assert list(first) == list(again) and list(first) != list(other)
+
+
+def test_count_is_capped_at_the_pool_size():
+    order = mmr_order(np.array([0.1, 0.3]), np.eye(2, dtype=np.float32), 5)
+    assert sorted(order) == [0, 1]
+    assert len(mmr_order(np.array([]), np.zeros((0, 0), np.float32), 3)) == 0
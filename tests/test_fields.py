@@ -0,0 +1,94 @@
+import random
+
+import numpy as np
+import pytest
+
+from src.search.fields import And, Eq, FieldIndex, FieldIndexBuilder, In, Or, Query, Range, where
+
+KINDS = {"genre": "str", "emotions": "list", "year": "int"}
+GENRES = ["drama", "animation", "comedy"]
+EMOTIONS = ["joy", "sadness", "hope", "fear"]
+
+
+def synthetic_rows(n_rows=500, seed=2):
+    rng = random.Random(seed)
+    return [{"genre": rng.choice(GENRES), "emotions": rng.sample(EMOTIONS, rng.randint(0, 2)),
+             "year": rng.randint(1980, 2020)} for _ in range(n_rows)]
+
+
+@pytest.fixture(scope="module")
+def rows():
+    return synthetic_rows()
+
+
+@pytest.fixture(scope="module")
+def index(rows):
+    builder = FieldIndexBuilder(KINDS)
+    for row in rows:
+        builder.add(row)
+    return builder.build()
+
+
+def matching(rows, predicate):
+    return [i for i, row in enumerate(rows) if predicate(row)]
+
+
+@pytest.mark.parametrize("query, predicate", [
+    (Eq("genre", "drama"), lambda r: r["genre"] == "drama"),
+    (Eq("emotions", "hope"), lambda r: "hope" in r["emotions"]),
+    (Eq("year", 1999), lambda r: r["year"] == 1999),
+    (Eq("genre", "western"), lambda r: False),
+    (In("emotions", ["joy", "fear"]), lambda r: {"joy", "fear"} & set(r["emotions"])),
+    (Range("year", 2010), lambda r: r["year"] >= 2010),
+    (Range("year", None, 1990), lambda r: r["year"] <= 1990),
+    (Eq("emotions", "sadness") & Eq("genre", "animation") & Range("year", 2000, 2015),
+     lambda r: "sadness" in r["emotions"] and r["genre"] == "animation"
+     and 2000 <= r["year"] <= 2015),
+    (Eq("genre", "comedy") | Eq("emotions", "joy"),
+     lambda r: r["genre"] == "comedy" or "joy" in r["emotions"]),
+    (And(), lambda r: True),
+    (Or(), lambda r: False),
+])
+def test_queries_match_a_scan(index, rows, query, predicate):
+    found = index.rows(query)
+    assert found.dtype == np.uint32
+    assert list(found) == matching(rows, predicate)
+
+
+def test_where_builds_conditions(index, rows):
+    found = index.rows(where(genre="drama", emotions=["joy", "hope"], year=(1990, 2000)))
+    assert list(found) == matching(rows, lambda r: r["genre"] == "drama"
+                                   and {"joy", "hope"} & set(r["emotions"])
+                                   and 1990 <= r["year"] <= 2000)
+
+
+def test_per_row_columns(index, rows):
+    values = index.values("genre")
+    assert [values[code] for code in index.codes("genre")] == [r["genre"] for r in rows]
+    assert list(index.int_values("year")) == [r["year"] for r in rows]
+    with pytest.raises(KeyError):
+        index.postings("movie", "Up")
+
+
+def test_query_is_abstract():
+    with pytest.raises(TypeError):
+        Query()
+
+    class Incomplete(Query):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_array_round_trip(index):
+    loaded = FieldIndex.from_arrays(KINDS, index.to_arrays())
+    query = Eq("emotions", "fear") | Range("year", 2015)
+    np.testing.assert_array_equal(loaded.rows(query), index.rows(query))
+    np.testing.assert_array_equal(loaded.codes("genre"), index.codes("genre"))
+    np.testing.assert_array_equal(loaded.int_values("year"), index.int_values("year"))
+    # Per-row arrays come from the stored sections instead of being expanded again
+    arrays = index.to_arrays()
+    loaded = FieldIndex.from_arrays(KINDS, arrays)
+    assert loaded.codes("genre") is arrays["genre.by_row"]
+    assert loaded.int_values("year") is arrays["year.by_row"]
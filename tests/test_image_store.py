@@ -0,0 +1,153 @@
+import io
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+PIL = pytest.importorskip("PIL")
+from PIL import Image  # noqa: E402
+
+from src.image import store as store_module  # noqa: E402
+from src.image.store import ImageStore  # noqa: E402
+
+
+def png(color, size=(800, 1200)):
+    out = io.BytesIO()
+    Image.new("RGB", size, color).save(out, format="PNG")
+    return out.getvalue()
+
+
+class Upstream(BaseHTTPRequestHandler):
+    images = {"/red.png": png("red"), "/blue.png": png("blue"), "/green.png": png("green")}
+    requests = []
+    delay = 0.0
+
+    def do_GET(self):
+        type(self).requests.append(self.path)
+        time.sleep(self.delay)
+        body = self.images.get(self.path)
+        self.send_response(200 if body else 404)
+        self.send_header("Content-Length", str(len(body or b"")))
+        self.end_headers()
+        self.wfile.write(body or b"")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture()
+def upstream():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Upstream)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    Upstream.requests = []
+    Upstream.delay = 0.0
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_get_stores_a_display_size_thumbnail(tmp_path, upstream):
+    store = ImageStore(str(tmp_path))
+    data = store.get(f"{upstream}/red.png")
+    with Image.open(io.BytesIO(data)) as image:
+        assert image.format == "JPEG" and image.size == (400, 600)
+    assert store.get(f"{upstream}/red.png") == data
+    assert Upstream.requests == ["/red.png"]
+    assert ImageStore(str(tmp_path)).get(f"{upstream}/red.png") == data
+
+
+def test_get_cached_fills_in_the_background(tmp_path, upstream):
+    Upstream.delay = 0.2
+    store = ImageStore(str(tmp_path))
+    url = f"{upstream}/blue.png"
+    started = time.monotonic()
+    assert store.get_cached(url) is None
+    assert store.get_cached(url) is None  # already being fetched
+    assert time.monotonic() - started < 0.1
+    wait_for(lambda: store.get_cached(url) is not None)
+    assert Upstream.requests == ["/blue.png"]
+
+
+def test_failed_downloads_are_not_retried_on_every_render(tmp_path, upstream):
+    store = ImageStore(str(tmp_path))
+    url = f"{upstream}/missing.png"
+    assert store.get(url) is None
+    assert store.get_cached(url) is None
+    assert Upstream.requests == ["/missing.png"]
+
+
+def test_placeholders_are_never_downloaded(tmp_path):
+    store = ImageStore(str(tmp_path))
+    url = "https://placehold.co/400x600/1a1a2e/eee?text=Up&font=roboto"
+    assert store.get_cached(url) is None and store.get(url) is None
+    assert not store._inflight
+
+
+def test_cache_hits_do_not_write_the_index(tmp_path, upstream):
+    store = ImageStore(str(tmp_path))
+    url = f"{upstream}/red.png"
+    store.get(url)
+    changes = store._db.total_changes
+    for _ in range(20):
+        assert store.get_cached(url)
+    assert store._db.total_changes == changes
+
+
+def test_eviction_follows_unflushed_access_times(tmp_path, upstream, monkeypatch):
+    store = ImageStore(str(tmp_path))
+    red, blue, green = (f"{upstream}/{name}.png" for name in ("red", "blue", "green"))
+    store.get(red)
+    store.get(blue)
+    store.max_bytes = store.total_bytes * 5 // 4  # room for two thumbnails only
+    time.sleep(0.01)
+    assert store.get_cached(red)  # red is now more recent than blue, in memory only
+    store.get(green)
+    assert store.get_cached(red) and store.get_cached(green)
+    assert store.get(blue) is not None and Upstream.requests.count("/blue.png") == 2
+
+    monkeypatch.setattr(store_module, "ACCESS_FLUSH_SECONDS", 0)
+    changes = store._db.total_changes
+    store.get_cached(green)
+    assert store._db.total_changes > changes
+
+
+def test_slow_file_reads_do_not_block_other_lookups(tmp_path, upstream, monkeypatch):
+    store = ImageStore(str(tmp_path))
+    red, blue = f"{upstream}/red.png", f"{upstream}/blue.png"
+    store.get(red)
+    blue_data = store.get(blue)
+    red_file = store._path(store._digest(red, "poster"))
+    reading, release = threading.Event(), threading.Event()
+    read_bytes = type(red_file).read_bytes
+
+    def slow_read_bytes(path):
+        if path == red_file:
+            reading.set()
+            release.wait(5)
+        return read_bytes(path)
+
+    monkeypatch.setattr(type(red_file), "read_bytes", slow_read_bytes)
+    slow = threading.Thread(target=store.get_cached, args=(red,))
+    slow.start()
+    assert reading.wait(5)
+    assert store.get_cached(blue) == blue_data  # not stuck behind the red read
+    release.set()
+    slow.join(5)
+
+
+def test_vanished_files_are_forgotten(tmp_path, upstream):
+    store = ImageStore(str(tmp_path))
+    url = f"{upstream}/red.png"
+    store.get(url)
+    store._path(store._digest(url, "poster")).unlink()
+    assert store.get_cached(url) is None
+    assert store.total_bytes == 0 and store._digest(url, "poster") is None
+    wait_for(lambda: store.get_cached(url) is not None)  # downloaded again
@@ -0,0 +1,94 @@
+import json
+
+import pytest
+
+from src.catalog.loader import LoadReport, iter_catalog_items, validate_item
+from src.quotes.database import QUOTE_CATALOG_SCHEMA, QuoteDatabase
+
+ITEMS = [{"id": f"q{i}", "text": f"line {i} ✨ " * (i % 4), "year": 1990 + i, "n": 12345.5}
+         for i in range(40)]
+
+
+def items(path, array_key="quotes", chunk_size=7):
+    report = LoadReport(str(path))
+    found = [item for _, _, item in iter_catalog_items(str(path), array_key, report,
+                                                       chunk_size=chunk_size)]
+    return found, report
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64 * 1024])
+def test_streams_arrays_across_chunk_boundaries(tmp_path, chunk_size):
+    path = tmp_path / "quotes.json"
+    path.write_text(json.dumps(ITEMS, indent=2, ensure_ascii=False), encoding="utf-8")
+    found, report = items(path, chunk_size=chunk_size)
+    assert found == ITEMS and report.ok
+
+
+def test_finds_the_array_under_its_key(tmp_path):
+    path = tmp_path / "quotes.json"
+    path.write_text(json.dumps({"meta": {"quotes": "not this"}, "count": 40, "quotes": ITEMS}))
+    found, report = items(path)
+    assert found == ITEMS and report.ok
+
+    path.write_text(json.dumps({"songs": ITEMS}))
+    assert items(path) == ([], report)
+
+
+def test_positions_of_items_and_errors(tmp_path):
+    path = tmp_path / "quotes.json"
+    path.write_text('[\n  {"id": "a"},\n  {"id": "b"}\n  {"id": "c"}\n]')
+    report = LoadReport(str(path))
+    found = list(iter_catalog_items(str(path), None, report, chunk_size=5))
+    assert [(line, item["id"]) for line, _, item in found] == [(2, "a"), (3, "b")]
+    assert found[1][1] == path.read_text().index('{"id": "b"}')
+    assert len(report.issues) == 1
+    assert report.issues[0].line == 4 and "Expected ',' or ']'" in report.issues[0].message
+
+
+def test_json_lines_skip_bad_rows(tmp_path):
+    path = tmp_path / "quotes.jsonl"
+    path.write_text('{"id": "a"}\n\n{"id": \n{"id": "c"}\n', encoding="utf-8")
+    found, report = items(path)
+    assert [item["id"] for item in found] == ["a", "c"]
+    assert [issue.line for issue in report.issues] == [3]
+
+
+def test_oversized_items_are_rejected(tmp_path):
+    path = tmp_path / "quotes.json"
+    path.write_text(json.dumps([{"id": "big", "text": "x" * 5000}]))
+    report = LoadReport(str(path))
+    found = list(iter_catalog_items(str(path), None, report, chunk_size=64, max_item_chars=1000))
+    assert found == [] and not report.ok
+
+
+def test_validate_item():
+    good = {"id": "q1", "text": "t", "movie": "m", "character": "c", "year": 2000,
+            "emotions": ["joy"], "themes": [], "genre": "drama"}
+    optional = ["poster_url"]
+    assert validate_item(good, QUOTE_CATALOG_SCHEMA, optional) is None
+    assert validate_item({**good, "poster_url": None}, QUOTE_CATALOG_SCHEMA, optional) is None
+    assert "missing" in validate_item({"id": "q1"}, QUOTE_CATALOG_SCHEMA, optional)
+    assert "unknown" in validate_item({**good, "extra": 1}, QUOTE_CATALOG_SCHEMA, optional)
+    assert "year" in validate_item({**good, "year": True}, QUOTE_CATALOG_SCHEMA, optional)
+    assert "strings" in validate_item({**good, "emotions": [1]}, QUOTE_CATALOG_SCHEMA, optional)
+    assert validate_item({**good, "id": ""}, QUOTE_CATALOG_SCHEMA, optional) == "id is empty"
+    assert "object" in validate_item([good], QUOTE_CATALOG_SCHEMA)
+
+
+def test_database_reports_rejected_rows(tmp_path):
+    good = {"id": "q1", "text": "t", "movie": "m", "character": "c", "year": 2000,
+            "emotions": ["joy"], "themes": [], "genre": "drama"}
+    path = tmp_path / "quotes.json"
+    path.write_text(json.dumps({"quotes": [good, {**good, "id": "q2", "year": "2001"}]}))
+    database = QuoteDatabase(str(path))
+    assert [q.id for q in database.get_all_quotes()] == ["q1"]
+    assert database.load_report.loaded == 1
+    assert [issue.item_id for issue in database.load_report.issues] == ["q2"]
+
+
+@pytest.mark.parametrize("chunk_size", [3, 64 * 1024])
+def test_line_numbers_of_many_items(tmp_path, chunk_size):
+    path = tmp_path / "quotes.json"
+    path.write_text("[\n" + ",\n".join(json.dumps({"id": f"q{i}"}) for i in range(2000)) + "\n]")
+    found = list(iter_catalog_items(str(path), None, LoadReport(str(path)), chunk_size=chunk_size))
+    assert [line for line, _, _ in found] == list(range(2, 2002))
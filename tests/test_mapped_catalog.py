@@ -0,0 +1,114 @@
+import dataclasses
+import tracemalloc
+
+import numpy as np
+import pytest
+
+from src.catalog.mapped import (
+    MappedCatalog, bind_records, encode_catalog, read_field, same_record, write_catalog,
+)
+from src.quotes.database import QUOTE_CATALOG_SCHEMA, MappedQuote, Quote, QuoteDatabase
+
+RECORDS = [
+    {"id": "q0", "text": "Ohana means family.", "movie": "Lilo & Stitch", "character": "Stitch",
+     "year": 2002, "emotions": ["loneliness", "joy"], "themes": [], "genre": "animation",
+     "poster_url": "https://img/lilo.jpg"},
+    {"id": "q1", "text": "Hakuna matata ✨ — no worries", "movie": "The Lion King",
+     "character": "Timon", "year": None, "emotions": [], "themes": ["acceptance"],
+     "genre": "animation", "poster_url": None},
+]
+
+
+@pytest.fixture()
+def catalog():
+    return MappedCatalog(encode_catalog(RECORDS, QUOTE_CATALOG_SCHEMA))
+
+
+def test_records_round_trip(catalog):
+    assert len(catalog) == 2 and catalog.fields == QUOTE_CATALOG_SCHEMA
+    first = catalog.get_record(0)
+    assert first == RECORDS[0]
+    second = catalog.get_record(1)
+    assert second["text"] == "Hakuna matata ✨ — no worries"
+    assert second["year"] == 0 and second["emotions"] == [] and second["poster_url"] == ""
+
+
+def test_file_round_trip(tmp_path):
+    path = tmp_path / "quotes.cat"
+    assert write_catalog(str(path), RECORDS, QUOTE_CATALOG_SCHEMA) == 2
+    catalog = MappedCatalog.open(str(path))
+    assert catalog.get(1, "movie") == "The Lion King"
+    assert catalog.digest == MappedCatalog(path.read_bytes()).digest
+    catalog.close()
+
+
+def test_lazy_records_decode_on_access(catalog):
+    quotes = bind_records(MappedQuote, catalog)
+    quote = quotes[0]
+    assert "text" not in quote.__dict__
+    assert read_field(quote, "text") == "Ohana means family."
+    assert "text" not in quote.__dict__  # read_field does not keep a copy
+    assert quote.text == "Ohana means family." and "text" in quote.__dict__
+    assert isinstance(quote, Quote)
+    assert dataclasses.asdict(quote) == RECORDS[0]
+
+
+def test_fields_with_defaults_are_lazy_too(catalog):
+    found, empty = bind_records(MappedQuote, catalog)
+    assert "poster_url" not in found.__dict__
+    assert found.poster_url == "https://img/lilo.jpg"
+    assert empty.poster_url is None  # empty column value reads as the default
+    assert MappedQuote.poster_url is None
+
+
+def test_missing_column_reads_as_default():
+    schema = {name: kind for name, kind in QUOTE_CATALOG_SCHEMA.items() if name != "poster_url"}
+    older = MappedCatalog(encode_catalog(RECORDS, schema))
+    quote = bind_records(MappedQuote, older)[0]
+    assert quote.poster_url is None and quote.movie == "Lilo & Stitch"
+    with pytest.raises(AttributeError):
+        quote.not_a_field
+
+
+def test_records_are_bound_on_access(catalog):
+    quotes = bind_records(MappedQuote, catalog)
+    assert len(quotes) == 2 and quotes[np.uint32(1)].id == "q1" and quotes[-1].id == "q1"
+    assert [q.id for q in quotes] == ["q0", "q1"] and [q.id for q in quotes[1:]] == ["q1"]
+    with pytest.raises(IndexError):
+        quotes[2]
+    # Every access binds a new record; same_record still sees the same row
+    assert quotes[0] is not quotes[0] and same_record(quotes[0], quotes[0])
+    assert not same_record(quotes[0], quotes[1])
+    other_build = bind_records(MappedQuote, MappedCatalog(encode_catalog(RECORDS, QUOTE_CATALOG_SCHEMA)))
+    assert same_record(other_build[0], quotes[0])  # same content
+    assert not same_record(dataclasses.replace(quotes[0], text="changed"), quotes[0])
+
+
+def compiled_catalog(tmp_path, count):
+    records = [dict(RECORDS[0], id=f"q{i}", text=f"line {i}", movie=f"Movie {i % 50}",
+                    year=1990 + i % 30) for i in range(count)]
+    path = tmp_path / f"quotes{count}.cat"
+    write_catalog(str(path), records, QUOTE_CATALOG_SCHEMA,
+                  QuoteDatabase.from_records(records).index_sections())
+    return str(path)
+
+
+def test_opening_does_not_grow_with_the_catalog(tmp_path):
+    def opened_bytes(path):
+        tracemalloc.start()
+        database = QuoteDatabase(path)
+        used = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        assert database.get_quote_by_id("q7").text == "line 7"
+        return used
+
+    small, large = compiled_catalog(tmp_path, 500), compiled_catalog(tmp_path, 20000)
+    opened_bytes(small)  # warm up one-time allocations
+    assert opened_bytes(large) - opened_bytes(small) < 20000  # under one byte per extra row
+
+
+def test_rejects_bad_input():
+    with pytest.raises(ValueError):
+        encode_catalog(RECORDS, {"id": "float"})
+    with pytest.raises(ValueError):
+        MappedCatalog(b"NOTACATALOG" + bytes(64))
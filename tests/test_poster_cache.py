@@ -0,0 +1,149 @@
+import json
+import threading
+
+import pytest
+import requests
+
+from src.image.generator import MoviePosterFetcher
+from src.image.poster_cache import PosterCache
+
+
+def response(status, body=None):
+    reply = requests.Response()
+    reply.status_code = status
+    reply._content = json.dumps(body).encode("utf-8")
+    return reply
+
+
+class StubSession:
+    """Stands in for ``requests.Session``; replies are returned (or raised) in order."""
+
+    def __init__(self, *replies):
+        self.replies = list(replies)
+        self.calls = 0
+
+    def get(self, url, params=None, timeout=None):
+        self.calls += 1
+        reply = self.replies.pop(0)
+        if isinstance(reply, Exception):
+            raise reply
+        return reply
+
+
+def fetcher_with(*replies):
+    fetcher = MoviePosterFetcher(cache=PosterCache())
+    fetcher.session = StubSession(*replies)
+    return fetcher
+
+
+def test_misses_are_cached_until_they_expire():
+    cache = PosterCache()
+    cache.put("Up", 2009, None)
+    assert cache.contains("Up", 2009) and cache.get("Up", 2009) is None
+    assert cache.get_or_fetch("up ", 2009, lambda: pytest.fail("refetched")) is None
+
+    expired = PosterCache(miss_ttl=0)
+    expired.put("Up", 2009, None)
+    assert not expired.contains("Up", 2009)
+
+
+def test_results_survive_a_restart(tmp_path):
+    path = str(tmp_path / "posters.sqlite3")
+    PosterCache(path).put("Amélie", 2001, "https://img/amelie.jpg")
+    PosterCache(path).put("Brazil", 1985, None)
+    reopened = PosterCache(path)
+    assert reopened.get("amélie", 2001) == "https://img/amelie.jpg"
+    assert reopened.contains("Brazil", 1985)
+
+
+def test_failed_fetch_is_not_cached():
+    cache = PosterCache()
+
+    def fail():
+        raise RuntimeError("provider down")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_fetch("Heat", 1995, fail)
+    assert not cache.contains("Heat", 1995)
+    assert cache.get_or_fetch("Heat", 1995, lambda: "https://img/heat.jpg") == "https://img/heat.jpg"
+
+
+def test_waiting_caller_takes_over_a_failed_fetch():
+    cache = PosterCache()
+    started, release = threading.Event(), threading.Event()
+
+    def failing_fetch():
+        started.set()
+        release.wait(5)
+        raise RuntimeError("timeout")
+
+    def first():
+        with pytest.raises(RuntimeError):
+            cache.get_or_fetch("Jaws", 1975, failing_fetch)
+
+    thread = threading.Thread(target=first)
+    thread.start()
+    started.wait(5)
+    result = []
+    waiter = threading.Thread(target=lambda: result.append(
+        cache.get_or_fetch("Jaws", 1975, lambda: "https://img/jaws.jpg")))
+    waiter.start()
+    release.set()
+    thread.join(5)
+    waiter.join(5)
+    assert result == ["https://img/jaws.jpg"]
+    assert cache.fetches == 2
+
+
+def test_only_real_answers_are_cached_as_not_found():
+    fetcher = fetcher_with(response(404))
+    assert fetcher.search_movie_poster("Nowhere", 1999) == fetcher.get_fallback_poster_url("Nowhere")
+    assert fetcher.cache.contains("Nowhere", 1999)
+
+    fetcher = fetcher_with(response(200, []))
+    fetcher.search_movie_poster("Nothing", 2000)
+    assert fetcher.cache.contains("Nothing", 2000)
+
+
+@pytest.mark.parametrize("failure", [
+    response(503), response(429), response(403), requests.Timeout("read timed out"),
+])
+def test_provider_failures_are_not_cached(failure):
+    fetcher = fetcher_with(failure, response(200, [{"posterUrl": "https://img/alien.jpg"}]))
+    assert fetcher.search_movie_poster("Alien", 1979) == fetcher.get_fallback_poster_url("Alien")
+    assert not fetcher.cache.contains("Alien", 1979)
+    assert fetcher.search_movie_poster("Alien", 1979) == "https://img/alien.jpg"
+    assert fetcher.session.calls == 2
+
+
+@pytest.mark.parametrize("body", [{"error": "bad request"}, ["oops"], "text", None])
+def test_malformed_responses_fall_back_without_caching(body):
+    fetcher = fetcher_with(response(200, body))
+    assert fetcher.search_movie_poster("Solaris", 1972) == fetcher.get_fallback_poster_url("Solaris")
+    assert not fetcher.cache.contains("Solaris", 1972)
+    assert fetcher.provider_health()["movieofthenight"]["error_rate"] == 1.0
+
+
+def test_tmdb_response_shape_is_checked():
+    fetcher = fetcher_with(response(200, [{"poster_path": "/x.jpg"}]),  # TMDB, malformed
+                           response(200, []))  # public provider, no poster
+    fetcher.api_key = "key"
+    assert fetcher.search_movie_poster("Ran", 1985) == fetcher.get_fallback_poster_url("Ran")
+    assert fetcher.provider_health()["tmdb"]["error_rate"] == 1.0
+    assert not fetcher.cache.contains("Ran", 1985)
+    fetcher.session.replies.insert(0, response(200, {"results": [{"poster_path": "/ran.jpg"}]}))
+    assert fetcher.search_movie_poster("Ran", 1985) == "https://image.tmdb.org/t/p/w500/ran.jpg"
+
+
+def test_half_open_probe_that_fails_unexpectedly_is_recorded():
+    fetcher = fetcher_with(response(200, {"not": "a list"}),
+                           response(200, [{"posterUrl": "https://img/ikiru.jpg"}]))
+    health = fetcher.health["movieofthenight"]
+    health.min_calls, health.cooldown = 1, 0.0
+    health.record(False, 0.01)
+    assert health.state == "half-open"
+
+    fetcher.search_movie_poster("Ikiru", 1952)  # the probe gets a malformed body
+    assert health.state == "half-open" and health.allow()  # reopened, probe slot freed
+    health.record(True, 0.01)
+    assert fetcher.search_movie_poster("Ikiru", 1952) == "https://img/ikiru.jpg"
@@ -0,0 +1,109 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.search.prefetch import AlternatePrefetcher
+
+
+def step(state):
+    """Cursor over the integers: item n, state (n + 1,)."""
+    n = state[0] if state else 0
+    return n, False, (n + 1,)
+
+
+@pytest.fixture()
+def executor():
+    executor = ThreadPoolExecutor(max_workers=2)
+    yield executor
+    executor.shutdown(wait=True)
+
+
+def test_take_steps_now_when_nothing_is_queued(executor):
+    cursors = {}
+    prefetcher = AlternatePrefetcher(executor, cursors)
+    assert prefetcher.take("k", step, lambda n: f"poster-{n}").poster_url == "poster-0"
+    assert prefetcher.take("k", step).item == 1
+    assert cursors == {"k": (2,)} and prefetcher.hit_rate == 0.0
+
+
+def test_prefetched_alternates_continue_the_cursor(executor):
+    prefetcher = AlternatePrefetcher(executor, {}, depth=3)
+    prefetcher.take("k", step)
+    prefetcher.fill("k", step, lambda n: f"poster-{n}")
+    prefetcher._pending["k"].result(5)
+    taken = [prefetcher.take("k", step) for _ in range(4)]
+    assert [a.item for a in taken] == [1, 2, 3, 4]
+    assert [a.poster_url for a in taken[:3]] == ["poster-1", "poster-2", "poster-3"]
+    assert prefetcher.hit_rate == 3 / 5
+
+
+def test_clear_discards_fills_in_flight(executor):
+    cursors = {}
+    prefetcher = AlternatePrefetcher(executor, cursors)
+    resolving, release = threading.Event(), threading.Event()
+
+    def slow_resolve(n):
+        resolving.set()
+        release.wait(5)
+        return f"poster-{n}"
+
+    prefetcher.fill("k", step, slow_resolve)
+    future = prefetcher._pending["k"]
+    assert resolving.wait(5)
+    prefetcher.clear()
+    release.set()
+    future.result(5)
+
+    assert cursors == {} and prefetcher._queues == {}
+    assert prefetcher.take("k", step).item == 0  # starts over, nothing stale queued
+
+
+def test_take_does_not_wait_long_for_a_poster(executor):
+    prefetcher = AlternatePrefetcher(executor, {}, resolve_timeout=0.05)
+    release = threading.Event()
+    started = time.monotonic()
+    alternate = prefetcher.take("k", step, lambda n: release.wait(5) and "late")
+    assert time.monotonic() - started < 1.0
+    assert alternate.item == 0 and alternate.poster_url is None
+    release.set()
+
+
+def test_take_survives_a_failing_resolver(executor):
+    prefetcher = AlternatePrefetcher(executor, {})
+
+    def broken(n):
+        raise KeyError(0)
+
+    alternate = prefetcher.take("k", step, broken)
+    assert alternate.item == 0 and alternate.poster_url is None
+
+
+def test_queued_alternates_shown_since_are_skipped(executor):
+    shown = {0}
+
+    def unseen_step(state):
+        n = state[0] if state else 0
+        while n in shown:
+            n += 1
+        return n, False, (n + 1,)
+
+    prefetcher = AlternatePrefetcher(executor, {}, depth=2)
+    prefetcher.fill("k", unseen_step)
+    prefetcher._pending["k"].result(5)
+    assert [a.item for a in prefetcher._queues["k"]] == [1, 2]
+
+    # The next turn recommends 1 directly while it is still queued
+    shown.add(1)
+    taken = prefetcher.take("k", unseen_step, shown=lambda n: n in shown)
+    assert taken.item == 2
+    shown.add(2)
+    assert prefetcher.take("k", unseen_step, shown=lambda n: n in shown).item == 3
+
+
+def test_repeating_alternates_are_not_skipped(executor):
+    prefetcher = AlternatePrefetcher(executor, {}, depth=1)
+    prefetcher.fill("k", lambda state: (7, True, (0,)))
+    prefetcher._pending["k"].result(5)
+    assert prefetcher.take("k", step, shown=lambda n: True).item == 7
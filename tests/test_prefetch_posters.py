@@ -0,0 +1,80 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from prefetch_posters import RateLimiter, fetch_poster, prefetch
+from src.image.generator import TMDB_IMAGE_BASE
+from src.image.poster_cache import PosterCache
+
+
+def quote(i, movie, **extra):
+    return {"id": f"q{i}", "text": "t", "movie": movie, "character": "c", "year": 2000 + i,
+            "emotions": ["joy"], "themes": [], "genre": "drama", **extra}
+
+
+class Tmdb(BaseHTTPRequestHandler):
+    requests = []
+    throttled = set()
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)["query"][0]
+        type(self).requests.append(query)
+        if query == "Broken" or (query == "Busy" and query not in self.throttled):
+            self.throttled.add(query)
+            self.send_response(429 if query == "Busy" else 500)
+            self.send_header("Retry-After", "0")
+            self.end_headers()
+            return
+        results = [] if query == "Nowhere" else [{"poster_path": f"/{query.lower()}.jpg"}]
+        body = json.dumps({"results": results}).encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture()
+def tmdb():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Tmdb)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    Tmdb.requests = []
+    Tmdb.throttled = set()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+def test_fetch_poster_retries_throttled_requests(tmdb):
+    limiter = RateLimiter(0)
+    assert fetch_poster("Busy", 2001, "key", tmdb, limiter) == f"{TMDB_IMAGE_BASE}/busy.jpg"
+    assert Tmdb.requests == ["Busy", "Busy"]
+    assert fetch_poster("Nowhere", None, "key", tmdb, limiter) is None
+
+
+def test_prefetch_bakes_posters_and_skips_known_ones(tmp_path, tmdb, capsys):
+    path = tmp_path / "quotes.json"
+    records = [quote(0, "Up"), quote(1, "Up", year=2000), quote(2, "Nowhere"), quote(3, "Broken"),
+               quote(4, "Coco", poster_url="https://example.com/coco.jpg")]
+    path.write_text(json.dumps({"version": 2, "quotes": records}))
+    cache = PosterCache(None)
+
+    stats = prefetch(path, "key", tmdb, workers=3, rate=0, cache=cache)
+    assert stats == {"found": 1, "not_found": 1, "failed": 1, "baked": 2}
+    assert "Coco" not in Tmdb.requests and Tmdb.requests.count("Up") == 1
+
+    document = json.loads(path.read_text())
+    assert document["version"] == 2
+    posters = {q["id"]: q.get("poster_url") for q in document["quotes"]}
+    assert posters["q0"] == posters["q1"] == f"{TMDB_IMAGE_BASE}/up.jpg"
+    assert posters["q2"] is None and posters["q3"] is None
+    assert posters["q4"] == "https://example.com/coco.jpg"
+    # Failures are not cached, so the next run only retries them
+    assert not cache.contains("Broken", 2003) and cache.contains("Nowhere", 2002)
+    Tmdb.requests = []
+    prefetch(path, "key", tmdb, workers=3, rate=0, cache=cache)
+    assert set(Tmdb.requests) == {"Broken"}
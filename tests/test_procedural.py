@@ -0,0 +1,44 @@
+import io
+
+import numpy as np
+import pytest
+
+from src.image.generator import ComfortImageGenerator
+from src.image.procedural import PALETTES, comfort_png, render_comfort_scene
+
+
+def test_scene_is_determined_by_emotion_and_seed():
+    scene = render_comfort_scene("sadness", 1, (160, 120))
+    assert scene.shape == (120, 160, 3) and scene.dtype == np.uint8
+    np.testing.assert_array_equal(scene, render_comfort_scene("Sadness", 1, (160, 120)))
+    assert not np.array_equal(scene, render_comfort_scene("sadness", 2, (160, 120)))
+    assert not np.array_equal(scene, render_comfort_scene("joy", 1, (160, 120)))
+
+
+def test_palette_colors_show_up():
+    scene = render_comfort_scene("anxiety", 0, (200, 150)).astype(int)
+    sky_top, _ = PALETTES["anxiety"]["sky"]
+    nearest_hill = PALETTES["anxiety"]["hills"][-1]
+    assert np.abs(scene[0, 0] - sky_top).max() <= 30 or np.abs(scene[0, -1] - sky_top).max() <= 30
+    assert np.abs(scene[-1, 0] - nearest_hill).max() <= 30
+
+
+def test_unknown_emotions_use_the_neutral_palette():
+    boredom = render_comfort_scene("boredom", 0, (80, 60)).astype(int)
+    neutral_top, _ = PALETTES["neutral"]["sky"]
+    assert np.abs(boredom[0].mean(axis=0) - neutral_top).max() <= 40
+
+
+def test_png_round_trip():
+    Image = pytest.importorskip("PIL.Image")
+    data = comfort_png("fear", 3, (64, 48))
+    with Image.open(io.BytesIO(data)) as image:
+        assert image.size == (64, 48) and image.mode == "RGB"
+        np.testing.assert_array_equal(np.asarray(image), render_comfort_scene("fear", 3, (64, 48)))
+
+
+def test_png_is_memoized():
+    generator = ComfortImageGenerator()
+    first = generator.generate_comfort_image("Joy", seed=5)
+    assert generator.generate_comfort_image("joy", seed=5) is first
+    assert first.startswith(b"\x89PNG\r\n\x1a\n")
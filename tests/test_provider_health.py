@@ -0,0 +1,42 @@
+import time
+
+from src.image.health import CLOSED, HALF_OPEN, OPEN, ProviderHealth
+
+
+def test_breaker_opens_on_error_rate():
+    health = ProviderHealth("stub", min_calls=4, failure_threshold=0.5)
+    for ok in (True, False, True):
+        assert health.allow()
+        health.record(ok, 0.01)
+    assert health.state == CLOSED
+    health.record(False, 0.01)
+    assert health.state == OPEN and not health.allow()
+    snapshot = health.snapshot()
+    assert snapshot["error_rate"] == 0.5 and snapshot["retry_in"] > 0
+
+
+def test_slow_calls_count_as_failures():
+    health = ProviderHealth("stub", min_calls=2, slow_call_seconds=0.5)
+    health.record(True, 1.0)
+    health.record(True, 1.0)
+    assert health.state == OPEN
+
+
+def test_half_open_lets_one_probe_through():
+    health = ProviderHealth("stub", min_calls=1, cooldown=0.0)
+    health.record(False, 0.01)
+    assert health.state == HALF_OPEN
+    assert health.allow()
+    assert not health.allow()  # probe in flight
+    health.record(True, 0.01)
+    assert health.state == CLOSED and health.allow()
+
+
+def test_failed_probe_reopens():
+    health = ProviderHealth("stub", min_calls=1, cooldown=0.05)
+    health.record(False, 0.01)
+    assert not health.allow()
+    time.sleep(0.06)
+    assert health.allow()
+    health.record(False, 0.01)
+    assert health.state == OPEN and not health.allow()
@@ -0,0 +1,64 @@
+from pathlib import Path
+
+import pytest
+
+from src.emotion.analyzer import EmotionResult
+from src.quotes.database import QuoteDatabase
+from src.quotes.matcher import QuoteMatcher
+from src.search.tags import mix_emotions
+
+QUOTES_FILE = Path(__file__).resolve().parent.parent / "data" / "quotes.json"
+
+
+@pytest.fixture(scope="module")
+def database():
+    return QuoteDatabase(str(QUOTES_FILE))
+
+
+def related_tags(*emotions):
+    tags = set(emotions)
+    for emotion in emotions:
+        tags.update(QuoteMatcher.EMOTION_MAPPINGS.get(emotion, {}))
+    return tags
+
+
+def test_mix_emotions_weighs_secondaries_by_intensity():
+    calm = mix_emotions("sadness", ["fear", "sadness", ""], 0.0, 0.5)
+    intense = mix_emotions("sadness", ["fear"], 1.0, 0.5)
+    assert calm == {"sadness": 1.0, "fear": 0.5}
+    assert intense == {"sadness": 1.0, "fear": 0.25}
+    assert mix_emotions("joy", ["fear"], 7, 0.5)["fear"] == 0.25  # intensity is clamped
+
+
+def test_results_carry_the_requested_emotions(database):
+    matcher = QuoteMatcher(database, seed=1)
+    result = EmotionResult("loneliness", 0.4, ["fear"])
+    quotes = matcher.match_quotes_for_result(result, count=3)
+    assert len(quotes) == 3 and len({q.id for q in quotes}) == 3
+    assert all(related_tags("loneliness", "fear") & set(q.emotions) for q in quotes)
+    assert related_tags("loneliness") & set(quotes[0].emotions)
+
+
+def test_secondary_emotions_only_add_candidates(database):
+    matcher = QuoteMatcher(database, seed=1)
+    only = {q.id for q in matcher.match_quotes("loneliness", count=20)}
+    mixed = {q.id for q in matcher.match_quotes_for_result(
+        EmotionResult("loneliness", 0.4, ["fear"]), count=20)}
+    assert len(mixed) >= len(only)
+    assert any(related_tags("fear") & set(database.get_quote_by_id(i).emotions) for i in mixed - only)
+
+
+def test_seeded_matches_are_reproducible_and_respect_exclusions(database):
+    result = EmotionResult("sadness", 0.8, ["disappointment"])
+    first = [q.id for q in QuoteMatcher(database, seed=3).match_quotes_for_result(result, 4)]
+    again = [q.id for q in QuoteMatcher(database, seed=3).match_quotes_for_result(result, 4)]
+    assert first == again
+    excluded = QuoteMatcher(database, seed=3).match_quotes_for_result(
+        result, 4, exclude_ids=set(first[:2]))
+    assert not {q.id for q in excluded} & set(first[:2])
+
+
+def test_unknown_emotion_falls_back_to_general_quotes(database):
+    matcher = QuoteMatcher(database, seed=0)
+    quotes = matcher.match_quotes("wanderlust", count=3)
+    assert quotes and all({"hope", "perseverance"} & set(q.themes) for q in quotes)
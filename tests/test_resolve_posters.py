@@ -0,0 +1,66 @@
+import threading
+import time
+
+from src.image.generator import MoviePosterFetcher, ProviderUnavailable
+from src.image.poster_cache import PosterCache
+
+
+def fetcher_with(lookup):
+    fetcher = MoviePosterFetcher(cache=PosterCache(None), max_workers=4)
+    calls = []
+
+    def find(movie, year=None):
+        calls.append(movie)
+        return lookup(movie)
+
+    fetcher._find_poster = find
+    return fetcher, calls
+
+
+def test_posters_resolve_in_order_and_once_per_movie():
+    fetcher, calls = fetcher_with(lambda movie: f"https://img/{movie}.jpg")
+    urls = fetcher.resolve_posters([("Up", 2009), ("Coco", 2017), ("Up", 2009)])
+    assert urls == ["https://img/Up.jpg", "https://img/Coco.jpg", "https://img/Up.jpg"]
+    assert sorted(calls) == ["Coco", "Up"]
+    # Cached movies are answered without a lookup
+    assert fetcher.resolve_posters([("Coco", 2017)]) == ["https://img/Coco.jpg"]
+    assert len(calls) == 2
+
+
+def test_lookups_share_one_deadline():
+    release = threading.Event()
+
+    def lookup(movie):
+        if movie == "Slow":
+            release.wait(5)
+        time.sleep(0.05)
+        return f"https://img/{movie}.jpg"
+
+    fetcher, _ = fetcher_with(lookup)
+    movies = [("Slow", None)] + [(f"Movie {i}", None) for i in range(3)]
+    started = time.monotonic()
+    urls = fetcher.resolve_posters(movies, timeout=0.3)
+    assert time.monotonic() - started < 0.6  # not 0.3 s per movie
+    assert urls[0] == fetcher.get_fallback_poster_url("Slow")
+    assert urls[1:] == [f"https://img/Movie {i}.jpg" for i in range(3)]
+
+    # The slow lookup finishes in the background and is cached for next time
+    release.set()
+    deadline = time.monotonic() + 5
+    while not fetcher.cache.contains("Slow", None):
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    assert fetcher.resolve_posters([("Slow", None)]) == ["https://img/Slow.jpg"]
+
+
+def test_failed_and_missing_posters_get_placeholders():
+    def lookup(movie):
+        if movie == "Down":
+            raise ProviderUnavailable("tmdb")
+        return None
+
+    fetcher, _ = fetcher_with(lookup)
+    urls = fetcher.resolve_posters([("Down", None), ("Nowhere", None)])
+    assert urls == [fetcher.get_fallback_poster_url("Down"),
+                    fetcher.get_fallback_poster_url("Nowhere")]
+    assert not fetcher.cache.contains("Down", None) and fetcher.cache.contains("Nowhere", None)
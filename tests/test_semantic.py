@@ -0,0 +1,97 @@
+import numpy as np
+
+from src.music.database import SongDatabase
+from src.music.matcher import SongMatcher
+from src.quotes.database import QuoteDatabase
+from src.quotes.matcher import QuoteMatcher
+from src.search.embedding import EmbeddingBuilder
+
+FILLER = ["Tomorrow is another day.", "The rain will stop eventually.",
+          "Every storm runs out of rain.", "Tears water the garden.",
+          "Grief is love with nowhere to go.", "Even the darkest night ends.",
+          "It is okay not to be okay.", "Small steps are still steps."]
+QUERY = "I keep missing my old friends from back home"
+PARAPHRASE = "Missing old friends means home still matters."
+
+
+def quote_records():
+    records = [dict(id=f"q{i}", text=f"{FILLER[i % len(FILLER)]} ({i})", movie="Movie",
+                    character="Someone", year=1995, emotions=["sadness"], themes=["comfort"],
+                    genre="comedy") for i in range(24)]
+    records.append(dict(records[0], id="friends", text=PARAPHRASE))
+    return records
+
+
+def song_records():
+    records = [dict(id=f"s{i}", title=f"Song {i}", artist="Band", emotions=["sadness"],
+                    theme=FILLER[i % len(FILLER)], genre="Ballad", year=2015,
+                    why_it_helps=f"A gentle song ({i}).", spotify_url="", youtube_url="")
+               for i in range(24)]
+    records.append(dict(records[0], id="friends", theme=PARAPHRASE))
+    return records
+
+
+def semantic_only(matcher):
+    matcher.TEXT_MATCH_WEIGHT = 0  # leave full-text matching out of it
+    return matcher
+
+
+def test_similar_items_rank_first():
+    quotes = QuoteDatabase.from_records(quote_records())
+    songs = SongDatabase.from_records(song_records())
+    firsts = []
+    for seed in range(8):
+        ranked = semantic_only(QuoteMatcher(quotes, seed=seed)).match_quotes(
+            "sadness", count=3, query_text=QUERY)
+        assert ranked[0].id == "friends"
+        ranked = semantic_only(SongMatcher(songs, seed=seed)).match_songs(
+            "sadness", count=3, query_text=QUERY)
+        assert ranked[0].id == "friends"
+        plain = semantic_only(QuoteMatcher(quotes, semantic_ranking=False, seed=seed))
+        firsts.append(plain.match_quotes("sadness", count=3, query_text=QUERY)[0].id)
+    # Without the semantic stage it is just one of many equally tagged quotes
+    assert firsts.count("friends") < len(firsts)
+
+
+def test_excluded_similar_items_are_never_returned():
+    quotes = QuoteDatabase.from_records(quote_records())
+    songs = SongDatabase.from_records(song_records())
+    assert quotes.search_similar(QUERY, k=3)[0][0].id == "friends"
+    assert "friends" not in {q.id for q, _ in quotes.search_similar(QUERY, k=25, exclude_ids={"friends"})}
+    for seed in range(5):
+        matched = semantic_only(QuoteMatcher(quotes, seed=seed)).match_quotes(
+            "sadness", count=25, exclude_ids={"friends", "q1"}, query_text=QUERY)
+        assert len(matched) == 23 and not {q.id for q in matched} & {"friends", "q1"}
+        matched = semantic_only(SongMatcher(songs, seed=seed)).match_songs(
+            "sadness", count=25, exclude_ids={"friends"}, query_text=QUERY)
+        assert len(matched) == 24 and "friends" not in {s.id for s in matched}
+
+
+def test_exact_search_matches_brute_force_cosine():
+    rng = np.random.default_rng(0)
+    words = "rain night home friend hope light road sea song heart fear morning".split()
+    texts = [" ".join(rng.choice(words, size=5)) for _ in range(300)]
+    builder = EmbeddingBuilder()
+    for text in texts:
+        builder.add(text)
+    index = builder.build()
+
+    query = "a friend on the road home at night"
+    vectors = np.stack([index.embedder.embed(text) for text in texts])
+    np.testing.assert_allclose(vectors, index.matrix, atol=1e-6)
+    query_vector = index.embedder.embed(query)
+    cosine = vectors @ query_vector / (np.linalg.norm(vectors, axis=1) * np.linalg.norm(query_vector))
+
+    exclude = rng.random(len(texts)) < 0.2
+    allowed = rng.random(len(texts)) < 0.7
+    for kwargs, mask in [({}, np.ones(len(texts), bool)),
+                         ({"exclude": exclude}, ~exclude),
+                         ({"exclude": exclude, "allowed": allowed}, allowed & ~exclude)]:
+        hits = index.search(query, k=10, **kwargs)
+        rows = [row for row, _ in hits]
+        assert all(mask[rows])
+        expected = np.flatnonzero(mask)[np.argsort(-cosine[mask], kind="stable")][:10]
+        np.testing.assert_allclose([score for _, score in hits], cosine[expected], atol=1e-5)
+        # Ties may come in any order; the scores and the set of rows above the cut must agree
+        cut = cosine[expected[-1]]
+        assert set(np.flatnonzero(mask & (cosine > cut + 1e-5))) <= set(rows)
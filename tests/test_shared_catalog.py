@@ -0,0 +1,126 @@
+import json
+import os
+import subprocess
+import sys
+import tracemalloc
+import uuid
+
+import pytest
+
+from src.catalog import shared
+from src.catalog.shared import LeaseSlotsFull, SharedCatalogRegistry, load_shared_snapshot
+
+pytestmark = pytest.mark.skipif(not os.path.isdir(shared.SHM_DIR), reason="needs /dev/shm")
+
+QUOTES = [{"id": f"q{i}", "text": f"hold on {i}", "movie": "Up", "character": "Carl",
+           "year": 2009, "emotions": ["sadness"], "themes": ["hope"], "genre": "animation"}
+          for i in range(5)]
+SONGS = [{"id": f"s{i}", "title": f"Spring Day {i}", "artist": "BTS", "emotions": ["sadness"],
+          "theme": "longing", "genre": "ballad", "year": 2017, "spotify_url": "",
+          "youtube_url": "", "why_it_helps": "comfort"} for i in range(5)]
+
+
+@pytest.fixture()
+def sources(tmp_path):
+    quotes, songs = tmp_path / "quotes.json", tmp_path / "songs.json"
+    quotes.write_text(json.dumps({"quotes": QUOTES}))
+    songs.write_text(json.dumps({"songs": SONGS}))
+    return {"quotes": str(quotes), "songs": str(songs)}
+
+
+@pytest.fixture()
+def registry():
+    registry = SharedCatalogRegistry(f"test-catalog-{uuid.uuid4().hex[:8]}")
+    yield registry
+    registry.destroy()
+    os.unlink(registry.lock_path)
+
+
+def published(registry, generation):
+    return all(os.path.exists(os.path.join(shared.SHM_DIR, registry.segment_name(kind, generation)))
+               for kind in shared.CATALOG_KINDS)
+
+
+def test_leases_share_one_generation(registry, sources):
+    first = registry.attach(sources, "v1")
+    second = registry.attach(sources, "v1")
+    assert first.generation == second.generation == 1
+    assert registry.holders() == {1: [os.getpid(), os.getpid()]}
+    assert first.catalogs["quotes"].get(3, "id") == "q3"
+
+    first.release()
+    first.release()  # idempotent
+    second.release()
+    assert registry.holders() == {}
+    assert published(registry, 1)  # still current
+
+
+def test_superseded_generation_is_unlinked_after_last_release(registry, sources):
+    snapshot = load_shared_snapshot(sources["quotes"], sources["songs"], registry, "v1")
+    newer = registry.attach(sources, "v2")
+    assert newer.generation == 2 and published(registry, 1)
+
+    snapshot.lease.release()
+    assert not published(registry, 1) and published(registry, 2)
+    # Unlinking only drops the names; the mapped catalog stays readable
+    assert snapshot.quote_db.get_quote_by_id("q2").text == "hold on 2"
+    newer.release()
+
+
+def test_dead_holders_are_reaped(registry, sources):
+    registry.attach(sources, "v1")
+    dead = subprocess.run([sys.executable, "-c", "import os; print(os.getpid())"],
+                          capture_output=True, text=True, check=True)
+    dead_pid = int(dead.stdout)
+    with registry._locked(), registry._control() as buf:
+        slots = registry._slots(buf)
+        slots[0][1] = dead_pid  # as if the holder crashed without releasing
+        registry._store_slots(buf, slots)
+
+    lease = registry.attach(sources, "v2")
+    assert registry.holders() == {2: [os.getpid()]}
+    assert not published(registry, 1)
+    lease.release()
+
+
+def test_attach_fails_when_every_slot_is_held(registry, sources, monkeypatch):
+    monkeypatch.setattr(shared, "_SLOTS", 2)
+    leases = [registry.attach(sources, "v1") for _ in range(2)]
+    with pytest.raises(LeaseSlotsFull):
+        registry.attach(sources, "v1")
+    assert registry.holders() == {1: [os.getpid()] * 2}  # nothing was dropped
+
+    leases[0].release()
+    registry.attach(sources, "v1").release()
+    leases[1].release()
+
+
+def test_old_control_layout_is_rejected(registry, sources, monkeypatch):
+    monkeypatch.setattr(shared, "_SLOTS", 2)
+    registry.attach(sources, "v1").release()
+    monkeypatch.setattr(shared, "_SLOTS", 4)
+    with pytest.raises(OSError, match="older layout"):
+        registry.attach(sources, "v1")
+
+
+def test_attaching_costs_about_the_same_for_any_catalog_size(registry, tmp_path):
+    def attach_bytes(count):
+        quotes = tmp_path / f"quotes{count}.json"
+        quotes.write_text(json.dumps({"quotes": [
+            dict(QUOTES[0], id=f"q{i}", text=f"hold on {i}", movie=f"Movie {i % 40}",
+                 year=1990 + i % 30) for i in range(count)]}))
+        sources = {"quotes": str(quotes), "songs": str(tmp_path / "songs.json")}
+        registry.attach(sources, f"v{count}").release()  # compile and publish
+        tracemalloc.start()
+        snapshot = load_shared_snapshot(sources["quotes"], sources["songs"], registry, f"v{count}")
+        used = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        assert snapshot.quote_matcher.match_quotes("sadness", count=1)
+        snapshot.lease.release()
+        return used
+
+    (tmp_path / "songs.json").write_text(json.dumps({"songs": SONGS}))
+    attach_bytes(100)  # warm up one-time allocations
+    small, large = attach_bytes(100), attach_bytes(20000)
+    # Only the matchers' one-byte base scores grow with the catalog
+    assert large - small < 2 * 20000
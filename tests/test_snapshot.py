@@ -0,0 +1,63 @@
+import dataclasses
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from src.catalog.snapshot import load_snapshot
+from src.emotion.transformer import SentenceTransformer
+
+QUOTES = [{"id": f"q{i}", "text": f"keep going {i}", "movie": "Up", "character": "Carl",
+           "year": 2009, "emotions": ["sadness"], "themes": ["hope"], "genre": "animation"}
+          for i in range(6)]
+SONGS = [{"id": f"s{i}", "title": f"Song {i}", "artist": "BTS", "emotions": ["sadness"],
+          "theme": "longing", "genre": "ballad", "year": 2017, "spotify_url": "",
+          "youtube_url": "", "why_it_helps": "comfort"} for i in range(4)]
+
+
+@pytest.fixture()
+def snapshot(tmp_path):
+    quotes, songs = tmp_path / "quotes.json", tmp_path / "songs.json"
+    quotes.write_text(json.dumps({"quotes": QUOTES}))
+    songs.write_text(json.dumps({"songs": SONGS}))
+    return load_snapshot(str(quotes), str(songs), version=3)
+
+
+def test_snapshot_is_frozen_and_finds_items(snapshot):
+    assert snapshot.version == 3
+    assert snapshot.item("quote", "q2").text == "keep going 2"
+    assert snapshot.item("song", "s1").title == "Song 1"
+    assert snapshot.item("quote", "missing") is None
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        snapshot.version = 4
+
+
+def test_sessions_share_matchers_without_leaking_state(snapshot):
+    seen_by_a = {"q0", "q1", "q2"}
+    a = snapshot.quote_matcher.match_quotes("sadness", count=3, exclude_ids=seen_by_a)
+    b = snapshot.quote_matcher.match_quotes("sadness", count=6, exclude_ids=set())
+    assert not {q.id for q in a} & seen_by_a
+    assert {q.id for q in b} == {q["id"] for q in QUOTES}
+    assert seen_by_a == {"q0", "q1", "q2"}
+    songs = snapshot.song_matcher.match_songs("sadness", count=4, exclude_ids={"s0"})
+    assert {s.id for s in songs} == {"s1", "s2", "s3"}
+
+
+class RecordingClient:
+    def __init__(self):
+        self.prompts = []
+        self.chat = SimpleNamespace(completions=self)
+
+    def create(self, model, messages, **kwargs):
+        self.prompts.append(messages[0]["content"])
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=" ok "))])
+
+
+def test_transformer_style_is_per_call():
+    client = RecordingClient()
+    transformer = SentenceTransformer(client)
+    assert transformer.transform("I failed", "sadness", style="humorous") == "ok"
+    transformer.transform("I failed", "sadness")
+    assert "light humor" in client.prompts[0]
+    assert "Gently reframe" in client.prompts[1]
+    assert transformer.style == "gentle"
@@ -0,0 +1,80 @@
+import random
+
+import numpy as np
+import pytest
+
+from src.search.tags import EmotionTagWeights, TagMatrix, TagMatrixBuilder, top_k
+
+TAGS = ["sadness", "loss", "hope", "fear", "anxiety", "joy"]
+MAPPINGS = {"sadness": {"sadness": 1.0, "loss": 0.6}, "fear": {"fear": 1.0, "anxiety": 0.7},
+            "neutral": {}}
+
+
+@pytest.fixture(scope="module")
+def items():
+    rng = random.Random(4)
+    return [rng.sample(TAGS, rng.randint(0, 3)) for _ in range(300)]
+
+
+@pytest.fixture(scope="module")
+def matrix(items):
+    builder = TagMatrixBuilder()
+    for tags in items:
+        builder.add(tags + tags[:1])  # duplicates count once
+    return builder.build()
+
+
+def test_scores_are_a_sparse_product(matrix, items):
+    weights = np.random.default_rng(0).random(len(matrix.vocab)).astype(np.float32)
+    expected = [sum(weights[matrix.vocab[t]] for t in set(tags)) for tags in items]
+    np.testing.assert_allclose(matrix.scores(weights), expected, rtol=1e-6)
+
+
+def test_dense_and_mask(matrix, items):
+    rows = np.array([5, 0, 17, 299])
+    dense = matrix.dense(rows)
+    for out, row in zip(dense, rows):
+        assert {tag for tag, i in matrix.vocab.items() if out[i]} == set(items[row])
+    mask = matrix.mask(["hope", "unknown"])
+    assert list(np.flatnonzero(mask)) == [i for i, tags in enumerate(items) if "hope" in tags]
+
+
+def test_cooccurrence_is_a_conditional_probability(matrix, items):
+    p = matrix.cooccurrence()
+    hope, fear = matrix.vocab["hope"], matrix.vocab["fear"]
+    with_hope = [set(tags) for tags in items if "hope" in tags]
+    assert p[hope, fear] == pytest.approx(sum("fear" in tags for tags in with_hope) / len(with_hope))
+    assert not np.diag(p).any()
+
+
+def test_emotion_weights_mix_mapped_rows(matrix):
+    weights = EmotionTagWeights(MAPPINGS, matrix)
+    vector = weights.tag_weights({"sadness": 1.0, "fear": 0.5})
+    assert vector[matrix.vocab["loss"]] == pytest.approx(0.6)
+    assert vector[matrix.vocab["anxiety"]] == pytest.approx(0.35)
+    # Unmapped emotions match their own tag; unknown ones match nothing
+    assert weights.tag_weights({"joy": 1.0})[matrix.vocab["joy"]] == 1.0
+    assert not weights.tag_weights({"boredom": 1.0}).any()
+    assert not weights.tag_weights({"neutral": 1.0}).any()
+
+
+def test_prior_spreads_to_cooccurring_tags(matrix):
+    weights = EmotionTagWeights(MAPPINGS, matrix, prior_weight=0.3)
+    plain = weights.tag_weights({"sadness": 1.0})
+    spread = weights.tag_weights({"sadness": 1.0}, prior=True)
+    expected = plain + 0.3 * plain @ matrix.cooccurrence()
+    np.testing.assert_allclose(spread, expected, rtol=1e-5)
+    assert spread[matrix.vocab["hope"]] > plain[matrix.vocab["hope"]] == 0
+
+
+def test_top_k():
+    scores = np.array([0.5, 3.0, 1.0, 3.0, 2.0], dtype=np.float32)
+    assert list(top_k(scores, 3)) == [1, 3, 4]
+    assert list(top_k(scores, 10, scores < 3)) == [4, 2, 0]
+
+
+def test_array_round_trip(matrix):
+    loaded = TagMatrix.from_arrays(matrix.to_arrays())
+    assert loaded.vocab == matrix.vocab and len(loaded) == len(matrix)
+    weights = np.arange(len(matrix.vocab), dtype=np.float32)
+    np.testing.assert_array_equal(loaded.scores(weights), matrix.scores(weights))
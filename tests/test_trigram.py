@@ -0,0 +1,79 @@
+import random
+
+import pytest
+
+from src.search.trigram import TrigramIndex, TrigramIndexBuilder, normalize, trigrams
+
+SYLLABLES = "ka lo mi ne ru sa to vi ya ze bo da".split()
+WORDS = "love night blue star heart moon road".split()
+
+
+def synthetic_names(n_names=2000, seed=5):
+    rng = random.Random(seed)
+    return [" ".join(rng.sample(WORDS, rng.randint(0, 2))
+                     + ["".join(rng.choices(SYLLABLES, k=rng.randint(2, 4)))]).title()
+            for _ in range(n_names)]
+
+
+def brute_force_similarity(index, query, name_id):
+    query_grams = set(trigrams(normalize(query)))
+    name_grams = set(trigrams(normalize(index.names[name_id])))
+    return 2.0 * len(query_grams & name_grams) / (len(query_grams) + len(name_grams))
+
+
+@pytest.fixture(scope="module")
+def index():
+    builder = TrigramIndexBuilder()
+    for row, name in enumerate(synthetic_names()):
+        builder.add(row, "title" if row % 2 else "artist", name)
+    return builder.build()
+
+
+def test_similarities_are_exact_dice(index):
+    for query in ("Blue Kalomi", "moon rusato", "Heart Yazebo"):
+        found = index.search(query, 20, min_similarity=0.0)
+        assert found
+        for name_id, similarity in found:
+            assert similarity == pytest.approx(brute_force_similarity(index, query, name_id))
+        assert [s for _, s in found] == sorted((s for _, s in found), reverse=True)
+
+
+def test_misspelled_names_are_found(index):
+    rng = random.Random(11)
+    hits = 0
+    for name_id in rng.sample(range(len(index)), 50):
+        name = index.names[name_id]
+        i = rng.randrange(len(name))
+        typo = name[:i] + name[i + 1:]
+        hits += any(found == name_id for found, _ in index.search(typo, 10))
+    assert hits >= 45
+
+
+def test_duplicate_names_share_rows(index):
+    builder = TrigramIndexBuilder()
+    builder.add(0, "movie", "The Lion King")
+    builder.add(3, "movie", "the lion  king!")
+    builder.add(4, "character", "Simba")
+    small = builder.build()
+    assert len(small) == 2
+    name_id, similarity = small.search("lion kng", 1)[0]
+    assert small.names[name_id] == "The Lion King" and similarity > 0.5
+    assert list(small.rows(name_id)) == [0, 3]
+    assert small.field(name_id) == "movie"
+    assert small.search("zzzz") == []
+
+
+def test_autocomplete_matches_word_starts(index):
+    found = index.autocomplete("Mo", 8)
+    assert 0 < len(found) <= 8
+    assert all(any(word.startswith("mo") for word in normalize(index.names[name_id]).split())
+               for name_id in found)
+    assert index.autocomplete("  ") == []
+
+
+def test_array_round_trip(index):
+    loaded = TrigramIndex.from_arrays(index.to_arrays())
+    assert loaded.posting_budget == index.posting_budget
+    for query in ("Star Kalo", "rusa", "nite Bluee"):
+        assert loaded.search(query, 10) == index.search(query, 10)
+    assert loaded.autocomplete("he") == index.autocomplete("he")